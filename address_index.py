@@ -0,0 +1,109 @@
+import threading
+
+
+def normalize_address(address: str) -> str:
+    """
+    Key used to look up an address.
+    EVM addresses ('0x' followed by 40 hex digits) are case-insensitive, so they are lowercased.
+    Other addresses (e.g. Solana) are case-sensitive and kept as is.
+    """
+    if len(address) == 42 and address[:2] in ("0x", "0X"):
+        return address.lower()
+    return address
+
+
+class AddressIndex:
+    """
+    In-memory reverse index of contract addresses, mapping each address to the tokens using it.
+        - Lookups are a single dictionary access.
+        - The same address can be used on several networks, matches are kept in insertion order.
+        - 'replace' updates the entries of one token, so the index doesn't have to be rebuilt after inserts.
+    """
+
+    def __init__(self) -> None:
+        # {normalized address: ((symbol, network), ...)}
+        self._index = {}
+        # {symbol: {network: normalized address}}, used to remove outdated entries.
+        self._by_symbol = {}
+        self._lock = threading.Lock()
+
+    def build(self, rows) -> None:
+        """
+        Replace the contents of the index.
+
+        Parameters
+        ----------
+        rows : Iterable
+            Tuples of (symbol, network, address).
+        """
+        index = {}
+        by_symbol = {}
+        for symbol, network, address in rows:
+            key = normalize_address(address)
+            index[key] = index.get(key, ()) + ((symbol, network),)
+            by_symbol.setdefault(symbol, {})[network] = key
+        with self._lock:
+            self._index = index
+            self._by_symbol = by_symbol
+
+    def replace(self, symbol: str, addresses: dict) -> None:
+        """
+        Set the addresses of a token, dropping the ones it had before.
+
+        Parameters
+        ----------
+        symbol : str
+            Ticker symbol of the token.
+        addresses : dict
+            Dictionary of {network: address}.
+        """
+        with self._lock:
+            for network, key in self._by_symbol.pop(symbol, {}).items():
+                matches = tuple(m for m in self._index.get(key, ()) if m != (symbol, network))
+                if matches:
+                    self._index[key] = matches
+                else:
+                    self._index.pop(key, None)
+
+            keys = {}
+            for network, address in addresses.items():
+                key = normalize_address(address)
+                self._index[key] = self._index.get(key, ()) + ((symbol, network),)
+                keys[network] = key
+            if keys:
+                self._by_symbol[symbol] = keys
+
+    def lookup(self, address: str, network: str = None) -> tuple:
+        """
+        Find the token using an address.
+
+        Parameters
+        ----------
+        address : str
+            Contract address.
+        network : str, optional
+            Only match the address on this network. If None, the first match is returned, by default None
+
+        Returns
+        -------
+        tuple
+            (symbol, network) of the token, None if the address is unknown.
+        """
+        matches = self._index.get(normalize_address(address))
+        if not matches:
+            return None
+        if network is None:
+            return matches[0]
+        for match in matches:
+            if match[1] == network:
+                return match
+        return None
+
+    def lookup_all(self, address: str) -> list:
+        """
+        Get every (symbol, network) using an address.
+        """
+        return list(self._index.get(normalize_address(address), ()))
+
+    def __len__(self) -> int:
+        return len(self._index)
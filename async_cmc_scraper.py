@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import json
+import time
+import asyncio
+import logging
+from urllib.parse import urlparse
+
+import aiohttp
+
+from cmc_scraper import CoinMarketcapScraper
+from lazy_import import lazy_import
+from metrics import METRICS, instrument
+from rate_limiter import PRIORITY_INTERACTIVE, credit_cost, parse_retry_after
+from response_cache import CachedResponse
+from single_flight import AsyncSingleFlight
+
+# Only imported once token infos are queried.
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+
+@instrument
+class AsyncCoinMarketcapScraper:
+    """
+    Asyncio version of the 'CoinMarketcapScraper' API methods.
+        - All requests share one pooled keep-alive session.
+        - At most 'max_concurrency' requests are in flight at the same time.
+        - Local files and response parsing are shared with the wrapped 'CoinMarketcapScraper'.
+
+    Parameters
+    ----------
+    log : bool, optional
+        Log progress messages, by default True
+    max_concurrency : int, optional
+        Maximum number of concurrent API requests, by default 8
+    scraper : CoinMarketcapScraper, optional
+        Scraper to share local data with. A new one is created if None, by default None
+    """
+
+    def __init__(
+        self,
+        log: bool = True,
+        max_concurrency: int = 8,
+        scraper: CoinMarketcapScraper = None,
+    ) -> None:
+        self.cmc = scraper if scraper is not None else CoinMarketcapScraper(log=log)
+        self.log = log
+        self.max_concurrency = max_concurrency
+        self._session = None
+        self._semaphore = None
+        # Concurrent misses for the same ticker share one request.
+        self._info_flight = AsyncSingleFlight()
+        self._address_flight = AsyncSingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the pooled session and write pending changes of the local csv files.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.cmc.flush()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily, a session must be created inside a running event loop.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _get(
+        self,
+        url: str,
+        params: dict,
+        items: int = 1,
+        priority: int = PRIORITY_INTERACTIVE,
+    ):
+        """
+        Make a GET request through the credit scheduler shared with the sync scraper.
+        Throttled (429) requests are retried after the 'Retry-After' the API asks for.
+        The response cache of the sync scraper is used the same way. Its sqlite calls run on the default
+        executor, so they never block the event loop.
+
+        Returns
+        -------
+        tuple
+            Status code and decoded JSON body of the response.
+        """
+        cache = self.cmc.response_cache
+        loop = asyncio.get_running_loop()
+        if cache is not None:
+            cached = await loop.run_in_executor(None, cache.get, url, params["parameters"])
+            if cached is not None:
+                return cached.status_code, cached.json()
+
+        session = self._get_session()
+        scheduler = self.cmc.scheduler
+        endpoint = urlparse(url).path
+        credits = credit_cost(endpoint, items)
+        # Unlike requests, aiohttp does not drop headers set to None (e.g. a missing API key).
+        headers = {k: v for k, v in params["headers"].items() if v is not None}
+        for attempt in range(scheduler.max_retries + 1):
+            await scheduler.acquire_async(credits, priority)
+            async with self._semaphore:
+                start = time.perf_counter()
+                async with session.get(
+                    url, headers=headers, params=params["parameters"]
+                ) as response:
+                    content = await response.read()
+                    try:
+                        body = json.loads(content)
+                    except ValueError:
+                        body = {}
+                    if METRICS.enabled:
+                        self.cmc._record_request(endpoint, response.status, credits, start)
+                    if response.status != 429:
+                        if cache is not None and response.status == 200:
+                            stored = CachedResponse(
+                                url, response.status, dict(response.headers), content
+                            )
+                            await loop.run_in_executor(
+                                None, cache.put, url, params["parameters"], stored
+                            )
+                        return response.status, body
+                    retry_after = parse_retry_after(
+                        response.headers.get("Retry-After"), default=2**attempt
+                    )
+            if self.log:
+                logger.warning(
+                    "[_get()] Throttled by Coinmarketcap, retrying in %ss.", retry_after
+                )
+            scheduler.backoff(retry_after, credits)
+        return response.status, body
+
+    """--------------------------------------------------------------------------- Token Info ---------------------------------------------------------------------------"""
+
+    async def get_token_info(self, ticker: str) -> pd.Series:
+        """
+        Get the token info.
+            - Attempts to get locally first.
+            - If not found locally, will query from 'Coinmarketcap' API.
+
+        Parameters
+        ----------
+        ticker : str
+            Ticker symbol of the token.
+
+        Returns
+        -------
+        pd.Series
+            Series containing token information. Empty if the token could not be found.
+        """
+        ticker = ticker.upper()
+        df = await self.gather_token_infos([ticker])
+        if ticker not in df.index:
+            return pd.Series(dtype=object)
+        return df.loc[ticker]
+
+    async def gather_token_infos(self, tickers: list) -> pd.DataFrame:
+        """
+        Get the token info for multiple tickers.
+        Tickers not found locally are queried in batches, with the batches sent concurrently.
+
+        Parameters
+        ----------
+        tickers : list
+            Ticker symbols of the tokens.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataframe containing token information, indexed by ticker.
+        """
+        tickers = self.cmc._normalize_tickers(tickers)
+        store = self.cmc._token_info_store
+        missing = [t for t in tickers if t not in store]
+        if missing:
+            await self._info_flight.do_many(missing, self._fetch_token_infos)
+
+        found = [t for t in tickers if t in store]
+        return pd.DataFrame.from_dict(
+            {t: store.get(t) for t in found}, orient="index", columns=store.columns
+        )
+
+    async def _fetch_token_infos(self, tickers: list) -> dict:
+        store = self.cmc._token_info_store
+        new_df = await self._query_token_infos(tickers)
+        for ticker, data in new_df.to_dict("index").items():
+            store.set(ticker, data)
+        return {}
+
+    async def _query_token_infos(self, tickers: list) -> pd.DataFrame:
+        url = f"{self.cmc.base_url}/v1/cryptocurrency/quotes/latest"
+        results = await self._query_batches(url, tickers)
+        rows = {
+            ticker: self.cmc._parse_token_info(token_data)
+            for ticker, token_data in results.items()
+        }
+        df = pd.DataFrame.from_dict(
+            rows,
+            orient="index",
+            columns=["id", "name", "slug", "max_supply", "infinite_supply"],
+        )
+        if self.log:
+            logger.info("[TokenInfo] Info for %s tokens queried from Coinmarketcap.", len(df))
+        return df
+
+    """--------------------------------------------------------------------------- Token Address ---------------------------------------------------------------------------"""
+
+    async def get_token_address(self, ticker: str, chain_id) -> str:
+        """
+        Get the address of a token on the network with 'chain_id'.
+            - Attempts to get locally first.
+            - If not found locally, will query from 'Coinmarketcap' API.
+        """
+        ticker = ticker.upper()
+        store = self.cmc._address_store
+        if ticker not in store:
+            await self._address_flight.do_many([ticker], self._fetch_token_addresses)
+        return store.get_value(ticker, self.cmc.get_network_name(chain_id))
+
+    async def gather_token_addresses(self, tickers: list) -> dict:
+        """
+        Get the addresses of multiple tokens.
+
+        Returns
+        -------
+        dict
+            Mapping of ticker to a dictionary of {network: address}.
+        """
+        tickers = self.cmc._normalize_tickers(tickers)
+        store = self.cmc._address_store
+        missing = [t for t in tickers if t not in store]
+        if missing:
+            await self._address_flight.do_many(missing, self._fetch_token_addresses)
+        return {t: dict(store.get(t) or {}) for t in tickers}
+
+    async def _fetch_token_addresses(self, tickers: list) -> dict:
+        store = self.cmc._address_store
+        addresses = await self._query_contract_addresses(tickers)
+        # Tickers of failed requests are left out, and queried again by the next lookup.
+        for ticker, token_addresses in addresses.items():
+            store.set(ticker, token_addresses)
+        return {}
+
+    async def _query_contract_addresses(self, tickers: list) -> dict:
+        url = f"{self.cmc.base_url}/v1/cryptocurrency/info"
+        results = await self._query_batches(url, tickers)
+        addresses = {
+            ticker: self.cmc._parse_contract_addresses(token_data)
+            for ticker, token_data in results.items()
+        }
+        if self.log:
+            logger.info(
+                "[TokenAddress] Addresses for %s tokens queried from Coinmarketcap.",
+                len(addresses),
+            )
+        return addresses
+
+    """--------------------------------------------------------------------------- Requests ---------------------------------------------------------------------------"""
+
+    async def _query_batches(
+        self, url: str, tickers: list, priority: int = PRIORITY_INTERACTIVE
+    ) -> dict:
+        """
+        Split the tickers in batches of 'batch_size' and send the batches concurrently.
+
+        Returns
+        -------
+        dict
+            The merged 'data' field of the responses, keyed by ticker.
+        """
+        tickers = self.cmc._normalize_tickers(tickers)
+        batches = self.cmc._chunk(tickers, self.cmc.batch_size)
+        results = {}
+        for data in await asyncio.gather(
+            *[self._query_batch(url, batch, priority) for batch in batches]
+        ):
+            results.update(data)
+        return results
+
+    async def _query_batch(
+        self, url: str, tickers: list, priority: int = PRIORITY_INTERACTIVE
+    ) -> dict:
+        if not tickers:
+            return {}
+        params = self.cmc._get_request_params(",".join(tickers))
+        status, body = await self._get(url, params, len(tickers), priority)
+        if status == 200:
+            data = body["data"]
+            return {t: data[t] for t in tickers if t in data}
+
+        invalid = self.cmc._get_invalid_symbols(body)
+        valid = [t for t in tickers if t not in invalid]
+        if len(valid) < len(tickers):
+            if self.log:
+                logger.warning("[_query_batch()] Skipping unknown symbols: %s", sorted(invalid))
+            return await self._query_batch(url, valid, priority)
+
+        logger.error("[_query_batch()] ERROR %s: %s", status, body)
+        return {}
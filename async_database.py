@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from async_cmc_scraper import AsyncCoinMarketcapScraper
+from database import By, Database
+from lazy_import import lazy_import
+from metrics import instrument
+from single_flight import AsyncSingleFlight
+
+# Only imported by the lookups that return dataframes.
+pd = lazy_import("pandas")
+
+
+@instrument
+class AsyncDatabase:
+    """
+    Asyncio version of the 'Database' lookups.
+        - Lookups found in the cache are answered on the event loop, without waiting for a thread.
+        - Sqlite queries run on a dedicated pool of reader threads, each with its own connection.
+          Writes run on one writer thread, so a write waiting for the lock never holds a reader.
+        - Tokens missing from the database are queried from 'Coinmarketcap' with 'AsyncCoinMarketcapScraper',
+          no thread is blocked while the requests are in flight. Concurrent misses of a symbol share one request.
+        - 'warm_up' and 'refresh_stale' are batch jobs, run them with 'Database'.
+
+    Parameters
+    ----------
+    database : Database, optional
+        Database to read and write. A new one is created if None, and closed by 'close', by default None
+    log : bool, optional
+        Log progress messages, by default True
+    max_readers : int, optional
+        Number of reader threads, by default 4
+    max_concurrency : int, optional
+        Maximum number of concurrent requests to 'Coinmarketcap', by default 8
+    """
+
+    def __init__(
+        self,
+        database: Database = None,
+        log: bool = True,
+        max_readers: int = 4,
+        max_concurrency: int = 8,
+    ) -> None:
+        self._owns_database = database is None
+        self.db = database if database is not None else Database(log=log)
+        self.log = log
+        self.max_concurrency = max_concurrency
+        self._readers = ThreadPoolExecutor(max_readers, thread_name_prefix="async-db-read")
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="async-db-write")
+        # Created on first use, lookups answered from the database never need it.
+        self._cmc = None
+        self._inflight = AsyncSingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def cmc(self) -> AsyncCoinMarketcapScraper:
+        if self._cmc is None:
+            # Shares the rate limits and local files of the database's scraper.
+            self._cmc = AsyncCoinMarketcapScraper(
+                log=self.log, max_concurrency=self.max_concurrency, scraper=self.db.cmc
+            )
+        return self._cmc
+
+    async def close(self) -> None:
+        """
+        Write the pending access counts, stop the threads and close the 'Coinmarketcap' session.
+        """
+        await self._write(self.db.flush_access_counts)
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        if self._cmc is not None:
+            await self._cmc.close()
+        if self._owns_database:
+            self.db.close()
+
+    async def _read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._readers, functools.partial(fn, *args)
+        )
+
+    async def _write(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._writer, functools.partial(fn, *args)
+        )
+
+    """
+    ===================================================================
+    Network data
+    ===================================================================
+    """
+
+    async def get_network_info(self, network_name: str, as_pandas: bool = False):
+        return await self._read(self.db.get_network_info, network_name, as_pandas)
+
+    async def get_chain_id(self, network_name: str):
+        return await self._read(self.db.get_chain_id, network_name)
+
+    async def get_native_currency(self, network_name: str):
+        return await self._read(self.db.get_native_currency, network_name)
+
+    async def get_all_networks(self) -> pd.DataFrame:
+        return await self._read(self.db.get_all_networks)
+
+    async def resolve_network(self, value) -> str:
+        return await self._read(self.db.resolve_network, value)
+
+    """
+    ===================================================================
+    Token Data
+    ===================================================================
+    """
+
+    async def get_token_info(self, symbol: str, as_pandas: bool = False):
+        """
+        Get the info of a token, querying it from 'Coinmarketcap' if it is not in the database yet.
+
+        Parameters
+        ----------
+        symbol : str
+            Ticker symbol of the token.
+        as_pandas : bool, optional
+            Return a pd.Series instead of a 'TokenRecord', by default False
+
+        Returns
+        -------
+        TokenRecord
+            Info of the token. None if it could not be found.
+        """
+        symbol = symbol.upper()
+        token_info = (await self.gather_token_infos([symbol]))[symbol]
+        if as_pandas:
+            return self.db._token_info_series(token_info)
+        return token_info
+
+    async def gather_token_infos(self, symbols: list) -> dict:
+        """
+        Get the info of multiple tokens.
+        Symbols not cached are read with one query, the ones not in the database are queried together.
+
+        Parameters
+        ----------
+        symbols : list
+            Ticker symbols of the tokens.
+
+        Returns
+        -------
+        dict
+            Mapping of symbol to its 'TokenRecord', None for symbols that could not be found.
+        """
+        symbols = self.db._normalize_symbols(symbols)
+        self.db._record_accesses(symbols)
+        cache = self.db.cache
+        records = {}
+        for symbol in symbols:
+            record = cache.get(("info", symbol))
+            if record is not None:
+                records[symbol] = record
+
+        uncached = [s for s in symbols if s not in records]
+        if uncached:
+            found = await self._read(self.db._query_token_records, uncached)
+            missing = [s for s in uncached if s not in found]
+            if missing:
+                await self._insert_tokens(missing)
+                found.update(await self._read(self.db._query_token_records, missing))
+            for symbol, record in found.items():
+                cache.set(("info", symbol), record)
+            records.update(found)
+        return {symbol: records.get(symbol) for symbol in symbols}
+
+    async def get_token_infos(self, symbols: list) -> pd.DataFrame:
+        """
+        Awaitable 'Database.get_token_infos', a dataframe indexed by 'TokenSymbol'.
+        """
+        symbols = self.db._normalize_symbols(symbols)
+        self.db._record_accesses(symbols)
+        df = await self._read(self.db._query_token_infos, symbols)
+        missing = [s for s in symbols if s not in df.index]
+        if missing:
+            await self._insert_tokens(missing)
+            df = await self._read(self.db._query_token_infos, symbols)
+        return df
+
+    async def get_token_addresses(self, symbol: str) -> dict:
+        symbol = symbol.upper()
+        self.db._record_access(symbol)
+        key = ("addresses", symbol)
+        addresses = self.db.cache.get(key)
+        if addresses is None:
+            addresses = await self._read(self.db._query_addresses, symbol)
+            if not addresses and not await self._read(self.db.token_symbol_exists, symbol):
+                await self._insert_tokens([symbol])
+                addresses = await self._read(self.db._query_addresses, symbol)
+            self.db.cache.set(key, addresses)
+        return dict(addresses)
+
+    async def get_token_address(self, symbol: str, value: str, search_by: By) -> str:
+        symbol = symbol.upper()
+        if search_by not in (By.ID, By.Network):
+            return None
+        self.db._record_access(symbol)
+        key = ("address", symbol, str(value), search_by)
+        address = self.db.cache.get(key)
+        if address is not None:
+            return address
+
+        address = await self._read(self.db._query_address, symbol, value, search_by)
+        if address is None and not await self._read(self.db.token_symbol_exists, symbol):
+            await self._insert_tokens([symbol])
+            address = await self._read(self.db._query_address, symbol, value, search_by)
+        if address is None:
+            address = ""
+        self.db.cache.set(key, address)
+        return address
+
+    async def gather_token_address(self, symbols: list, value: str, search_by: By) -> dict:
+        """
+        Get the address of multiple tokens on one network. The tokens not in the database are queried together.
+
+        Parameters
+        ----------
+        symbols : list
+            Ticker symbols of the tokens.
+        value : str
+            Network name or chain id.
+        search_by : By
+            Whether 'value' is a network name or a chain id.
+
+        Returns
+        -------
+        dict
+            Mapping of symbol to its address, "" for tokens without an address on the network.
+        """
+        symbols = self.db._normalize_symbols(symbols)
+        uncached = [
+            s for s in symbols if self.db.cache.get(("address", s, str(value), search_by)) is None
+        ]
+        if uncached:
+            await self._insert_tokens(uncached)
+        addresses = await asyncio.gather(
+            *[self.get_token_address(s, value, search_by) for s in symbols]
+        )
+        return dict(zip(symbols, addresses))
+
+    async def get_token_addresses_bulk(self, symbols: list) -> dict:
+        """
+        Awaitable 'Database.get_token_addresses_bulk', a mapping of symbol to {network: address}.
+        """
+        symbols = self.db._normalize_symbols(symbols)
+        self.db._record_accesses(symbols)
+        addresses = {}
+        for symbol in symbols:
+            cached = self.db.cache.get(("addresses", symbol))
+            if cached is not None:
+                addresses[symbol] = dict(cached)
+
+        uncached = [s for s in symbols if s not in addresses]
+        if uncached:
+            await self._insert_tokens(uncached)
+            queried = await self._read(self.db._query_addresses_bulk, uncached)
+            for symbol, token_addresses in queried.items():
+                self.db.cache.set(("addresses", symbol), token_addresses)
+                addresses[symbol] = dict(token_addresses)
+        return {symbol: addresses[symbol] for symbol in symbols}
+
+    async def insert_tokens_data(self, symbols: list):
+        """
+        Query the symbols that are not in the database yet from 'Coinmarketcap' and insert them together.
+        """
+        await self._insert_tokens(self.db._normalize_symbols(symbols))
+
+    async def _insert_tokens(self, symbols: list):
+        await self._inflight.do_many(symbols, self._insert_missing_tokens)
+
+    async def _insert_missing_tokens(self, symbols: list) -> dict:
+        # Checked again, another task or process may have inserted them since the caller looked.
+        existing = await self._read(self.db._existing_symbols, symbols)
+        missing = [s for s in symbols if s not in existing]
+        if missing:
+            token_info = await self.cmc._query_token_infos(missing)
+            token_addresses = await self.cmc._query_contract_addresses(token_info.index.to_list())
+            await self._write(self.db._store_tokens, token_info, token_addresses)
+        return {}
+
+    """
+    ===================================================================
+    Address Lookup
+    ===================================================================
+    """
+
+    async def resolve_address(self, address: str, network: str = None) -> tuple:
+        return await self._read(self.db.resolve_address, address, network)
+
+    async def resolve_addresses(self, addresses, network: str = None) -> dict:
+        return await self._read(self.db.resolve_addresses, addresses, network)
+
+    async def flush_access_counts(self):
+        await self._write(self.db.flush_access_counts)
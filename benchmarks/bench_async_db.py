@@ -0,0 +1,114 @@
+"""
+Async lookups: cached lookups served while misses are queried from a slow 'cmc_stub.StubCmcServer'.
+
+    - '--hot' symbols are inserted and cached first, then looked up in a loop by '--tasks' tasks.
+    - At the same time, '--misses' tasks each look up a symbol that isn't in the database yet,
+      which takes two requests of '--latency' seconds.
+    - sync: the blocking 'Database' called on the event loop, as async services did before.
+    - async: 'AsyncDatabase'.
+Reports the p50/p99 latency of the cached lookups (from when they are due, so time spent waiting for a blocked
+event loop counts), and the time until every miss is answered.
+
+    python benchmarks/bench_async_db.py --latency 0.2 --misses 20
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cmc_stub import StubCmcServer
+from run_benchmarks import Workspace, percentiles
+
+
+async def run_mode(mode: str, d, hot: list, cold: list, args) -> dict:
+    from async_database import AsyncDatabase
+    from database import By
+
+    if mode == "async":
+        db = AsyncDatabase(database=d, log=False)
+        lookup = db.get_token_address
+    else:
+        db = None
+
+        async def lookup(symbol, value, search_by):
+            return d.get_token_address(symbol, value, search_by)
+
+    samples = []
+    done = asyncio.Event()
+
+    async def hot_task(offset: int):
+        i = offset
+        while not done.is_set():
+            # Like a service awaiting its own I/O between lookups. The lookup is due when the sleep ends,
+            # the time the task waits for a blocked loop after that counts in its latency.
+            due = time.perf_counter() + 0.001
+            await asyncio.sleep(0.001)
+            await lookup(hot[i % len(hot)], "Ethereum", By.Network)
+            samples.append(time.perf_counter() - due)
+            i += 1
+
+    async def miss_task(symbol: str):
+        return await lookup(symbol, "Ethereum", By.Network)
+
+    hot_tasks = [asyncio.create_task(hot_task(i)) for i in range(args.tasks)]
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    addresses = await asyncio.gather(*[miss_task(s) for s in cold])
+    misses_s = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*hot_tasks)
+    if db is not None:
+        await db.close()
+    return {
+        "hot_lookups": len(samples),
+        "hot_ms": percentiles(samples),
+        "misses_s": round(misses_s, 3),
+        "misses_found": sum(1 for a in addresses if a),
+    }
+
+
+def run(args) -> dict:
+    from database import By, Database
+
+    symbols = [f"T{i}" for i in range(1, args.hot + 2 * args.misses + 1)]
+    hot = symbols[: args.hot]
+    report = {}
+    with StubCmcServer(tokens=len(symbols), latency=args.latency) as stub, Workspace(stub.base_url):
+        d = Database(log=False)
+        stub.latency = 0
+        d.insert_tokens_data(hot)
+        for symbol in hot:
+            d.get_token_address(symbol, "Ethereum", By.Network)
+        stub.latency = args.latency
+        for n, mode in enumerate(("sync", "async")):
+            # Each mode misses on its own symbols.
+            cold = symbols[args.hot + n * args.misses : args.hot + (n + 1) * args.misses]
+            report[mode] = asyncio.run(run_mode(mode, d, hot, cold, args))
+        d.close()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hot", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--misses", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    print(json.dumps(report, indent=4))
+    ok = all(report[mode]["misses_found"] == args.misses for mode in report)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
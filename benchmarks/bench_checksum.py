@@ -0,0 +1,100 @@
+"""
+Checksumming throughput: per-address 'to_checksum_address' calls (the previous approach)
+against the batched, memoized 'checksum.to_checksum_addresses'.
+
+The workload mixes EVM addresses, repeated addresses and non-EVM addresses, like the output of a full refresh:
+
+    python benchmarks/bench_checksum.py --addresses 200000 --unique 20000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checksum import Checksummer
+
+
+def make_workload(total: int, unique: int, non_evm_share: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    base58 = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+    evm = [
+        "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+        for _ in range(unique)
+    ]
+    solana = [
+        "".join(rng.choice(base58) for _ in range(44)) for _ in range(unique // 10 + 1)
+    ]
+    return [
+        rng.choice(solana) if rng.random() < non_evm_share else rng.choice(evm)
+        for _ in range(total)
+    ]
+
+
+def per_call(addresses: list) -> list:
+    try:
+        from web3 import Web3
+
+        to_checksum_address = Web3.to_checksum_address
+    except ImportError:
+        from eth_utils import to_checksum_address
+
+    results = []
+    for address in addresses:
+        try:
+            address = to_checksum_address(address)
+        except ValueError:
+            pass
+        results.append(address)
+    return results
+
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--addresses", type=int, default=200000)
+    parser.add_argument("--unique", type=int, default=20000)
+    parser.add_argument("--non-evm-share", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    addresses = make_workload(args.addresses, args.unique, args.non_evm_share)
+    report = {"addresses": len(addresses), "unique_evm": args.unique}
+
+    try:
+        seconds, expected = timed(per_call, addresses)
+        report["per_call_per_sec"] = round(len(addresses) / seconds)
+    except ImportError:
+        expected = None
+        report["per_call_per_sec"] = None
+
+    def batched(checksummer):
+        results = []
+        for i in range(0, len(addresses), args.batch_size):
+            results.extend(checksummer.checksum_many(addresses[i : i + args.batch_size]))
+        return results
+
+    checksummer = Checksummer(maxsize=args.unique * 2)
+    seconds, cold = timed(batched, checksummer)
+    report["batched_cold_per_sec"] = round(len(addresses) / seconds)
+    seconds, warm = timed(batched, checksummer)
+    report["batched_warm_per_sec"] = round(len(addresses) / seconds)
+    report["memo"] = checksummer.stats()
+
+    if expected is not None:
+        report["matches_per_call"] = cold == expected and warm == expected
+    print(json.dumps(report, indent=4))
+    return 0 if report.get("matches_per_call", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
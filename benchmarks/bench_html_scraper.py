@@ -0,0 +1,73 @@
+"""
+Browserless scraping: parsing saved pages, and fetching pages from 'cmc_stub.StubCmcServer' over HTTP.
+
+    - Parse time of a saved page from 'fixtures/' ('html_scraper.parse_token_page').
+    - Pages per second fetched and parsed with the pooled session, and with a new connection per page.
+
+No browser is needed. The browser path waits up to 5s per XPath on top of starting Chrome, so it isn't timed here.
+The fields parsed from the saved pages are checked by 'tests/test_html_scraper.py'.
+
+    python benchmarks/bench_html_scraper.py --pages 500 --latency 0.005
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from cmc_stub import StubCmcServer
+from html_scraper import HtmlScraper, parse_token_page
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+
+def fetch_pages(scraper: HtmlScraper, slugs: list) -> float:
+    start = time.perf_counter()
+    for slug in slugs:
+        scraper.get_token_page(slug)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--parses", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds per stub request.")
+    args = parser.parse_args()
+
+    report = {}
+    html = read_fixture("tether.html")
+    start = time.perf_counter()
+    for _ in range(args.parses):
+        parse_token_page(html)
+    report["parse_us"] = round((time.perf_counter() - start) / args.parses * 1e6, 1)
+
+    slugs = [f"token-{i}" for i in range(1, args.pages + 1)]
+    with StubCmcServer(tokens=args.pages, latency=args.latency) as stub:
+        pooled = HtmlScraper(requests.Session(), site_url=stub.base_url)
+        pooled_s = fetch_pages(pooled, slugs)
+
+        # A new connection for every page.
+        unpooled = HtmlScraper(site_url=stub.base_url)
+        unpooled.headers["Connection"] = "close"
+        unpooled_s = fetch_pages(unpooled, slugs)
+
+    report["pooled_pages_per_s"] = round(args.pages / pooled_s, 1)
+    report["unpooled_pages_per_s"] = round(args.pages / unpooled_s, 1)
+    print(json.dumps(report, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Import-time budget for the cached lookup path.
+
+Starts a fresh interpreter, imports 'database', opens a 'Database' and answers a 'get_token_address'
+that is already stored locally, then checks:
+    - The import and the lookup stay within the time budgets.
+    - pandas, web3, selenium and requests were never imported.
+
+Run from the directory holding 'config.json', with the token already in 'crypto.db':
+
+    python benchmarks/bench_import.py --symbol WETH --network Ethereum
+
+Exits with status 1 if a budget is exceeded.
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "web3", "selenium", "requests"]
+
+CHILD = """
+import sys, time, json
+start = time.perf_counter()
+import database
+imported = time.perf_counter()
+d = database.Database(log=False)
+opened = time.perf_counter()
+address = d.get_token_address({symbol!r}, {network!r}, database.By.Network)
+first = time.perf_counter()
+address = d.get_token_address({symbol!r}, {network!r}, database.By.Network)
+cached = time.perf_counter()
+d.close()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "open_ms": (opened - imported) * 1000,
+    "first_lookup_ms": (first - opened) * 1000,
+    "cached_lookup_us": (cached - first) * 1e6,
+    "address": address,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once(symbol: str, network: str) -> dict:
+    code = CHILD.format(symbol=symbol, network=network, heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")]))
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbol", default="WETH")
+    parser.add_argument("--network", default="Ethereum")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=150)
+    parser.add_argument("--lookup-budget-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    # The best run is reported, the others include noise from the machine.
+    runs = [run_once(args.symbol, args.network) for _ in range(args.runs)]
+    best = {key: min(r[key] for r in runs) for key in runs[0] if key.endswith(("_ms", "_us"))}
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    print(json.dumps({**best, "address": runs[0]["address"], "loaded": loaded}, indent=4))
+
+    failures = []
+    if best["import_ms"] > args.import_budget_ms:
+        failures.append(f"import took {best['import_ms']:.1f}ms (budget {args.import_budget_ms}ms)")
+    if best["first_lookup_ms"] > args.lookup_budget_ms:
+        failures.append(
+            f"lookup took {best['first_lookup_ms']:.1f}ms (budget {args.lookup_budget_ms}ms)"
+        )
+    if loaded:
+        failures.append(f"heavy modules imported on the cached path: {loaded}")
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Concurrent ingest: worker processes writing tokens to one 'crypto.db', directly or through an 'IngestWriter'.
+
+For each worker count, every worker writes '--tokens' tokens one at a time (like 'insert_token_data' does):
+    - direct: each write is its own transaction, the workers compete for sqlite's write lock.
+    - writer: writes are sent to one 'IngestWriter', which commits what is queued in one transaction.
+Reports tokens written per second, 'database is locked' errors and the p50/p99 latency of a write.
+
+    python benchmarks/bench_ingest.py --workers 1 2 4 8 --tokens 300
+"""
+
+import os
+import sys
+import json
+import secrets
+import time
+import sqlite3
+import argparse
+import threading
+import contextlib
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_benchmarks import Workspace, percentiles
+
+
+def write_tokens(mode: str, worker: int, args, address, authkey, barrier, results) -> None:
+    from config import reload_config
+    from database import Database
+    from ingest_writer import IngestClient
+
+    reload_config()
+    writer = IngestClient(address, authkey) if mode == "writer" else False
+    d = Database(log=False, busy_timeout=args.busy_timeout, writer=writer)
+    if writer:
+        writer.connect()
+    samples = []
+    errors = 0
+    # Every worker is started and connected before the clock starts.
+    barrier.wait()
+    start = time.time()
+    for i in range(args.tokens):
+        symbol = f"W{worker}X{i}"
+        row = (symbol, f"w{worker}-{i}", 1000, 0, None, d._now())
+        addresses = {
+            symbol: {
+                "Ethereum": "0x" + format(worker * 10**6 + i, "040x"),
+                "Arbitrum": "0x" + format(worker * 10**6 + i + 1, "040x"),
+            }
+        }
+        write_start = time.perf_counter()
+        try:
+            d._submit_write("tokens", [row], addresses)
+        except sqlite3.OperationalError:
+            errors += 1
+        samples.append(time.perf_counter() - write_start)
+        if args.think:
+            # Time spent on other work (e.g. querying Coinmarketcap) between two writes.
+            time.sleep(args.think)
+    results.put({"samples": samples, "errors": errors, "start": start, "end": time.time()})
+    if writer:
+        writer.close()
+    d.connections.close_all()
+
+
+def run_mode(mode: str, workers: int, args, address, authkey) -> dict:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    queue = context.Queue()
+    processes = [
+        context.Process(target=write_tokens, args=(mode, w, args, address, authkey, barrier, queue))
+        for w in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = max(r["end"] for r in results) - min(r["start"] for r in results)
+    samples = [s for r in results for s in r["samples"]]
+    errors = sum(r["errors"] for r in results)
+    return {
+        "tokens_per_s": round((len(samples) - errors) / elapsed, 1),
+        "locked_errors": errors,
+        "write_ms": percentiles(samples),
+    }
+
+
+def run(args) -> dict:
+    from config import load_config
+    from database import Database
+    from ingest_writer import IngestWriter
+
+    report = {}
+    authkey = secrets.token_hex(16)
+    with Workspace(""):
+        for workers in args.workers:
+            report[workers] = {}
+            for mode in ("direct", "writer"):
+                # A fresh database for every run.
+                for suffix in ("", "-wal", "-shm"):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(f"{load_config()['data_export_path']}\\crypto.db{suffix}")
+                d = Database(log=False, writer=False)
+                writer = None
+                address = ("127.0.0.1", args.port)
+                if mode == "writer":
+                    writer = IngestWriter(d, max_batch=args.max_batch)
+                    threading.Thread(target=writer.serve, args=(address, authkey), daemon=True).start()
+                result = run_mode(mode, workers, args, address, authkey)
+                if writer is not None:
+                    result["transactions"] = writer.transactions
+                    result["writes_per_transaction"] = round(
+                        writer.writes / max(writer.transactions, 1), 1
+                    )
+                    writer.close()
+                d.cursor.execute("""SELECT COUNT(*) FROM Tokens""")
+                result["rows"] = d.cursor.fetchone()[0]
+                d.close()
+                report[workers][mode] = result
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--tokens", type=int, default=300, help="Tokens written per worker.")
+    parser.add_argument("--busy-timeout", type=float, default=5.0)
+    parser.add_argument("--think", type=float, default=0.0, help="Seconds each worker sleeps between writes.")
+    parser.add_argument("--max-batch", type=int, default=500)
+    parser.add_argument("--port", type=int, default=6544)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    print(json.dumps(report, indent=4))
+    expected = {w: w * args.tokens for w in args.workers}
+    ok = all(report[w]["writer"]["rows"] == expected[w] for w in args.workers)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Merging into the ticker x network address matrix: the previous 'iterrows' + '.loc' merge against the
+aligned '_merge_dataframes' and 'CsvStore.merge_frame'.
+
+The base matrix has '--tickers' rows and '--networks' columns, with a few addresses per ticker.
+The update brings '--update-tickers' rows (half of them new) spread over existing and new networks.
+The legacy merge is cell by cell, so it is timed on the first '--legacy-rows' rows of the update and extrapolated
+from its cost per cell. On pandas 3 it raises once it writes a string into a column it created from an empty cell,
+in that case the cells written before the error are used for the estimate.
+
+    python benchmarks/bench_merge.py --tickers 10000 --networks 300
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from cmc_scraper import CoinMarketcapScraper
+from csv_store import CsvStore
+
+
+def make_matrix(tickers: list, networks: list, per_ticker: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    rows = {
+        ticker: {
+            network: "0x" + format(rng.getrandbits(160), "040x")
+            for network in rng.sample(networks, per_ticker)
+        }
+        for ticker in tickers
+    }
+    df = pd.DataFrame.from_dict(rows, orient="index", columns=networks)
+    df.index.name = "ticker"
+    return df
+
+
+def legacy_merge(base_df: pd.DataFrame, alt_df: pd.DataFrame, progress: list) -> pd.DataFrame:
+    for i in alt_df.iterrows():
+        index, value = i
+        value_index = value.index.to_list()
+
+        for vi in value_index:
+            base_df.loc[index, vi] = alt_df.loc[index, vi]
+            progress[0] += 1
+
+    return base_df
+
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=10000)
+    parser.add_argument("--networks", type=int, default=300)
+    parser.add_argument("--per-ticker", type=int, default=3)
+    parser.add_argument("--update-tickers", type=int, default=1000)
+    parser.add_argument("--update-networks", type=int, default=60)
+    parser.add_argument("--legacy-rows", type=int, default=20)
+    args = parser.parse_args()
+
+    networks = [f"Network {i}" for i in range(args.networks)]
+    tickers = [f"T{i}" for i in range(args.tickers)]
+    base_df = make_matrix(tickers, networks, args.per_ticker, seed=0)
+
+    # Half of the updated tickers and a sixth of the updated networks are new.
+    half = args.update_tickers // 2
+    update_tickers = tickers[:half] + [f"NEW{i}" for i in range(args.update_tickers - half)]
+    new_networks = args.update_networks // 6
+    update_networks = networks[: args.update_networks - new_networks] + [
+        f"New Network {i}" for i in range(new_networks)
+    ]
+    alt_df = make_matrix(update_tickers, update_networks, args.per_ticker, seed=1)
+
+    # '_merge_dataframes' doesn't use the scraper's state, so no config is needed.
+    cmc = object.__new__(CoinMarketcapScraper)
+    aligned_s, merged = timed(cmc._merge_dataframes, base_df, alt_df)
+
+    legacy_rows = min(args.legacy_rows, len(alt_df))
+    progress = [0]
+    legacy_error = None
+    start = time.perf_counter()
+    try:
+        legacy_merge(base_df.astype(object), alt_df.iloc[:legacy_rows], progress)
+    except TypeError as e:
+        legacy_error = str(e)[:80]
+    legacy_s = time.perf_counter() - start
+    legacy_estimate_s = legacy_s / max(progress[0], 1) * alt_df.size
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CsvStore(os.path.join(tmp, "token_address.csv"), "ticker", flush_every=10**9)
+        store.merge_frame(base_df)
+        store_s, _ = timed(store.merge_frame, alt_df)
+        check = store.to_frame()
+
+    expected = merged.reindex(index=check.index, columns=check.columns)
+    report = {
+        "base_shape": list(base_df.shape),
+        "update_shape": list(alt_df.shape),
+        "merged_shape": list(merged.shape),
+        "aligned_merge_s": round(aligned_s, 4),
+        "store_merge_s": round(store_s, 4),
+        "legacy_merge_s_estimated": round(legacy_estimate_s, 2),
+        "legacy_cells_timed": progress[0],
+        "legacy_error": legacy_error,
+        "speedup": round(legacy_estimate_s / aligned_s, 1),
+        "store_matches_aligned": bool(
+            (expected.fillna("") == check.astype(object).fillna("")).all().all()
+        ),
+    }
+    print(json.dumps(report, indent=4))
+    return 0 if report["store_matches_aligned"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Network resolution: the in-memory network index against the per-call 'Networks' queries used before it.
+
+Compares, for a network name, an alias and a chain id:
+    - index: 'Database.get_network_info' / '_query_network_info_by_chain_id', answered from the index.
+    - legacy: the 'SELECT ... FROM Networks WHERE ...' run on every call before the index.
+
+Run from the directory holding 'config.json', with networks in 'crypto.db' (see 'python -m database networks'):
+
+    python benchmarks/bench_networks.py --lookups 100000 --network Arbitrum --alias "Arbitrum One" --chain-id 42161
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from records import NetworkRecord
+
+
+def legacy_by_name(d: Database, network_name: str) -> NetworkRecord:
+    d.cursor.execute(
+        """SELECT NetworkName, NativeCurrency, ChainId FROM Networks WHERE NetworkName = ?""",
+        (network_name,),
+    )
+    return NetworkRecord.from_row(d.cursor.fetchone())
+
+
+def legacy_by_chain_id(d: Database, chain_id) -> NetworkRecord:
+    d.cursor.execute(
+        """SELECT NetworkName, NativeCurrency, ChainId FROM Networks WHERE ChainId = ?""",
+        (str(chain_id),),
+    )
+    return NetworkRecord.from_row(d.cursor.fetchone())
+
+
+def latency_us(fn, lookups: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(lookups):
+        fn()
+    return round((time.perf_counter() - start) / lookups * 1e6, 3)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--network", default="Arbitrum")
+    parser.add_argument("--alias", default="Arbitrum One")
+    parser.add_argument("--chain-id", default="42161")
+    args = parser.parse_args()
+
+    d = Database(log=False)
+    report = {
+        "by_name": {
+            "index_us": latency_us(lambda: d.get_network_info(args.network), args.lookups),
+            "legacy_us": latency_us(lambda: legacy_by_name(d, args.network), args.lookups),
+        },
+        "by_alias": {
+            "index_us": latency_us(lambda: d.get_network_info(args.alias), args.lookups),
+            "resolved_to": d.resolve_network(args.alias),
+        },
+        "by_chain_id": {
+            "index_us": latency_us(
+                lambda: d._query_network_info_by_chain_id(args.chain_id), args.lookups
+            ),
+            "legacy_us": latency_us(lambda: legacy_by_chain_id(d, args.chain_id), args.lookups),
+        },
+        "same_result": d.get_network_info(args.network) == legacy_by_name(d, args.network),
+    }
+    d.close()
+    print(json.dumps(report, indent=4))
+    return 0 if report["same_result"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Point lookup latency and allocations: 'TokenRecord' / 'NetworkRecord' results against pandas results.
+
+Compares, for 'get_token_info' and 'get_network_info':
+    - record: the default result.
+    - as_pandas: the opt-in pd.Series result.
+    - legacy: the one-row DataFrame + 'set_index' + '.loc' construction used before records.
+
+Run from the directory holding 'config.json', with at least one token and network in 'crypto.db':
+
+    python benchmarks/bench_records.py --lookups 20000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from database import Database
+
+
+def legacy_token_info(d: Database, symbol: str) -> pd.Series:
+    d.cursor.execute("""SELECT * FROM Tokens WHERE TokenSymbol = ?""", (symbol,))
+    result = d.cursor.fetchall()[0]
+    df = pd.DataFrame(
+        {
+            "TokenId": [result[0]],
+            "TokenSymbol": [result[1]],
+            "TokenSlug": [result[2]],
+            "NetworkAddresses": [result[3]],
+            "MaxSupply": [result[4]],
+            "InfiniteSupply": [result[5]],
+        }
+    ).set_index("TokenSymbol")
+    return df.loc[symbol]
+
+
+def legacy_network_info(d: Database, network_name: str) -> pd.Series:
+    d.cursor.execute("""SELECT * FROM Networks WHERE NetworkName = ?""", (network_name,))
+    results = d.cursor.fetchall()[0]
+    df = pd.DataFrame(
+        {"name": [results[1]], "native": [results[2]], "chain_id": [results[3]]}
+    ).set_index("name")
+    return df.loc[network_name]
+
+
+def measure(fn, lookups: int) -> dict:
+    fn()
+    start = time.perf_counter()
+    for _ in range(lookups):
+        fn()
+    latency = (time.perf_counter() - start) / lookups
+
+    # Peak memory allocated while building one result.
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return {
+        "latency_us": round(latency * 1e6, 2),
+        "peak_alloc_bytes": peak,
+        "result_type": type(result).__name__,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    d = Database(log=False)
+    d.cursor.execute("""SELECT TokenSymbol FROM Tokens LIMIT 1""")
+    symbol = d.cursor.fetchone()[0]
+    d.cursor.execute("""SELECT NetworkName FROM Networks LIMIT 1""")
+    network = d.cursor.fetchone()[0]
+
+    report = {
+        "symbol": symbol,
+        "network": network,
+        "token_info": {
+            "record": measure(lambda: d.get_token_info(symbol), args.lookups),
+            "as_pandas": measure(
+                lambda: d.get_token_info(symbol, as_pandas=True), args.lookups
+            ),
+            "legacy": measure(lambda: legacy_token_info(d, symbol), args.lookups),
+        },
+        "network_info": {
+            "record": measure(lambda: d.get_network_info(network), args.lookups),
+            "as_pandas": measure(
+                lambda: d.get_network_info(network, as_pandas=True), args.lookups
+            ),
+            "legacy": measure(lambda: legacy_network_info(d, network), args.lookups),
+        },
+    }
+    d.close()
+    print(json.dumps(report, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
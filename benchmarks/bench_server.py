@@ -0,0 +1,192 @@
+"""
+Lookup server: 'python -m database serve' answering keep-alive clients.
+
+    - Loads '--tokens' tokens from 'cmc_stub.StubCmcServer' with 'warm_up', then starts the server on that database.
+    - Checks single, batch, network, reverse and miss lookups against 'Database' (exits with 1 on a mismatch).
+    - '--clients' processes, each with one keep-alive connection, send lookups for '--seconds' seconds:
+        - single: GET /address, one lookup per request.
+        - batch: POST /addresses with '--batch' symbols per request.
+    Reports requests and lookups per second, and the p50/p99 latency of a request. The server runs on one core.
+
+    python benchmarks/bench_server.py --tokens 5000 --clients 4 --seconds 3
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+import subprocess
+import http.client
+import multiprocessing
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cmc_stub import StubCmcServer
+from run_benchmarks import Workspace, percentiles
+
+
+def request(conn, method: str, path: str, body=None) -> tuple:
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def load(mode: str, port: int, symbols: list, args, seed: int) -> dict:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    samples = []
+    lookups = 0
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if mode == "single":
+            query = urlencode({"symbol": rng.choice(symbols), "chain_id": 1})
+            request(conn, "GET", f"/address?{query}")
+            lookups += 1
+        else:
+            batch = rng.sample(symbols, args.batch)
+            request(conn, "POST", "/addresses", {"symbols": batch, "chain_id": 1})
+            lookups += len(batch)
+        samples.append(time.perf_counter() - start)
+    conn.close()
+    return {"samples": samples, "lookups": lookups}
+
+
+def run_load(mode: str, port: int, symbols: list, args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.clients) as pool:
+        results = pool.starmap(load, [(mode, port, symbols, args, seed) for seed in range(args.clients)])
+    samples = [s for r in results for s in r["samples"]]
+    return {
+        "requests_per_s": round(len(samples) / args.seconds),
+        "lookups_per_s": round(sum(r["lookups"] for r in results) / args.seconds),
+        "request_ms": percentiles(samples),
+    }
+
+
+def check(port: int, d, symbols: list, cold: str) -> list:
+    from database import By
+
+    mismatches = []
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for symbol in symbols:
+        expected = d.get_token_address(symbol, "1", By.ID) or None
+        status, body = request(conn, "GET", f"/address?{urlencode({'symbol': symbol, 'chain_id': 1})}")
+        if (body.get("address") if status == 200 else None) != expected:
+            mismatches.append((symbol, "address"))
+        expected = d.get_token_address(symbol, "Arbitrum One", By.Network) or None
+        query = urlencode({"symbol": symbol, "network": "Arbitrum One"})
+        status, body = request(conn, "GET", f"/address?{query}")
+        if (body.get("address") if status == 200 else None) != expected:
+            mismatches.append((symbol, "network"))
+        for address in d.get_token_addresses(symbol).values():
+            status, body = request(conn, "GET", f"/resolve?{urlencode({'address': address})}")
+            if status != 200 or (body["symbol"], body["network"]) != d.resolve_address(address):
+                mismatches.append((symbol, "resolve"))
+
+    _, body = request(conn, "POST", "/addresses", {"symbols": symbols[:50], "chain_id": 1})
+    expected = {s: d.get_token_address(s, "1", By.ID) or None for s in symbols[:50]}
+    if body["addresses"] != expected:
+        mismatches.append(("batch", "addresses"))
+    status, body = request(conn, "GET", "/network?name=bsc")
+    if status != 200 or body["chain_id"] != "56":
+        mismatches.append(("network", body))
+    # Not in the database yet, queried from the stub by the server.
+    status, body = request(conn, "GET", f"/address?{urlencode({'symbol': cold, 'chain_id': 1})}")
+    if status != 200:
+        mismatches.append((cold, "miss"))
+    status, _ = request(conn, "GET", "/address?symbol=T1")
+    if status != 400:
+        mismatches.append(("missing network", status))
+    conn.close()
+    return mismatches
+
+
+def wait_for(port: int, process, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The server exited.")
+        with contextlib.suppress(OSError):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        time.sleep(0.1)
+    raise TimeoutError("The server didn't start.")
+
+
+def run(args) -> dict:
+    from database import Database
+
+    symbols = [f"T{i}" for i in range(1, args.tokens + 1)]
+    report = {}
+    with StubCmcServer(tokens=args.tokens + 1) as stub, Workspace(stub.base_url) as workspace:
+        d = Database(log=False)
+        d.warm_up(page_size=1000)
+        cold = f"T{args.tokens + 1}"
+        with d.transaction() as cursor:
+            # Removed again, so the server has to query it from the stub.
+            cursor.execute(
+                """DELETE FROM TokenAddresses WHERE TokenId IN (SELECT TokenId FROM Tokens WHERE TokenSymbol = ?)""",
+                (cold,),
+            )
+            cursor.execute("""DELETE FROM Tokens WHERE TokenSymbol = ?""", (cold,))
+            for network, chain_id in (
+                ("Ethereum", "1"),
+                ("BNB Smart Chain (BEP20)", "56"),
+                ("Arbitrum", "42161"),
+            ):
+                cursor.execute(
+                    """UPDATE Networks SET ChainId = ? WHERE NetworkName = ?""", (chain_id, network)
+                )
+        d.rebuild_network_index()
+        d.invalidate_cache()
+
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "database", "serve", "--port", str(args.port)],
+            cwd=workspace.path,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            start = time.perf_counter()
+            wait_for(args.port, server)
+            report["startup_s"] = round(time.perf_counter() - start, 2)
+            report["mismatches"] = len(check(args.port, d, symbols[:200], cold))
+            report["single"] = run_load("single", args.port, symbols, args)
+            report["batch"] = run_load("batch", args.port, symbols, args)
+        finally:
+            server.terminate()
+            server.wait()
+        d.close()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    print(json.dumps(report, indent=4))
+    return 0 if report["mismatches"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
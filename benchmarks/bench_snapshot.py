@@ -0,0 +1,139 @@
+"""
+Snapshot lookups: the mapped snapshot ('snapshot.Snapshot') against the sqlite queries of 'Database'.
+
+    - Loads '--tokens' tokens from 'cmc_stub.StubCmcServer' with 'warm_up', then publishes a snapshot.
+    - Checks that the snapshot answers every token, address and reverse address lookup like the database
+      (exits with 1 on a mismatch).
+    - Time to open the snapshot, snapshot size, and per-lookup latency of both.
+    - Publishes a second snapshot and checks that an open reader switches to it.
+
+    python benchmarks/bench_snapshot.py --tokens 5000 --lookups 20000
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cmc_stub import StubCmcServer
+from run_benchmarks import Workspace
+
+
+def latency_us(fn, values: list) -> float:
+    start = time.perf_counter()
+    for value in values:
+        fn(value)
+    return round((time.perf_counter() - start) / len(values) * 1e6, 3)
+
+
+def check(d, snap, symbols: list) -> list:
+    from database import By
+
+    mismatches = []
+    for symbol in symbols:
+        addresses = d._query_addresses(symbol)
+        if snap.get_token_info(symbol) != d._query_token_info(symbol):
+            mismatches.append((symbol, "info"))
+        if snap.get_token_addresses(symbol) != addresses:
+            mismatches.append((symbol, "addresses"))
+        for network, address in addresses.items():
+            # EVM addresses are matched case-insensitively.
+            lookup = "0x" + address[2:].upper() if address.startswith("0x") else address
+            if snap.resolve_address(lookup) != d.resolve_address(address):
+                mismatches.append((symbol, "resolve", network))
+            chain_id = d.get_chain_id(network)
+            if chain_id and snap.get_token_address_by_chain_id(symbol, chain_id) != d._query_address(
+                symbol, chain_id, By.ID
+            ):
+                mismatches.append((symbol, "chain id", network))
+    return mismatches
+
+
+def run(args) -> dict:
+    from config import load_config
+    from database import By, Database
+    from snapshot import Snapshot
+
+    rng = random.Random(0)
+    symbols = [f"T{i}" for i in range(1, args.tokens + 1)]
+    sample = [rng.choice(symbols) for _ in range(args.lookups)]
+    report = {}
+    with StubCmcServer(tokens=args.tokens) as stub, Workspace(stub.base_url):
+        d = Database(log=False)
+        d.warm_up(page_size=1000)
+        for network, (chain_id, native) in {
+            "Ethereum": ("1", "ETH"),
+            "BNB Smart Chain (BEP20)": ("56", "BNB"),
+            "Arbitrum": ("42161", "ETH"),
+            "Polygon": ("137", "POL"),
+            "Base": ("8453", "ETH"),
+        }.items():
+            with d.transaction() as cursor:
+                cursor.execute(
+                    """UPDATE Networks SET ChainId = ?, NativeCurrency = ? WHERE NetworkName = ?""",
+                    (chain_id, native, network),
+                )
+        d.rebuild_network_index()
+
+        start = time.perf_counter()
+        file_path = d.export_snapshot()
+        report["export_s"] = round(time.perf_counter() - start, 3)
+        report["snapshot_mb"] = round(os.path.getsize(file_path) / 2**20, 2)
+        report["database_mb"] = round(os.path.getsize(d.database_file) / 2**20, 2)
+
+        start = time.perf_counter()
+        snap = Snapshot.from_config(load_config())
+        report["open_ms"] = round((time.perf_counter() - start) * 1e3, 3)
+
+        mismatches = check(d, snap, symbols)
+        report["mismatches"] = len(mismatches)
+
+        address_sample = [next(iter(d._query_addresses(s).values())) for s in sample[:2000]]
+        report["token_info_us"] = {
+            "snapshot": latency_us(snap.get_token_info, sample),
+            "sqlite": latency_us(d._query_token_info, sample),
+        }
+        report["token_addresses_us"] = {
+            "snapshot": latency_us(snap.get_token_addresses, sample),
+            "sqlite": latency_us(d._query_addresses, sample),
+        }
+        report["token_address_us"] = {
+            "snapshot": latency_us(lambda s: snap.get_token_address(s, "Arbitrum One"), sample),
+            "sqlite": latency_us(lambda s: d._query_address(s, "Arbitrum One", By.Network), sample),
+        }
+        report["resolve_address_us"] = {
+            "snapshot": latency_us(snap.resolve_address, address_sample),
+            "index": latency_us(d.resolve_address, address_sample),
+        }
+
+        # A reader switches to a newly published snapshot on its next check.
+        first = snap.stats()["path"]
+        time.sleep(0.01)
+        d.export_snapshot()
+        snap.reload()
+        report["swapped"] = snap.stats()["path"] != first
+        snap.close()
+        d.close()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    print(json.dumps(report, indent=4))
+    return 0 if report["mismatches"] == 0 and report["swapped"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
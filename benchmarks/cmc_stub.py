@@ -0,0 +1,239 @@
+"""
+Local stand-in for the Coinmarketcap API, serving generated fixtures.
+
+Emulates '/v1/cryptocurrency/map', '/v1/cryptocurrency/quotes/latest' and '/v1/cryptocurrency/info':
+    - Tokens 'T1' ... 'T<n>' with ids 1 ... n, each listed on a few EVM networks and on Solana.
+    - Lookups by 'symbol' or 'id'. Unknown symbols are rejected with a 400, like the real API.
+    - Token pages of the website ('/currencies/token-<i>/'), with the data embedded like the real site.
+    - Optional latency per request, and a 429 (with 'Retry-After') every 'throttle_every' requests.
+
+Used by 'run_benchmarks.py', or standalone:
+
+    python benchmarks/cmc_stub.py --port 8765 --tokens 5000 --latency 0.05 --throttle-every 20
+"""
+
+import json
+import time
+import argparse
+import threading
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NETWORKS = ["Ethereum", "BNB Smart Chain (BEP20)", "Arbitrum", "Polygon", "Base"]
+CHAIN_IDS = {
+    "Ethereum": (1, "ETH"),
+    "BNB Smart Chain (BEP20)": (56, "BNB"),
+    "Arbitrum": (42161, "ETH"),
+    "Polygon": (137, "POL"),
+    "Base": (8453, "ETH"),
+    "Solana": (None, "SOL"),
+}
+
+
+def make_token(i: int) -> dict:
+    # Each token is on 2-4 EVM networks (depending on its id) and on Solana.
+    evm = NETWORKS[: 2 + i % 3]
+    contract_addresses = [
+        {
+            "contract_address": "0x" + format(i * 7919 + n, "040x"),
+            "platform": {"name": network},
+        }
+        for n, network in enumerate(evm)
+    ]
+    contract_addresses.append(
+        {"contract_address": f"So1{i:040d}", "platform": {"name": "Solana"}}
+    )
+    return {
+        "id": i,
+        "name": f"Token {i}",
+        "symbol": f"T{i}",
+        "slug": f"token-{i}",
+        "rank": i,
+        "max_supply": None if i % 5 == 0 else i * 1000,
+        "infinite_supply": i % 5 == 0,
+        "contract_address": contract_addresses,
+    }
+
+
+def render_page(token: dict) -> str:
+    # Same layout as 'fixtures/tether.html': the token is in the '__NEXT_DATA__' script tag.
+    platforms = []
+    for n, item in enumerate(token["contract_address"]):
+        network = item["platform"]["name"]
+        chain_id, native = CHAIN_IDS[network]
+        platform = {
+            "contractId": token["id"] * 10 + n,
+            "contractAddress": item["contract_address"],
+            "contractPlatform": network,
+            "contractNativeCurrencySymbol": native,
+            "contractNativeCurrencyName": native,
+            "sort": n,
+        }
+        if chain_id is not None:
+            platform["contractChainId"] = chain_id
+        platforms.append(platform)
+    detail = {k: token[k] for k in ("id", "name", "symbol", "slug")}
+    detail["platforms"] = platforms
+    data = {"props": {"pageProps": {"detailRes": {"detail": detail}}}, "page": "/currencies/[slug]"}
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><title>{token["name"]}</title></head>'
+        f'<body><div id="__next"><h1>{token["name"]}</h1></div>'
+        f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script></body></html>'
+    )
+
+
+class StubCmcServer:
+    """
+    Stub API server running on a background thread.
+
+    Parameters
+    ----------
+    tokens : int, optional
+        Number of generated tokens, by default 2000
+    latency : float, optional
+        Seconds added to every request, by default 0.0
+    throttle_every : int, optional
+        Answer every n-th request with a 429. Disabled if 0, by default 0
+    retry_after : float, optional
+        'Retry-After' sent with a 429, in seconds, by default 0.05
+    port : int, optional
+        Port to listen on. A free port is picked if 0, by default 0
+    """
+
+    def __init__(
+        self,
+        tokens: int = 2000,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        retry_after: float = 0.05,
+        port: int = 0,
+    ) -> None:
+        self.tokens = {f"T{i}": make_token(i) for i in range(1, tokens + 1)}
+        self.by_id = {t["id"]: t for t in self.tokens.values()}
+        self.by_slug = {t["slug"]: t for t in self.tokens.values()}
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubCmcServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _throttle(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            throttle = self.throttle_every and self.requests % self.throttle_every == 0
+            if throttle:
+                self.throttled += 1
+            return throttle
+
+    def respond(self, path: str, query: dict) -> tuple:
+        """
+        Build the (status, headers, body) of a request.
+        """
+        if self._throttle():
+            return 429, {"Retry-After": str(self.retry_after)}, {"status": {"error_code": 1008}}
+
+        if path.startswith("/currencies/"):
+            token = self.by_slug.get(path.strip("/").split("/")[-1])
+            if token is None:
+                return 404, {"Content-Type": "text/html"}, "<html><body>Not found</body></html>"
+            return 200, {"Content-Type": "text/html"}, render_page(token)
+
+        if path.endswith("/map"):
+            start = int(query.get("start", 1))
+            limit = int(query.get("limit", 100))
+            page = list(self.tokens.values())[start - 1 : start - 1 + limit]
+            data = [
+                {k: t[k] for k in ("id", "name", "symbol", "slug", "rank")} for t in page
+            ]
+            return 200, {}, {"status": {"error_code": 0}, "data": data}
+
+        if "symbol" in query:
+            symbols = query["symbol"].split(",")
+            invalid = [s for s in symbols if s not in self.tokens]
+            if invalid:
+                message = f'Invalid value for "symbol": "{",".join(invalid)}"'
+                return 400, {}, {"status": {"error_code": 400, "error_message": message}}
+            data = {s: self.tokens[s] for s in symbols}
+        elif "id" in query:
+            ids = [int(i) for i in query["id"].split(",")]
+            data = {str(i): self.by_id[i] for i in ids if i in self.by_id}
+        else:
+            return 400, {}, {"status": {"error_code": 400, "error_message": "Missing parameter"}}
+        return 200, {}, {"status": {"error_code": 0}, "data": data}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes, don't let them wait on delayed ACKs.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                status, headers, body = stub.respond(url.path, query)
+                payload = (body if isinstance(body, str) else json.dumps(body)).encode()
+                self.send_response(status)
+                if "Content-Type" not in headers:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Coinmarketcap API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StubCmcServer(
+        tokens=args.tokens,
+        latency=args.latency,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after,
+        port=args.port,
+    )
+    print(f"Serving {args.tokens} tokens on {server.base_url}")
+    server.start()
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,198 @@
+"""
+Offline benchmark suite for the lookup and ingest paths, run against 'cmc_stub.StubCmcServer'.
+
+Creates a throwaway workspace (config, 'crypto.db' and csv files), then measures:
+    - get_token_address latency (p50/p99): cold (queried from the API), stored (read from sqlite) and cached.
+    - Bulk ingest throughput: 'get_token_infos' for missing symbols, and 'warm_up' over the token map.
+    - CSV path ('CoinMarketcapScraper.get_token_address') against the sqlite path ('Database.get_token_address').
+    - Memory: peak traced allocations during ingest, and the max RSS of the process.
+    - Requests, 429s injected by the stub and throttles seen by the scheduler.
+
+Results are printed as JSON, and written to '--output' if given, so runs can be compared:
+
+    python benchmarks/run_benchmarks.py --tokens 3000 --latency 0.002 --throttle-every 50 --output results.json
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cmc_stub import StubCmcServer
+from config import reload_config
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {
+        "n": len(samples),
+        "p50_us": round(pick(0.50) * 1e6, 1),
+        "p99_us": round(pick(0.99) * 1e6, 1),
+        "max_us": round(samples[-1] * 1e6, 1),
+    }
+
+
+def time_calls(fn, args_list: list, before=None) -> dict:
+    samples = []
+    for args in args_list:
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def max_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Workspace:
+    """
+    Temporary working directory with a config pointing the scraper at the stub.
+    Paths are built the way the package builds them ('<dir>\\\\config.json'), so this works on any OS.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        self.path = tempfile.mkdtemp(prefix="cmc_bench_")
+        self.config = {
+            "data_export_path": self.path,
+            "cmc_base_url": base_url,
+            # Far above what the stub is asked for, so only injected 429s throttle.
+            "cmc_plan": {"calls_per_minute": 10**6, "credits_per_day": 10**9},
+        }
+        self._cwd = os.getcwd()
+
+    def __enter__(self):
+        with open(f"{self.path}\\config.json", "w") as file:
+            json.dump(self.config, file)
+        os.chdir(self.path)
+        reload_config()
+        return self
+
+    def __exit__(self, *exc_info):
+        os.chdir(self._cwd)
+        for path in glob.glob(f"{glob.escape(self.path)}\\*"):
+            os.remove(path)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def run(args) -> dict:
+    from database import By, Database
+
+    rng = random.Random(0)
+    symbols = [f"T{i}" for i in range(1, args.tokens + 1)]
+    cold_symbols = symbols[-args.lookups :]
+    bulk_symbols = symbols[-args.lookups - args.bulk : -args.lookups]
+
+    stub = StubCmcServer(
+        tokens=args.tokens,
+        latency=args.latency,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after,
+    )
+    results = {}
+    with stub, Workspace(stub.base_url):
+        d = Database(log=False, cache_size=args.tokens * 2)
+        lookup = lambda s: d.get_token_address(s, "Ethereum", By.Network)
+
+        results["lookup_cold"] = time_calls(lookup, [(s,) for s in cold_symbols])
+
+        start = time.perf_counter()
+        d.get_token_infos(bulk_symbols)
+        seconds = time.perf_counter() - start
+        results["ingest_by_symbol"] = {
+            "tokens": len(bulk_symbols),
+            "seconds": round(seconds, 3),
+            "tokens_per_s": round(len(bulk_symbols) / seconds, 1),
+        }
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        inserted = d.warm_up(page_size=args.page_size)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results["ingest_warm_up"] = {
+            "tokens": inserted,
+            "seconds": round(seconds, 3),
+            "tokens_per_s": round(inserted / seconds, 1) if seconds else None,
+            "peak_traced_mb": round(peak / 2**20, 2),
+        }
+
+        sample = [(s,) for s in rng.sample(symbols, min(args.lookups, len(symbols)))]
+        results["lookup_stored"] = time_calls(lookup, sample, before=d.cache.clear)
+        results["lookup_cached"] = time_calls(lookup, sample)
+
+        # The csv path needs the chain id of the network, and the addresses in its store.
+        cmc = d.cmc
+        cmc.add_chain_id("Ethereum", 1)
+        cmc.update_token_addresses([s for (s,) in sample])
+        results["csv_vs_sqlite"] = {
+            "csv": time_calls(lambda s: cmc.get_token_address(s, 1), sample),
+            "sqlite": time_calls(lookup, sample, before=d.cache.clear),
+        }
+
+        results["requests"] = {
+            "stub_requests": stub.requests,
+            "stub_429s": stub.throttled,
+            "scheduler": cmc.scheduler.remaining(),
+        }
+        d.close()
+
+    results["memory"] = {"max_rss_mb": max_rss_mb()}
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=3000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--bulk", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.002, help="Seconds per stub request.")
+    parser.add_argument("--throttle-every", type=int, default=50, help="0 disables 429s.")
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    parser.add_argument("--output", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": vars(args),
+        },
+    }
+    # Keep stdout for the report.
+    with contextlib.redirect_stdout(sys.stderr):
+        report["results"] = run(args)
+    output = json.dumps(report, indent=4)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class BrowserPool:
+    """
+    Bounded pool of browsers, reused between calls instead of launching Chrome for each one.
+        - Browsers are created on demand, up to 'size'.
+        - When every browser is in use, callers wait for one to be released.
+        - A browser that raised while in use is quit and replaced on the next acquire.
+
+    Parameters
+    ----------
+    factory : Callable
+        Function creating a browser (e.g. a 'webdriver.Chrome').
+    size : int, optional
+        Maximum number of browsers, by default 2
+    timeout : float, optional
+        Seconds to wait for a free browser. Waits forever if None, by default None
+    """
+
+    def __init__(self, factory, size: int = 2, timeout: float = None) -> None:
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """
+        Get an idle browser, or create one if the pool isn't full yet.
+        Raises TimeoutError if none is released within 'timeout'.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No browser released within {self.timeout}s.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            browser = self.factory()
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._all.append(browser)
+            self.created += 1
+        return browser
+
+    def release(self, browser, broken: bool = False) -> None:
+        """
+        Give a browser back to the pool. A broken browser is quit instead of being reused.
+        """
+        if broken:
+            self._discard(browser)
+        else:
+            self._idle.put(browser)
+        self._slots.release()
+
+    @contextmanager
+    def browser(self):
+        """
+        Context manager lending a browser for the duration of the block.
+        """
+        browser = self.acquire()
+        try:
+            yield browser
+        except BaseException:
+            self.release(browser, broken=True)
+            raise
+        else:
+            self.release(browser)
+
+    def _discard(self, browser) -> None:
+        with self._lock:
+            if browser in self._all:
+                self._all.remove(browser)
+        try:
+            browser.quit()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """
+        Quit every browser of the pool.
+        """
+        with self._lock:
+            browsers, self._all = self._all, []
+        for browser in browsers:
+            try:
+                browser.quit()
+            except Exception:
+                pass
+        self._idle = queue.LifoQueue()
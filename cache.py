@@ -0,0 +1,113 @@
+import time
+import threading
+from collections import OrderedDict
+
+from metrics import METRICS
+
+
+class TTLCache:
+    """
+    Bounded in-memory cache with least-recently-used eviction and an optional time to live.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries to keep, by default 4096
+    ttl : float, optional
+        Seconds an entry stays valid. 'None' keeps entries until they are evicted, by default 300
+    name : str, optional
+        Label of the hit/miss metrics ('cache_requests_total'), by default "lookups"
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300, name: str = "lookups") -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Get a value from the cache.
+
+        Parameters
+        ----------
+        key : Hashable
+            Key of the entry.
+        default : optional
+            Value returned when the key is missing or expired, by default None
+
+        Returns
+        -------
+        Any
+            Cached value or 'default'.
+        """
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                self.misses += 1
+                value, expires = default, None
+                hit = False
+            else:
+                hit = expires is None or expires >= time.monotonic()
+                if hit:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                else:
+                    del self._data[key]
+                    self.misses += 1
+                    value = default
+        if METRICS.enabled:
+            METRICS.inc("cache_requests_total", cache=self.name, result="hit" if hit else "miss")
+        return value
+
+    def set(self, key, value) -> None:
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate) -> None:
+        """
+        Remove every entry whose key matches 'predicate'.
+
+        Parameters
+        ----------
+        predicate : Callable
+            Function taking a key and returning True if the entry should be removed.
+        """
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns
+        -------
+        dict
+            Hit/miss counters and the current size of the cache.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
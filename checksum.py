@@ -0,0 +1,131 @@
+import re
+import threading
+from collections import OrderedDict
+
+from lazy_import import lazy_import
+
+# Only keccak is needed, not the whole of web3.
+eth_hash = lazy_import("eth_hash.auto")
+
+_EVM_ADDRESS = re.compile(r"0[xX][0-9a-fA-F]{40}")
+_UPPER_NIBBLES = frozenset("89abcdef")
+
+
+def is_evm_address(address) -> bool:
+    """
+    Check if 'address' is a hex EVM address ('0x' followed by 40 hex digits).
+    Addresses of other chains (Solana, Cosmos, ...) return False.
+    """
+    return isinstance(address, str) and _EVM_ADDRESS.fullmatch(address) is not None
+
+
+def _checksum(address: str) -> str:
+    # EIP-55: a letter is uppercased when the matching nibble of keccak(lowercase hex) is 8 or more.
+    lower = address[2:].lower()
+    digest = eth_hash.keccak(lower.encode("ascii")).hex()
+    return "0x" + "".join(
+        c.upper() if d in _UPPER_NIBBLES else c for c, d in zip(lower, digest)
+    )
+
+
+class Checksummer:
+    """
+    EIP-55 checksumming with a bounded memo of addresses already seen.
+        - Batches are deduplicated, and the memo lock is taken once per batch.
+        - Addresses that are not hex EVM addresses are returned unchanged.
+        - Least recently used addresses are evicted once 'maxsize' is reached.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of addresses to remember, by default 100000
+    """
+
+    def __init__(self, maxsize: int = 100000) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Keyed by the lowercase address, so any casing of the same address hits.
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def checksum(self, address: str) -> str:
+        """
+        Checksum a single address.
+        """
+        return self.checksum_many([address])[0]
+
+    def checksum_many(self, addresses) -> list:
+        """
+        Checksum a list or array of addresses in one call.
+
+        Parameters
+        ----------
+        addresses : Iterable
+            Addresses to checksum. Non-EVM addresses and non-string values are passed through.
+
+        Returns
+        -------
+        list
+            Checksummed addresses, in the same order.
+        """
+        addresses = list(addresses)
+        keys = [a.lower() if is_evm_address(a) else None for a in addresses]
+
+        results = {}
+        with self._lock:
+            memo = self._memo
+            for key in keys:
+                if key is None or key in results:
+                    continue
+                value = memo.get(key)
+                if value is not None:
+                    memo.move_to_end(key)
+                    results[key] = value
+                    self.hits += 1
+
+        # Hashing happens outside the lock.
+        missing = {key for key in keys if key is not None and key not in results}
+        computed = {key: _checksum(key) for key in missing}
+        if computed:
+            results.update(computed)
+            with self._lock:
+                self.misses += len(computed)
+                self._memo.update(computed)
+                while len(self._memo) > self.maxsize:
+                    self._memo.popitem(last=False)
+
+        return [
+            address if key is None else results[key]
+            for address, key in zip(addresses, keys)
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memo.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._memo),
+                "maxsize": self.maxsize,
+            }
+
+
+_default_checksummer = Checksummer()
+
+
+def to_checksum_address(address: str) -> str:
+    """
+    Checksum an address with the process wide memo. Non-EVM addresses are returned unchanged.
+    """
+    return _default_checksummer.checksum(address)
+
+
+def to_checksum_addresses(addresses) -> list:
+    """
+    Checksum a list or array of addresses with the process wide memo. Non-EVM addresses are returned unchanged.
+    """
+    return _default_checksummer.checksum_many(addresses)
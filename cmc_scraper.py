@@ -1,30 +1,41 @@
-import os
-import json
-import requests
-
-from web3 import Web3
-
-from dotenv import load_dotenv
-
-load_dotenv()
-
-import pandas as pd
+from __future__ import annotations
 
-pd.set_option("display.float_format", "{:.0f}".format)
-
-
-# Selenium imports
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import (
-    NoSuchElementException,
-    TimeoutException,
-    StaleElementReferenceException,
+import os
+import re
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from config import get_api_key, load_config
+from lazy_import import lazy_import
+
+# Imported on first use, so importing this module (or 'database') doesn't pay for them.
+requests = lazy_import("requests")
+pd = lazy_import(
+    "pandas", setup=lambda pd: pd.set_option("display.float_format", "{:.0f}".format)
+)
+np = lazy_import("numpy")
+
+from checksum import to_checksum_addresses
+from browser_pool import BrowserPool
+from csv_store import CsvStore
+from html_scraper import DEFAULT_SITE_URL, HtmlScraper, parse_token_page
+from metrics import METRICS, instrument
+from network_index import NetworkIndex, default_aliases
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    CreditScheduler,
+    credit_cost,
+    get_default_scheduler,
+    parse_retry_after,
 )
 
+# Selenium is imported by the browser operations that use it.
+
 import logging
 
 # Suppress logging from Selenium and other related modules
@@ -33,6 +44,9 @@ logging.getLogger("urllib3").setLevel(logging.WARNING)
 logging.getLogger("http").setLevel(logging.WARNING)
 logging.getLogger("asyncio").setLevel(logging.WARNING)
 
+# Progress messages are logged at INFO, skipped symbols and throttling at WARNING, API errors at ERROR.
+logger = logging.getLogger(__name__)
+
 
 chain_ids = {
     "Arbitrum": 42161,
@@ -43,62 +57,180 @@ chain_ids = {
 }
 
 
+@instrument
 class CoinMarketcapScraper:
-    def __init__(self, log: bool = True) -> None:
-        self.key = os.getenv("COINMARKETCAP_KEY")
-        self.base_url = "https://pro-api.coinmarketcap.com"
+    def __init__(
+        self,
+        log: bool = True,
+        pool_size: int = 10,
+        scheduler: CreditScheduler = None,
+        response_cache: ResponseCache = None,
+    ) -> None:
+        self.key = get_api_key()
+        # Overridable with the 'cmc_base_url' config key, e.g. to point at a local stub.
+        self.base_url = self._read_config().get(
+            "cmc_base_url", "https://pro-api.coinmarketcap.com"
+        )
         self.export_path = self._get_data_export_path()
         os.makedirs(self.export_path, exist_ok=True)
         self.log = log
 
+        # Maximum number of symbols sent in a single API request.
+        self.batch_size = 100
+
+        # Every API call goes through the scheduler. By default it is shared by all scrapers in the process.
+        if scheduler is None:
+            scheduler = get_default_scheduler(self._read_config().get("cmc_plan"))
+        self.scheduler = scheduler
+
+        if self._read_config().get("metrics"):
+            METRICS.enable()
+
+        # Optional on-disk cache of API responses, configured with the 'response_cache' config key.
+        if response_cache is None:
+            response_cache = ResponseCache.from_config(self._read_config(), self.export_path)
+        self.response_cache = response_cache
+
+        # Resolves other names of networks ("Arbitrum One", "bsc") to the Coinmarketcap names used in the csv files.
+        self._network_aliases = default_aliases(NetworkIndex())
+
+        # Concurrent misses for the same ticker share one request.
+        self._inflight = SingleFlight()
+
+        # Persistent session, so connections to the API are kept alive and reused.
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Website pages are read over HTTP ('html'). Browsers are only started for '_create_browser' or
+        # 'use_browser=True', and are reused from a bounded pool.
+        self.site_url = self._read_config().get("cmc_site_url", DEFAULT_SITE_URL)
+        self.browser = None
+        # Set when a browser operation fails, '_clean_close' then quits the browser instead of pooling it.
+        self._browser_broken = False
+        self._html = None
+        self._browser_pool = None
+        self._browser_lock = threading.Lock()
+
         # Paths to files
         self.chain_id_path = f"{self.export_path}\\chain_id.csv"
         self.token_address_path = f"{self.export_path}\\token_address.csv"
+        self.token_info_path = f"{self.export_path}\\token_info.csv"
+
+        # Files are loaded once and kept in memory. Changes are written back in batches.
+        self._token_info_store = CsvStore(self.token_info_path, "symbol")
+        self._address_store = CsvStore(self.token_address_path, "ticker", dtype=str)
+        self._chain_id_store = CsvStore(self.chain_id_path, "name", dtype=str)
+
+    def flush(self) -> None:
+        """
+        Write pending changes of the local csv files to disk.
+        """
+        self._token_info_store.flush()
+        self._address_store.flush()
+        self._chain_id_store.flush()
+
+    def close(self) -> None:
+        """
+        Write pending changes and close the pooled connections.
+        """
+        self.flush()
+        self.session.close()
+        if self._browser_pool is not None:
+            self._browser_pool.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    def _read_config(self) -> dict:
+        # Read once per process and shared with 'Database'.
+        return load_config()
 
     def _get_data_export_path(self):
-        try:
-            internal_path = f"{os.getcwd()}\\config.json"
-            with open(internal_path, "r") as file:
-                data = json.load(file)
-            return data["data_export_path"]
-        except FileNotFoundError:
-            external_path = f"{os.getcwd()}\\CoinMarketcapScraper\\config.json"
-            with open(external_path, "r") as file:
-                data = json.load(file)
-            return data["data_export_path"]
+        return self._read_config()["data_export_path"]
 
     """-----------------------------------"""
     """----------------------------------- Browser Operations -----------------------------------"""
 
     def _get_chrome_driver_path(self):
-        try:
-            internal_path = f"{os.getcwd()}\\config.json"
-            with open(internal_path, "r") as file:
-                data = json.load(file)
-            return data["chrome_driver_path"]
-        except FileNotFoundError:
-            external_path = f"{os.getcwd()}\\CoinMarketcapScraper\\config.json"
-            with open(external_path, "r") as file:
-                data = json.load(file)
-            return data["chrome_driver_path"]
+        return self._read_config()["chrome_driver_path"]
+
+    def _get_chrome_options(self):
+        from selenium import webdriver
+
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        return options
+
+    def _new_browser(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        service = Service(executable_path=self._get_chrome_driver_path())
+        return webdriver.Chrome(service=service, options=self._get_chrome_options())
+
+    @property
+    def browser_pool(self) -> BrowserPool:
+        """
+        Browsers shared by the scraper, at most 'browser_pool_size' from the config (2 by default).
+        Waiting for a free browser raises TimeoutError after 'browser_pool_timeout' seconds (60 by default).
+        """
+        if self._browser_pool is None:
+            with self._browser_lock:
+                if self._browser_pool is None:
+                    config = self._read_config()
+                    self._browser_pool = BrowserPool(
+                        self._new_browser,
+                        size=config.get("browser_pool_size", 2),
+                        timeout=config.get("browser_pool_timeout", 60),
+                    )
+        return self._browser_pool
 
     def _create_browser(self, url=None):
         """
-        :param url: The website to visit.
+        :param url: The website to visit, the Coinmarketcap homepage if None.
         :return: None
         """
-        service = Service(executable_path=self.chrome_driver_path)
-        self.browser = webdriver.Chrome(service=service, options=self.chrome_options)
-        # Default browser route
-        if url == None:
-            self.browser.get(url=self.sec_annual_url)
-        # External browser route
-        else:
-            self.browser.get(url=url)
+        # A browser already borrowed is given back first, each scraper holds at most one.
+        self._clean_close()
+        # Borrowed from the pool, '_clean_close' gives it back.
+        self.browser = self.browser_pool.acquire()
+        self._browser_broken = False
+        try:
+            with self._track_browser_errors():
+                self.browser.get(url=url if url is not None else self.site_url)
+        except BaseException:
+            self._clean_close()
+            raise
 
-    def _clean_close(self) -> None:
-        self.browser.close()
-        self.browser.quit()
+    def _clean_close(self, broken: bool = None) -> None:
+        """
+        Give the browser back to the pool. It is quit instead if 'broken', which defaults to whether
+        a browser operation failed since it was borrowed.
+        """
+        if self.browser is not None:
+            if broken is None:
+                broken = self._browser_broken
+            self.browser_pool.release(self.browser, broken=broken)
+            self.browser = None
+            self._browser_broken = False
+
+    @contextmanager
+    def _track_browser_errors(self):
+        # Element lookups that fail or time out leave the browser usable, any other error marks it broken.
+        from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+        try:
+            yield
+        except (NoSuchElementException, TimeoutException):
+            raise
+        except BaseException:
+            self._browser_broken = True
+            raise
 
     def _read_data(
         self, xpath: str, wait: bool = False, _wait_time: int = 5, tag: str = ""
@@ -109,27 +241,32 @@ class CoinMarketcapScraper:
         :param wait_time: Integer that represents how many seconds selenium should wait, if wait is True.
         :return: (str) Text of the element.
         """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
-        if wait:
-            try:
-                data = (
-                    WebDriverWait(self.browser, _wait_time)
-                    .until(EC.presence_of_element_located((By.XPATH, xpath)))
-                    .text
-                )
-            except TimeoutException:
-                print(f"[Failed Xpath] {xpath}")
-                if tag != "":
-                    print(f"[Tag]: {tag}")
-                raise NoSuchElementException("Element not found")
-            except NoSuchElementException:
-                print(f"[Failed Xpath] {xpath}")
-                return "N\A"
-        else:
-            try:
-                data = self.browser.find_element("xpath", xpath).text
-            except NoSuchElementException:
-                data = "N\A"
+        with self._track_browser_errors():
+            if wait:
+                try:
+                    data = (
+                        WebDriverWait(self.browser, _wait_time)
+                        .until(EC.presence_of_element_located((By.XPATH, xpath)))
+                        .text
+                    )
+                except TimeoutException:
+                    logger.debug("[Failed Xpath] %s", xpath)
+                    if tag != "":
+                        logger.debug("[Tag]: %s", tag)
+                    raise NoSuchElementException("Element not found")
+                except NoSuchElementException:
+                    logger.debug("[Failed Xpath] %s", xpath)
+                    return "N\A"
+            else:
+                try:
+                    data = self.browser.find_element("xpath", xpath).text
+                except NoSuchElementException:
+                    data = "N\A"
         # Return the text of the element found.
         return data
 
@@ -147,26 +284,93 @@ class CoinMarketcapScraper:
         :param wait_time: Integer that represents how many seconds selenium should wait, if wait is True.
         :return: None. Because this function clicks the button but does not return any information about the button or any related web elements.
         """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
-        if wait:
-            try:
-                element = WebDriverWait(self.browser, _wait_time).until(
-                    EC.presence_of_element_located((By.XPATH, xpath))
-                )
-                # If the webdriver needs to scroll before clicking the element.
+        with self._track_browser_errors():
+            if wait:
+                try:
+                    element = WebDriverWait(self.browser, _wait_time).until(
+                        EC.presence_of_element_located((By.XPATH, xpath))
+                    )
+                    # If the webdriver needs to scroll before clicking the element.
+                    if scroll:
+                        self.browser.execute_script("arguments[0].click();", element)
+                    element.click()
+                except TimeoutException:
+                    logger.debug("[Failed Xpath] %s", xpath)
+                    if tag != "":
+                        logger.debug("[Tag]: %s", tag)
+                    raise NoSuchElementException("Element not found")
+            else:
+                element = self.browser.find_element("xpath", xpath)
                 if scroll:
                     self.browser.execute_script("arguments[0].click();", element)
                 element.click()
-            except TimeoutException:
-                print(f"[Failed Xpath] {xpath}")
-                if tag != "":
-                    print(f"[Tag]: {tag}")
-                raise NoSuchElementException("Element not found")
-        else:
-            element = self.browser.find_element("xpath", xpath)
-            if scroll:
-                self.browser.execute_script("arguments[0].click();", element)
-            element.click()
+
+    """--------------------------------------------------------------------------- Website ---------------------------------------------------------------------------"""
+
+    @property
+    def html(self) -> HtmlScraper:
+        # Shares the pooled session of the API requests.
+        if self._html is None:
+            self._html = HtmlScraper(self.session, site_url=self.site_url)
+        return self._html
+
+    def scrape_token_page(self, slug: str, use_browser: bool = False) -> dict:
+        """
+        Read the networks a token is deployed on from its Coinmarketcap page.
+
+        Parameters
+        ----------
+        slug : str
+            Slug of the token, e.g. "tether".
+        use_browser : bool, optional
+            Render the page with a pooled browser instead of fetching it over HTTP, by default False
+
+        Returns
+        -------
+        dict
+            'id', 'name', 'symbol', 'slug' and 'platforms', one dict per network with its name, contract address,
+            chain id and native currency. See 'html_scraper.parse_token_page'.
+        """
+        if not use_browser:
+            return self.html.get_token_page(slug)
+        with self.browser_pool.browser() as browser:
+            browser.get(self.html.token_page_url(slug))
+            html = browser.page_source
+        return parse_token_page(html)
+
+    def add_chain_ids_from_page(self, slug: str, use_browser: bool = False) -> list:
+        """
+        Add the chain ids of the networks listed on a token's page to 'chain_id.csv'.
+        Networks without a chain id (non-EVM) and networks already saved are skipped.
+
+        Parameters
+        ----------
+        slug : str
+            Slug of the token, e.g. "tether".
+        use_browser : bool, optional
+            Render the page with a pooled browser instead of fetching it over HTTP, by default False
+
+        Returns
+        -------
+        list
+            Names of the networks added.
+        """
+        page = self.scrape_token_page(slug, use_browser=use_browser)
+        added = []
+        for platform in page["platforms"]:
+            network, chain_id = platform["network"], platform["chain_id"]
+            if chain_id is None or self._chain_id_store.get_value(network, "id") is not None:
+                continue
+            self._chain_id_store.set_value(network, "id", self._normalize_chain_id(chain_id))
+            added.append(network)
+        if self.log:
+            logger.info("[add_chain_ids_from_page()] Added chain ids of %s networks.", len(added))
+        return added
 
     """--------------------------------------------------------------------------- Token Info ---------------------------------------------------------------------------"""
 
@@ -184,28 +388,23 @@ class CoinMarketcapScraper:
         Returns
         -------
         pd.Series
-            Series containing token information.
+            Series containing token information. Empty if the token could not be found.
         """
-        path = f"{self.export_path}\\token_info.csv"
         ticker = ticker.upper()
-        try:
-            df = pd.read_csv(path)
-            df.rename(columns={"Unnamed: 0": "symbol"}, inplace=True)
-            df.set_index("symbol", inplace=True)
-            try:
-                data = df.loc[ticker]
-                return data
-            except KeyError:
-                new_df = self._query_token_info(ticker)
-                new_data = new_df.loc[ticker]
-                df.loc[ticker] = new_data
-                df.to_csv(path)
-                return new_data
-        except FileNotFoundError:
-            df = self._query_token_info(ticker)
-            df.to_csv(path)
-            data = df.loc[ticker]
-            return data
+        store = self._token_info_store
+        if ticker not in store:
+            self._inflight.do(("info", ticker), self._fetch_token_info, ticker)
+        if ticker not in store:
+            return pd.Series(dtype=object)
+        return pd.Series(store.get(ticker), index=store.columns, name=ticker)
+
+    def _fetch_token_info(self, ticker: str):
+        # Checked again, another thread may have fetched it while this one waited.
+        if ticker not in self._token_info_store:
+            # Unknown tickers and failed requests are left out of the frame, and nothing is stored.
+            new_df = self._query_token_infos([ticker])
+            for row_ticker, data in new_df.to_dict("index").items():
+                self._token_info_store.set(row_ticker, data)
 
     def _query_token_info(self, ticker: str):
         url = f"{self.base_url}/v1/cryptocurrency/quotes/latest"
@@ -213,106 +412,317 @@ class CoinMarketcapScraper:
         params = self._get_request_params(ticker)
 
         # Make the API request
-        response = requests.get(
-            url, headers=params["headers"], params=params["parameters"]
-        )
+        response = self._get(url, params)
 
         # Check if the request was successful
         if response.status_code == 200:
             data = response.json()
             token_data = data["data"][ticker]
 
-            data = {
-                "id": token_data["id"],
-                "name": token_data["name"],
-                "slug": token_data["slug"],
-                "max_supply": token_data["max_supply"],
-                "infinite_supply": token_data["infinite_supply"],
-            }
+            data = self._parse_token_info(token_data)
             df = pd.DataFrame(columns=list(data.keys()))
             df.loc[ticker] = data
             if self.log:
-                print(f"[TokenInfo] Info queried from Coinmarketcap.")
+                logger.info("[TokenInfo] Info queried from Coinmarketcap.")
             return df
 
         else:
-            print("ERROR")
+            logger.error(
+                "[_query_token_info()] ERROR %s: %s", response.status_code, response.text
+            )
+
+    def get_token_infos(self, tickers: list) -> pd.DataFrame:
+        """
+        Get the token info for multiple tickers.
+            - Reads the local file once.
+            - Tickers not found locally are queried from 'Coinmarketcap' API in batches.
+
+        Parameters
+        ----------
+        tickers : list
+            Ticker symbols of the tokens.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataframe containing token information, indexed by ticker.
+        """
+        tickers = self._normalize_tickers(tickers)
+        store = self._token_info_store
+        missing = [t for t in tickers if t not in store]
+        if missing:
+            new_df = self._query_token_infos(missing)
+            for ticker, data in new_df.to_dict("index").items():
+                store.set(ticker, data)
+
+        found = [t for t in tickers if t in store]
+        return pd.DataFrame.from_dict(
+            {t: store.get(t) for t in found}, orient="index", columns=store.columns
+        )
+
+    def _query_token_infos(
+        self, tickers: list, priority: int = PRIORITY_INTERACTIVE, raise_errors: bool = False
+    ) -> pd.DataFrame:
+        """
+        Query token info for multiple tickers from 'Coinmarketcap' API.
+        Tickers are sent as comma separated batches of 'self.batch_size'.
+
+        Parameters
+        ----------
+        tickers : list
+            Ticker symbols of the tokens.
+        priority : int, optional
+            Scheduling priority of the API calls, by default PRIORITY_INTERACTIVE
+        raise_errors : bool, optional
+            Raise 'requests.HTTPError' on a failed request, instead of leaving its tickers out, by default False
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataframe containing token information, indexed by ticker.
+            Tickers unknown to Coinmarketcap are left out.
+        """
+        url = f"{self.base_url}/v1/cryptocurrency/quotes/latest"
+        tickers = self._normalize_tickers(tickers)
+        rows = {}
+        for batch in self._chunk(tickers, self.batch_size):
+            data = self._query_batch(url, batch, priority, raise_errors)
+            for ticker, token_data in data.items():
+                rows[ticker] = self._parse_token_info(token_data)
+
+        df = pd.DataFrame.from_dict(
+            rows,
+            orient="index",
+            columns=["id", "name", "slug", "max_supply", "infinite_supply"],
+        )
+        if self.log:
+            logger.info("[TokenInfo] Info for %s tokens queried from Coinmarketcap.", len(df))
+        return df
+
+    def _parse_token_info(self, token_data: dict) -> dict:
+        return {
+            "id": token_data["id"],
+            "name": token_data["name"],
+            "slug": token_data["slug"],
+            "max_supply": token_data["max_supply"],
+            "infinite_supply": token_data["infinite_supply"],
+        }
 
     """--------------------------------------------------------------------------- Token Address ---------------------------------------------------------------------------"""
 
     def get_token_address(self, ticker, chain_id):
-        path = f"{self.export_path}\\token_address.csv"
-        try:
-            df = pd.read_csv(path)
-            df.rename(columns={"Unnamed: 0": "ticker"}, inplace=True)
-            df.set_index("ticker", inplace=True)
-            platform = self.get_network_name(chain_id)
-            try:
-                address = df.loc[ticker, platform]
-                return address
-            except KeyError:
-                base_cols = self.get_supported_platforms()
-                new_df = self._query_token_address(ticker)
-
-                merged_df = self._merge_dataframes(df, new_df)
-                merged_df.to_csv(self.token_address_path)
-
-                if self.log:
-                    new_cols = new_df.columns
-                    untracked_networks = [
-                        item for item in new_cols if item not in base_cols
-                    ]
-
-                    print(
-                        f"Untracked Networks: {untracked_networks}\nAdd these networks with 'cmc.add_chain_id(network, chain_id)'"
-                    )
+        ticker = ticker.upper()
+        store = self._address_store
+        platform = self.get_network_name(chain_id)
+        if ticker not in store:
+            self._inflight.do(("address", ticker), self._fetch_token_address, ticker)
+        return store.get_value(ticker, platform)
+
+    def _fetch_token_address(self, ticker: str):
+        store = self._address_store
+        if ticker not in store:
+            base_cols = self.get_supported_platforms() or []
+            queried = self._query_contract_addresses([ticker])
+            # Left out when the request failed, nothing is stored so the next lookup queries it again.
+            if ticker not in queried:
+                return
+            addresses = queried[ticker]
+            store.set(ticker, addresses)
+
+            if self.log:
+                untracked_networks = [
+                    item for item in addresses if item not in base_cols
+                ]
 
-        except FileNotFoundError:
-            df = self._query_token_address(ticker)
-            df.to_csv(path)
-            platform = self.get_network_name(chain_id)
-            address = df.loc[ticker, platform]
-            return address
+                logger.warning(
+                    "Untracked Networks: %s\nAdd these networks with 'cmc.add_chain_id(network, chain_id)'",
+                    untracked_networks,
+                )
 
     def _query_token_address(self, ticker):
         ticker = ticker.upper()
         url = f"{self.base_url}/v1/cryptocurrency/info"
         params = self._get_request_params(ticker)
         # Make the API request
-        response = requests.get(
-            url, headers=params["headers"], params=params["parameters"]
-        )
-        # Dataframe to hold token data.
-        df = pd.DataFrame()
+        response = self._get(url, params)
         # Check if the request was successful
         if response.status_code == 200:
             data = response.json()
-            data = data["data"][ticker]["contract_address"]
-
-            for d in data:
-                contract_address = d["contract_address"]
-                platform = d["platform"]["name"]
-                try:
-                    contract_address = Web3.to_checksum_address(contract_address)
-                except ValueError:
-                    pass
-                df.loc[ticker, platform] = contract_address
+            addresses = self._parse_contract_addresses(data["data"][ticker])
+            # Built in one step, assigning cells one by one reallocates the frame for every network.
+            df = pd.DataFrame.from_dict({ticker: addresses}, orient="index")
             if self.log:
-                print(f"[TokenAddress] Address queried from Coinmarketcap.")
+                logger.info("[TokenAddress] Address queried from Coinmarketcap.")
             return df
 
-    def update_token_address(self, ticker: str):
+    def _query_token_addresses(self, tickers: list) -> pd.DataFrame:
+        """
+        Query token addresses for multiple tickers from 'Coinmarketcap' API.
+
+        Parameters
+        ----------
+        tickers : list
+            Ticker symbols of the tokens.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataframe with a row per ticker and a column per network.
+        """
+        addresses = self._query_contract_addresses(tickers)
+        return pd.DataFrame.from_dict(addresses, orient="index")
+
+    def _query_contract_addresses(
+        self, tickers: list, priority: int = PRIORITY_INTERACTIVE, raise_errors: bool = False
+    ) -> dict:
+        """
+        Query contract addresses for multiple tickers from 'Coinmarketcap' API.
+        Tickers are sent as comma separated batches of 'self.batch_size'.
+
+        Parameters
+        ----------
+        tickers : list
+            Ticker symbols of the tokens.
+        priority : int, optional
+            Scheduling priority of the API calls, by default PRIORITY_INTERACTIVE
+        raise_errors : bool, optional
+            Raise 'requests.HTTPError' on a failed request, instead of leaving its tickers out, by default False
+
+        Returns
+        -------
+        dict
+            Mapping of ticker to a dictionary of {network: address}.
+            Tickers unknown to Coinmarketcap are left out.
+        """
+        url = f"{self.base_url}/v1/cryptocurrency/info"
+        tickers = self._normalize_tickers(tickers)
+        addresses = {}
+        for batch in self._chunk(tickers, self.batch_size):
+            data = self._query_batch(url, batch, priority, raise_errors)
+            for ticker, token_data in data.items():
+                addresses[ticker] = self._parse_contract_addresses(token_data)
+        if self.log:
+            logger.info(
+                "[TokenAddress] Addresses for %s tokens queried from Coinmarketcap.",
+                len(addresses),
+            )
+        return addresses
+
+    def _parse_contract_addresses(self, token_data: dict) -> dict:
+        platforms = [d["platform"]["name"] for d in token_data["contract_address"]]
+        # EVM addresses are checksummed in one call, other chains are kept as is.
+        contract_addresses = to_checksum_addresses(
+            d["contract_address"] for d in token_data["contract_address"]
+        )
+        return dict(zip(platforms, contract_addresses))
+
+    def _query_batch(
+        self,
+        url: str,
+        tickers: list,
+        priority: int = PRIORITY_INTERACTIVE,
+        raise_errors: bool = False,
+    ) -> dict:
+        """
+        Request data for a batch of tickers in a single API call.
+        If Coinmarketcap rejects some of the symbols, they are dropped and the request is retried once.
+
+        Parameters
+        ----------
+        url : str
+            Endpoint to query.
+        tickers : list
+            Ticker symbols to include in the 'symbol' parameter.
+        priority : int, optional
+            Scheduling priority of the API call, by default PRIORITY_INTERACTIVE
+        raise_errors : bool, optional
+            Raise 'requests.HTTPError' if the request fails, by default False
+
+        Returns
+        -------
+        dict
+            The 'data' field of the response, keyed by ticker. Empty if the request failed.
+        """
+        if not tickers:
+            return {}
+        params = self._get_request_params(",".join(tickers))
+        response = self._get(url, params, items=len(tickers), priority=priority)
+        if response.status_code == 200:
+            data = response.json()["data"]
+            return {t: data[t] for t in tickers if t in data}
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        invalid = self._get_invalid_symbols(body)
+        valid = [t for t in tickers if t not in invalid]
+        if len(valid) < len(tickers):
+            if self.log:
+                logger.warning("[_query_batch()] Skipping unknown symbols: %s", sorted(invalid))
+            return self._query_batch(url, valid, priority, raise_errors)
+
+        logger.error("[_query_batch()] ERROR %s: %s", response.status_code, response.text)
+        if raise_errors:
+            response.raise_for_status()
+        return {}
+
+    def _get_invalid_symbols(self, body: dict) -> set:
+        """
+        Extract the symbols Coinmarketcap reported as invalid from the body of an error response.
+        """
+        try:
+            message = body["status"]["error_message"] or ""
+        except (KeyError, TypeError):
+            return set()
+        match = re.search(r'"symbol":\s*"([^"]+)"', message)
+        if match is None:
+            return set()
+        return {s.strip().upper() for s in match.group(1).split(",")}
+
+    def _normalize_tickers(self, tickers: list) -> list:
+        """
+        Uppercase tickers and drop duplicates, while keeping their order.
+        """
+        return self._merge_lists([], [t.upper() for t in tickers])
+
+    def _chunk(self, items: list, size: int) -> list:
+        return [items[i : i + size] for i in range(0, len(items), size)]
+
+    def update_token_address(self, ticker: str) -> dict:
+        """
+        Query the addresses of a token from 'Coinmarketcap' and merge them into the local csv file.
+
+        Parameters
+        ----------
+        ticker : str
+            Ticker of the token to update.
+
+        Returns
+        -------
+        dict
+            Dictionary of {network: address} of the token after the update.
+        """
         ticker = ticker.upper()
+        self.update_token_addresses([ticker])
+        return dict(self._address_store.get(ticker) or {})
+
+    def update_token_addresses(self, tickers: list) -> None:
+        """
+        Query the addresses of multiple tokens and merge them into the local csv file in one pass.
+        New networks are added as columns. Addresses no longer listed by Coinmarketcap are kept.
 
-        df = pd.read_csv(self.token_address_path)
-        df.set_index("ticker", inplace=True)
-        new_df = self._query_token_address(ticker)
-        merged_df = self._merge_dataframes(df, new_df)
-        print(f"Merged: {merged_df}")
-        # merged_df.to_csv()
-        # print(df)
+        Parameters
+        ----------
+        tickers : list
+            Tickers of the tokens to update.
+        """
+        new_df = self._query_token_addresses(tickers)
+        self._address_store.merge_frame(new_df)
+        if self.log:
+            logger.info("[TokenAddress] Addresses of %s tokens updated.", len(new_df))
 
-    def delete_token_address(self, ticker: str, chain_id):
+    def delete_token_address(self, ticker: str, chain_id=None) -> bool:
         """
         Delete token address from local csv file.
 
@@ -320,11 +730,29 @@ class CoinMarketcapScraper:
         ----------
         ticker : str
             Ticker of the token to delete.
-        chain_id : _type_
-            Id of the network to delete the address for.
+        chain_id : int | str, optional
+            Id of the network to delete the address for. If None, every address of the token is deleted, by default None
+
+        Returns
+        -------
+        bool
+            True if something was deleted.
         """
-        df = self.read_local_address_file()
-        print(f"DF: {df}")
+        ticker = ticker.upper()
+        if chain_id is None:
+            deleted = self._address_store.delete(ticker)
+        else:
+            network = self.get_network_name(chain_id)
+            deleted = network is not None and self._address_store.delete_value(
+                ticker, network
+            )
+        if self.log:
+            target = "every network" if chain_id is None else f"chain id '{chain_id}'"
+            if deleted:
+                logger.info("[TokenAddress] Deleted address of '%s' on %s.", ticker, target)
+            else:
+                logger.info("[TokenAddress] No address of '%s' on %s to delete.", ticker, target)
+        return deleted
 
     def read_local_address_file(self) -> pd.DataFrame:
         """
@@ -335,76 +763,217 @@ class CoinMarketcapScraper:
         pd.DataFrame
             Dataframe containing address information.
         """
-        df = pd.read_csv(self.token_address_path)
-        df.set_index("ticker", inplace=True)
-        return df
+        return self._address_store.to_frame()
 
-    def _get_request_params(self, ticker: str):
-        # Parameters for the API request
+    def _get(
+        self,
+        url: str,
+        params: dict,
+        items: int = 1,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> requests.Response:
+        """
+        Make an API request through the credit scheduler.
+        Throttled (429) requests are retried after the 'Retry-After' the API asks for.
+        With a response cache, fresh stored responses are returned without a request (or credits), and
+        successful responses are stored.
+
+        Parameters
+        ----------
+        url : str
+            Endpoint to query.
+        params : dict
+            Headers and parameters from '_get_request_params'.
+        items : int, optional
+            Number of cryptocurrencies requested, used to compute the credit cost, by default 1
+        priority : int, optional
+            Scheduling priority, by default PRIORITY_INTERACTIVE
+
+        Returns
+        -------
+        requests.Response
+            Response of the last attempt, or a 'CachedResponse'.
+        """
+        if self.response_cache is not None:
+            cached = self.response_cache.get(url, params["parameters"])
+            if cached is not None:
+                return cached
+
+        endpoint = urlparse(url).path
+        credits = credit_cost(endpoint, items)
+        for attempt in range(self.scheduler.max_retries + 1):
+            self.scheduler.acquire(credits, priority)
+            start = time.perf_counter()
+            response = self.session.get(
+                url, headers=params["headers"], params=params["parameters"]
+            )
+            if METRICS.enabled:
+                self._record_request(endpoint, response.status_code, credits, start)
+            if response.status_code != 429:
+                if self.response_cache is not None:
+                    self.response_cache.put(url, params["parameters"], response)
+                return response
+            retry_after = parse_retry_after(
+                response.headers.get("Retry-After"), default=2**attempt
+            )
+            if self.log:
+                logger.warning(
+                    "[_get()] Throttled by Coinmarketcap, retrying in %ss.", retry_after
+                )
+            self.scheduler.backoff(retry_after, credits)
+        return response
+
+    def _record_request(self, endpoint: str, status: int, credits: int, start: float) -> None:
+        METRICS.observe("api_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+        METRICS.inc("api_requests_total", endpoint=endpoint, status=str(status))
+        # Throttled calls are not charged.
+        if status != 429:
+            METRICS.inc("api_credits_total", credits, endpoint=endpoint)
+
+    def _get_request_params(self, ticker: str, field: str = "symbol"):
+        # Parameters for the API request. 'field' is "symbol" or "id".
         parameters = {
-            "symbol": ticker,  # Symbol for Ethereum
+            field: ticker,  # Symbol for Ethereum
         }
+
+        return {"parameters": parameters, "headers": self._get_headers()}
+
+    def _get_headers(self) -> dict:
         # Headers for the API request
-        headers = {
+        return {
             "Accepts": "application/json",
             "X-CMC_PRO_API_KEY": self.key,
         }
 
-        return {"parameters": parameters, "headers": headers}
+    """--------------------------------------------------------------------------- Token Map ---------------------------------------------------------------------------"""
+
+    def iter_token_map(
+        self,
+        start: int = 1,
+        page_size: int = 5000,
+        priority: int = PRIORITY_BACKGROUND,
+    ):
+        """
+        Page through every active cryptocurrency listed by Coinmarketcap, best ranked first.
+        Pages are requested one at a time, so only one page is held in memory.
+
+        Parameters
+        ----------
+        start : int, optional
+            1-based offset of the first cryptocurrency to return, by default 1
+        page_size : int, optional
+            Number of cryptocurrencies per request (at most 5000), by default 5000
+        priority : int, optional
+            Scheduling priority of the API calls, by default PRIORITY_BACKGROUND
+
+        Yields
+        ------
+        tuple
+            Offset of the page and its list of entries ('id', 'symbol', 'slug', 'name', 'rank', ...).
+        """
+        url = f"{self.base_url}/v1/cryptocurrency/map"
+        while True:
+            params = {
+                "parameters": {"start": start, "limit": page_size, "sort": "cmc_rank"},
+                "headers": self._get_headers(),
+            }
+            response = self._get(url, params, items=page_size, priority=priority)
+            # Raised rather than returning early, so callers can tell an error from the last page.
+            response.raise_for_status()
+            page = response.json()["data"]
+            if page:
+                yield start, page
+            if len(page) < page_size:
+                return
+            start += len(page)
+
+    def _query_token_infos_by_id(
+        self, ids: list, priority: int = PRIORITY_INTERACTIVE
+    ) -> dict:
+        """
+        Query token info by Coinmarketcap id. Unlike symbols, ids are unambiguous.
+
+        Returns
+        -------
+        dict
+            Mapping of id to the parsed token info. Unknown ids are left out.
+        """
+        url = f"{self.base_url}/v1/cryptocurrency/quotes/latest"
+        data = self._query_ids(url, ids, priority)
+        return {i: self._parse_token_info(token_data) for i, token_data in data.items()}
+
+    def _query_contract_addresses_by_id(
+        self, ids: list, priority: int = PRIORITY_INTERACTIVE
+    ) -> dict:
+        """
+        Query contract addresses by Coinmarketcap id.
+
+        Returns
+        -------
+        dict
+            Mapping of id to a dictionary of {network: address}. Unknown ids are left out.
+        """
+        url = f"{self.base_url}/v1/cryptocurrency/info"
+        data = self._query_ids(url, ids, priority)
+        return {
+            i: self._parse_contract_addresses(token_data)
+            for i, token_data in data.items()
+        }
+
+    def _query_ids(self, url: str, ids: list, priority: int) -> dict:
+        """
+        Request data for ids in batches of 'self.batch_size'.
+        Failed requests raise 'requests.HTTPError'.
+
+        Returns
+        -------
+        dict
+            The merged 'data' field of the responses, keyed by id.
+        """
+        results = {}
+        for batch in self._chunk([int(i) for i in ids], self.batch_size):
+            params = self._get_request_params(",".join(map(str, batch)), field="id")
+            response = self._get(url, params, items=len(batch), priority=priority)
+            response.raise_for_status()
+            data = response.json()["data"]
+            # The response is keyed by the id as a string.
+            results.update({i: data[str(i)] for i in batch if str(i) in data})
+        return results
 
     """--------------------------------------------------------------------------- Chain Ids ---------------------------------------------------------------------------"""
 
     def add_chain_id(self, network_name: str, chain_id: int):
-        path = f"{self.export_path}\\chain_id.csv"
-        try:
-            df = pd.read_csv(path)
-            df.rename(columns={"Unnamed: 0": "name"}, inplace=True)
-            df.set_index("name", inplace=True)
-            try:
-                # If no errors occur up to this point, the data is already in the file and nothing further needs to be done.
-                _id = df.loc[network_name, "id"]
-                if self.log:
-                    print(
-                        f"[add_chain_id()] '{network_name}' already saved locally with ID '{chain_id}'"
-                    )
-            except KeyError:
-                df.loc[network_name, "id"] = chain_id
-                df.to_csv(path)
-                if self.log:
-                    print(
-                        f"[add_chain_id()] '{network_name}' was added with ID '{chain_id}'"
-                    )
-
-        except FileNotFoundError:
-            df = pd.DataFrame()
-            df.loc[network_name, "id"] = chain_id
-            df.to_csv(path)
+        store = self._chain_id_store
+        if store.get_value(network_name, "id") is not None:
+            # The data is already saved locally and nothing further needs to be done.
             if self.log:
-                print(
-                    f"[add_chain_id()] '{network_name}' was added with ID '{chain_id}'"
+                logger.info(
+                    "[add_chain_id()] '%s' already saved locally with ID '%s'", network_name, chain_id
                 )
+        else:
+            store.set_value(network_name, "id", self._normalize_chain_id(chain_id))
+            if self.log:
+                logger.info("[add_chain_id()] '%s' was added with ID '%s'", network_name, chain_id)
 
     def update_chain_id(self, network_name: str, chain_id: str):
-        df = pd.read_csv(self.chain_id_path)
-        df.set_index("name", inplace=True)
-        prev_value = df.loc[network_name, "id"]
-        df.loc[network_name, "id"] = chain_id
-        df.to_csv(self.chain_id_path)
+        store = self._chain_id_store
+        prev_value = store.get_value(network_name, "id")
+        store.set_value(network_name, "id", self._normalize_chain_id(chain_id))
         if self.log:
-            print(
-                f"[update_chain_id()] '{network_name}' was updated from '{prev_value}' to '{chain_id}'."
+            logger.info(
+                "[update_chain_id()] '%s' was updated from '%s' to '%s'.",
+                network_name,
+                prev_value,
+                chain_id,
             )
 
     def get_chain_id(self, network_name: str) -> int:
-        path = f"{self.export_path}\\chain_id.csv"
-
-        try:
-            df = pd.read_csv(path)
-            df.set_index("name", inplace=True)
-            _id = df.loc[network_name, "id"]
-            return _id
-        except FileNotFoundError:
-            pass
+        chain_id = self._chain_id_store.get_value(network_name, "id")
+        if chain_id is None:
+            name = self._network_aliases.resolve(network_name)
+            if name is not None and name != network_name:
+                chain_id = self._chain_id_store.get_value(name, "id")
+        return chain_id
 
     def get_network_name(self, chain_id) -> str:
         """
@@ -421,12 +990,17 @@ class CoinMarketcapScraper:
         str
             Name of the platform.
         """
-        try:
-            df = pd.read_csv(self.chain_id_path)
-            _id = df.loc[df["id"] == str(chain_id)]
-            return _id["name"].values[0]
-        except FileNotFoundError:
-            pass
+        names = self._chain_id_store.index_by("id", key=self._normalize_chain_id)
+        return names.get(self._normalize_chain_id(chain_id))
+
+    def _normalize_chain_id(self, chain_id) -> str:
+        """
+        Chain ids are stored as text. Ids that were saved as floats (e.g. '137.0') are trimmed.
+        """
+        chain_id = str(chain_id)
+        if chain_id.endswith(".0"):
+            chain_id = chain_id[:-2]
+        return chain_id
 
     def delete_chain_id(self, value, by: str = "id"):
         """
@@ -443,90 +1017,57 @@ class CoinMarketcapScraper:
             , by default "id"
         """
         by = by.lower()
-        path = f"{self.export_path}\\chain_id.csv"
-        try:
-            df = pd.read_csv(path)
-            df.rename(columns={"Unnamed: 0": "name"}, inplace=True)
-            df.set_index("name", inplace=True)
-
-            if by == "id":
-                value = int(value)
-                # Identify the index of the row(s) where 'id' column equals 'chain_id'
-                indices_to_delete = df.index[df["id"] == value].tolist()
-                try:
-                    df.drop(indices_to_delete[0], inplace=True)
-                    df.to_csv(path)
-                except IndexError:
-                    print(
-                        f"[delete_chain_id()]: [{value}] could not be found in file: 'chain_id.csv'."
-                    )
-
-            elif by == "name":
-                try:
-                    df.drop(value, inplace=True)
-                    df.to_csv(path)
-                except KeyError:
-                    print(
-                        f"[delete_chain_id()]: [{value}] could not be found in file: 'chain_id.csv'."
-                    )
+        store = self._chain_id_store
+        if not store.exists and len(store) == 0:
+            logger.warning("[delete_chain_id()] Could not find 'chain_id.csv' file. ")
+            return
+
+        if by == "id":
+            name = self.get_network_name(value)
+            if name is None or not store.delete(name):
+                logger.warning(
+                    "[delete_chain_id()]: [%s] could not be found in file: 'chain_id.csv'.", value
+                )
 
-        except FileNotFoundError:
-            print(f"[delete_chain_id()] Could not find 'chain_id.csv' file. ")
+        elif by == "name":
+            if not store.delete(value):
+                logger.warning(
+                    "[delete_chain_id()]: [%s] could not be found in file: 'chain_id.csv'.", value
+                )
 
     def _clean_chain_ids(self):
-        df = pd.read_csv(self.chain_id_path)
-        df.set_index("name", inplace=True)
-
-        for i in df.iterrows():
-            name, id = i
-            id = id["id"]
-            if "." in id:
-                id = id.split(".")[0]
-            df.loc[name, "id"] = id
-        df.to_csv(self.chain_id_path)
+        store = self._chain_id_store
+        for name in store.keys():
+            _id = store.get_value(name, "id")
+            if _id is not None and self._normalize_chain_id(_id) != _id:
+                store.set_value(name, "id", self._normalize_chain_id(_id))
 
     def get_supported_chains(self):
-        path = f"{self.export_path}\\chain_id.csv"
-
-        try:
-            df = pd.read_csv(path)
-            df.rename(columns={"Unnamed: 0": "name"}, inplace=True)
-            if not df.empty:
-                sorted_df = df.sort_values(by="name", ascending=True)
-                sorted_df.set_index("name", inplace=True)
-                return sorted_df
-            else:
-                print(f"[get_supported_chains()] No supported chains.")
-        except FileNotFoundError:
-            print(f"[get_supported_chains()] Could not find 'chain_id.csv' file. ")
+        store = self._chain_id_store
+        if len(store) > 0:
+            return store.to_frame().sort_index(ascending=True)
+        elif store.exists:
+            logger.warning("[get_supported_chains()] No supported chains.")
+        else:
+            logger.warning("[get_supported_chains()] Could not find 'chain_id.csv' file. ")
 
     def get_supported_platforms(self):
-        path = f"{self.export_path}\\chain_id.csv"
-
-        try:
-            df = pd.read_csv(path)
-            df.rename(columns={"Unnamed: 0": "name"}, inplace=True)
-            if not df.empty:
-                sorted_df = df.sort_values(by="name", ascending=True)
-                return sorted_df["name"].to_list()
-            else:
-                print(f"[get_supported_platforms()] No supported chains.")
-        except FileNotFoundError:
-            print(f"[get_supported_platforms()] Could not find 'chain_id.csv' file. ")
+        store = self._chain_id_store
+        if len(store) > 0:
+            return sorted(store.keys())
+        elif store.exists:
+            logger.warning("[get_supported_platforms()] No supported chains.")
+        else:
+            logger.warning("[get_supported_platforms()] Could not find 'chain_id.csv' file. ")
 
     def read_local_chain_id_file(self):
-
-        df = pd.read_csv(self.chain_id_path)
-        df.set_index("name", inplace=True)
-        return df
+        return self._chain_id_store.to_frame()
 
     def get_untracked_networks(self) -> list:
 
-        address_df = self.read_local_address_file()
-        chain_id_df = self.read_local_chain_id_file()
-        chain_ids = chain_id_df.index.to_list()
+        chain_ids = set(self._chain_id_store.keys())
         untracked_networks = [
-            item for item in address_df.columns if item not in chain_ids
+            item for item in self._address_store.columns if item not in chain_ids
         ]
         return untracked_networks
 
@@ -535,14 +1076,37 @@ class CoinMarketcapScraper:
     def _merge_dataframes(
         self, base_df: pd.DataFrame, alt_df: pd.DataFrame
     ) -> pd.DataFrame:
-        for i in alt_df.iterrows():
-            index, value = i
-            value_index = value.index.to_list()
+        """
+        Merge 'alt_df' into 'base_df', aligning them on their index and columns.
+            - Rows and columns of 'alt_df' missing from 'base_df' are added, after the existing ones.
+            - Non-empty cells of 'alt_df' overwrite the cells of 'base_df', empty cells keep the base value.
+            - The result is built in one pass over numpy arrays, instead of one cell at a time.
+
+        Parameters
+        ----------
+        base_df : pd.DataFrame
+            Dataframe used as the source for operations, e.g. the local ticker x network address matrix.
+        alt_df : pd.DataFrame
+            Dataframe with new values, e.g. freshly queried addresses.
+
+        Returns
+        -------
+        pd.DataFrame
+            Merged dataframe. 'base_df' is not modified.
+        """
+        index = base_df.index.union(alt_df.index, sort=False)
+        columns = base_df.columns.union(alt_df.columns, sort=False)
+        values = base_df.reindex(index=index, columns=columns).to_numpy(
+            dtype=object, copy=True
+        )
 
-            for vi in value_index:
-                base_df.loc[index, vi] = alt_df.loc[index, vi]
+        incoming = alt_df.to_numpy(dtype=object)
+        cells = np.ix_(index.get_indexer(alt_df.index), columns.get_indexer(alt_df.columns))
+        values[cells] = np.where(pd.notna(incoming), incoming, values[cells])
 
-        return base_df
+        merged = pd.DataFrame(values, index=index, columns=columns)
+        merged.index.name = base_df.index.name
+        return merged
 
     def _merge_lists(self, base_list: list, alt_list: list) -> list:
         """
@@ -0,0 +1,56 @@
+import os
+import json
+import threading
+
+_config = None
+_env_loaded = False
+_lock = threading.Lock()
+
+
+def load_config() -> dict:
+    """
+    Read 'config.json' once per process.
+        - Looks in the working directory first, then in a 'CoinMarketcapScraper' sub directory.
+        - The result is shared, callers must not modify it.
+
+    Returns
+    -------
+    dict
+        Contents of the config file.
+    """
+    global _config
+    if _config is None:
+        with _lock:
+            if _config is None:
+                try:
+                    internal_path = f"{os.getcwd()}\\config.json"
+                    with open(internal_path, "r") as file:
+                        _config = json.load(file)
+                except FileNotFoundError:
+                    external_path = f"{os.getcwd()}\\CoinMarketcapScraper\\config.json"
+                    with open(external_path, "r") as file:
+                        _config = json.load(file)
+    return _config
+
+
+def reload_config() -> dict:
+    """
+    Read 'config.json' again, e.g. after the working directory changed.
+    """
+    global _config
+    with _lock:
+        _config = None
+    return load_config()
+
+
+def get_api_key() -> str:
+    """
+    Get the Coinmarketcap API key from the environment, loading the '.env' file on first use.
+    """
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+    return os.getenv("COINMARKETCAP_KEY")
@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from metrics import METRICS, TimedCursor
+
+
+class ConnectionManager:
+    """
+    Gives each thread its own sqlite connection to the same database file.
+        - WAL journaling, so readers don't block behind a writer.
+        - 'synchronous=NORMAL', which is safe with WAL and avoids an fsync per commit.
+        - A busy timeout, so a locked database is waited on instead of failing right away.
+        - Connections run in autocommit mode, writes use short explicit transactions (see 'transaction').
+
+    Parameters
+    ----------
+    database_file : str
+        Path to the sqlite database.
+    busy_timeout : float, optional
+        Seconds to wait for a lock held by another connection, by default 5.0
+    cache_size_mb : int, optional
+        Page cache size of each connection, by default 16
+    """
+
+    def __init__(
+        self, database_file: str, busy_timeout: float = 5.0, cache_size_mb: int = 16
+    ) -> None:
+        self.database_file = database_file
+        self.busy_timeout = busy_timeout
+        self.cache_size_mb = cache_size_mb
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections never leave their thread, 'check_same_thread' is off so 'close_all' can close them.
+        conn = sqlite3.connect(
+            self.database_file,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        # A negative cache size is in KiB.
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_mb * 1024)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def get(self) -> sqlite3.Connection:
+        """
+        Get the connection of the calling thread, opening it on first use.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            self._local.cursor = conn.cursor()
+            self._local.depth = 0
+        return conn
+
+    def cursor(self) -> sqlite3.Cursor:
+        """
+        Get the cursor of the calling thread. While metrics are enabled, statements are timed.
+        """
+        if getattr(self._local, "conn", None) is None:
+            self.get()
+        if METRICS.enabled:
+            return TimedCursor(self._local.cursor)
+        return self._local.cursor
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run the block in a write transaction ('BEGIN IMMEDIATE'), committed on success and rolled back on error.
+        The write lock is taken at the start, so the transaction can't fail halfway on a lock upgrade.
+        Nested blocks join the outer transaction.
+        """
+        conn = self.get()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield self.cursor()
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield self.cursor()
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.depth = 0
+
+    def close_all(self) -> None:
+        """
+        Close the connections of every thread.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
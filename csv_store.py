@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import os
+import atexit
+import threading
+import weakref
+
+from lazy_import import lazy_import
+
+pd = lazy_import("pandas")
+
+# Stores with unsaved changes are flushed when the interpreter exits.
+_open_stores = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all():
+    for store in list(_open_stores):
+        store.flush()
+
+
+class CsvStore:
+    """
+    In-memory copy of a csv file, indexed by its first column.
+        - The file is read once, on first access.
+        - Reads are served from dictionaries.
+        - Writes mark the store dirty and are written back in batches of 'flush_every' changes,
+          by writing a temporary file and renaming it over the original.
+
+    Parameters
+    ----------
+    path : str
+        Path to the csv file.
+    index_name : str
+        Label written for the index column.
+    dtype : optional
+        Passed to 'pd.read_csv', by default None
+    flush_every : int, optional
+        Number of changes after which the file is written, by default 50
+    """
+
+    def __init__(
+        self, path: str, index_name: str, dtype=None, flush_every: int = 50
+    ) -> None:
+        self.path = path
+        self.index_name = index_name
+        self.dtype = dtype
+        self.flush_every = flush_every
+        self._rows = None
+        self._columns = []
+        self._reverse_indexes = {}
+        self._dirty = 0
+        self._lock = threading.RLock()
+        _open_stores.add(self)
+
+    def _load(self) -> dict:
+        if self._rows is None:
+            with self._lock:
+                if self._rows is None:
+                    try:
+                        df = pd.read_csv(self.path, index_col=0, dtype=self.dtype)
+                        self._columns = df.columns.to_list()
+                        # Empty cells are left out, a wide file is mostly empty.
+                        self._rows = {
+                            str(key): {c: v for c, v in row.items() if not pd.isna(v)}
+                            for key, row in df.to_dict("index").items()
+                        }
+                    except FileNotFoundError:
+                        self._columns = []
+                        self._rows = {}
+        return self._rows
+
+    """----------------------------------- Reads -----------------------------------"""
+
+    def get(self, key: str) -> dict:
+        """
+        Get a row as a dictionary of {column: value}. Returns None if the key is missing.
+        """
+        return self._load().get(key)
+
+    def get_value(self, key: str, column: str, default=None):
+        row = self._load().get(key)
+        if row is None:
+            return default
+        return row.get(column, default)
+
+    def index_by(self, column: str, key=str) -> dict:
+        """
+        Get a reverse index of {key(value): row key} for a column.
+        The index is built once and kept until the store is written to.
+
+        Parameters
+        ----------
+        column : str
+            Column to index.
+        key : Callable, optional
+            Function applied to the values before they are used as keys, by default str
+
+        Returns
+        -------
+        dict
+            Mapping of column value to row key.
+        """
+        rows = self._load()
+        index = self._reverse_indexes.get(column)
+        if index is None:
+            with self._lock:
+                index = {}
+                for row_key, row in rows.items():
+                    if column in row:
+                        index.setdefault(key(row[column]), row_key)
+                self._reverse_indexes[column] = index
+        return index
+
+    def keys(self) -> list:
+        return list(self._load().keys())
+
+    @property
+    def columns(self) -> list:
+        self._load()
+        return list(self._columns)
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def to_frame(self) -> pd.DataFrame:
+        rows = self._load()
+        with self._lock:
+            df = pd.DataFrame.from_dict(rows, orient="index", columns=self._columns)
+        df.index.name = self.index_name
+        return df
+
+    def __contains__(self, key) -> bool:
+        return key in self._load()
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    """----------------------------------- Writes -----------------------------------"""
+
+    def set(self, key: str, values: dict) -> None:
+        """
+        Add or update a row. Columns not in 'values' keep their current value.
+        """
+        rows = self._load()
+        with self._lock:
+            row = rows.setdefault(key, {})
+            for column, value in values.items():
+                if column not in row and column not in self._columns:
+                    self._columns.append(column)
+                if pd.isna(value):
+                    row.pop(column, None)
+                else:
+                    row[column] = value
+            self._changed()
+
+    def merge_frame(self, df: pd.DataFrame) -> None:
+        """
+        Merge a dataframe into the store in one pass, counted as a single change.
+            - New rows and columns are added.
+            - Non-empty cells overwrite the stored value, empty cells keep it.
+        """
+        if df.empty:
+            return
+        rows = self._load()
+        updates = df.to_dict("index")
+        with self._lock:
+            for column in df.columns:
+                if column not in self._columns:
+                    self._columns.append(column)
+            for key, values in updates.items():
+                row = rows.setdefault(str(key), {})
+                row.update((c, v) for c, v in values.items() if not pd.isna(v))
+            self._changed()
+
+    def set_value(self, key: str, column: str, value) -> None:
+        self.set(key, {column: value})
+
+    def delete(self, key: str) -> bool:
+        """
+        Delete a row. Returns False if the key is missing.
+        """
+        rows = self._load()
+        with self._lock:
+            if rows.pop(key, None) is None:
+                return False
+            self._changed()
+            return True
+
+    def delete_value(self, key: str, column: str) -> bool:
+        """
+        Clear a single cell. Returns False if the cell is already empty.
+        """
+        rows = self._load()
+        with self._lock:
+            row = rows.get(key)
+            if row is None or row.pop(column, None) is None:
+                return False
+            self._changed()
+            return True
+
+    def _changed(self) -> None:
+        self._reverse_indexes.clear()
+        self._dirty += 1
+        if self._dirty >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write pending changes to disk. The file is replaced atomically, so readers never see a partial file.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            self.to_frame().to_csv(tmp_path, index_label=self.index_name)
+            os.replace(tmp_path, self.path)
+            self._dirty = 0
+
+    def __del__(self):
+        try:
+            self.flush()
+        except Exception:
+            pass
@@ -1,15 +1,56 @@
+from __future__ import annotations
+
 import os
+import sys
 import json
+import logging
 import sqlite3
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from enum import Enum, auto
 
-import pandas as pd
-
-pd.set_option("display.float_format", "{:,.0f}".format)
-
 import struct
 
+from address_index import AddressIndex
+from cache import TTLCache
+from config import load_config
+from connection import ConnectionManager
 from cmc_scraper import CoinMarketcapScraper
+from ingest_writer import DEFAULT_ADDRESS, IngestClient, IngestWriter
+from lazy_import import lazy_import
+from metrics import METRICS, instrument
+from network_index import (
+    CMC_NETWORK_NAMES,
+    NetworkIndex,
+    default_aliases,
+    normalize_network_name,
+    read_chain_registry,
+)
+from rate_limiter import PRIORITY_BACKGROUND
+from records import TokenRecord
+from single_flight import SingleFlight
+from snapshot import build_snapshot, default_snapshot_path, publish_snapshot
+
+# Only imported by the lookups that return dataframes.
+pd = lazy_import(
+    "pandas", setup=lambda pd: pd.set_option("display.float_format", "{:,.0f}".format)
+)
+
+# Version of the table layout, stored in sqlite's 'user_version' pragma.
+# 1: Addresses moved from 'Tokens.NetworkAddresses' to 'TokenAddresses'.
+# 2: Unique indexes on 'Tokens.TokenSymbol' and 'Networks.NetworkName', index on 'Networks.ChainId'.
+# 3: 'Tokens.CmcId' column and the 'Checkpoints' table used by 'warm_up'.
+# 4: 'Tokens.FetchedAt' and 'Tokens.AccessCount' columns used by 'refresh_stale'.
+# 5: 'NetworkAliases' table filled by 'load_chain_registry'.
+SCHEMA_VERSION = 5
+
+# Defaults of the 'refresh_ttl' (seconds) and 'refresh_limit' (tokens per run) config keys.
+DEFAULT_REFRESH_TTL = 7 * 24 * 3600
+DEFAULT_REFRESH_LIMIT = 500
+
+logger = logging.getLogger(__name__)
 
 
 class By(Enum):
@@ -17,27 +58,94 @@ class By(Enum):
     Network = auto()
 
 
+@instrument
 class Database:
-    def __init__(self, log: bool = True) -> None:
+    # Writes that can be sent to an 'IngestWriter': {operation: method}. The methods expect to run in a transaction.
+    WRITE_OPERATIONS = {
+        "tokens": "_write_tokens",
+        "access_counts": "_write_access_counts",
+    }
+
+    def __init__(
+        self,
+        log: bool = True,
+        cache_size: int = 4096,
+        cache_ttl: float = 300,
+        busy_timeout: float = 5.0,
+        writer=None,
+    ) -> None:
 
         self.export_path = self._get_data_export_path()
         self.database_file = f"{self.export_path}\\crypto.db"
-        self.conn = sqlite3.connect(self.database_file)
-        self.cursor = self.conn.cursor()
-        self.cmc = CoinMarketcapScraper(log=False)
+        # Each thread gets its own connection, see 'conn' and 'cursor'.
+        self.connections = ConnectionManager(
+            self.database_file, busy_timeout=busy_timeout
+        )
+        # Created on first use, lookups answered from the database never need it.
+        self._cmc = None
+        self._cmc_lock = threading.Lock()
         self.log = log
+        # In-memory cache of lookups. Entries expire after 'cache_ttl' seconds.
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        # Concurrent inserts of the same symbol share one query to 'Coinmarketcap'.
+        self._inflight = SingleFlight()
+        # Older sqlite builds limit a statement to 999 bound variables.
+        self.max_query_variables = 900
+        # Reverse index of addresses, built on the first 'resolve_address' call.
+        self._address_index = None
+        self._address_index_lock = threading.Lock()
+        # Index of network names, aliases and chain ids, built on first use. See 'resolve_network'.
+        self._network_index = None
+        self._network_index_lock = threading.Lock()
+        # Lookups per symbol, kept in memory and added to 'Tokens.AccessCount' by 'flush_access_counts'.
+        self._access_counts = Counter()
+        self._access_lock = threading.Lock()
+        # Counters and latency histograms, see 'metrics.METRICS'. Off unless the 'metrics' config key is set.
+        if load_config().get("metrics"):
+            METRICS.enable()
+        # Writes go to 'writer' if set ('IngestWriter' or 'IngestClient'), instead of their own transactions.
+        # By default, a client of the writer at the 'ingest_writer' config key. False always writes directly.
+        self._owns_writer = writer is None
+        if writer is None:
+            writer = IngestClient.from_config(load_config())
+        self.writer = writer or None
+        self._migrate()
+
+    @property
+    def cmc(self) -> CoinMarketcapScraper:
+        if self._cmc is None:
+            with self._cmc_lock:
+                if self._cmc is None:
+                    self._cmc = CoinMarketcapScraper(log=False)
+        return self._cmc
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self.connections.get()
+
+    @property
+    def cursor(self) -> sqlite3.Cursor:
+        return self.connections.cursor()
+
+    def transaction(self):
+        """
+        Context manager running a block of writes in one short transaction.
+        """
+        return self.connections.transaction()
+
+    def close(self):
+        """
+        Close the database connections of every thread and write pending csv changes.
+        """
+        self.flush_access_counts()
+        if self._owns_writer and self.writer is not None:
+            self.writer.close()
+        self.connections.close_all()
+        if self._cmc is not None:
+            self._cmc.close()
 
     def _get_data_export_path(self):
-        try:
-            internal_path = f"{os.getcwd()}\\config.json"
-            with open(internal_path, "r") as file:
-                data = json.load(file)
-            return data["data_export_path"]
-        except FileNotFoundError:
-            external_path = f"{os.getcwd()}\\CoinMarketcapScraper\\config.json"
-            with open(external_path, "r") as file:
-                data = json.load(file)
-            return data["data_export_path"]
+        return load_config()["data_export_path"]
 
     """
     ===================================================================
@@ -57,10 +165,27 @@ class Database:
         )
         """
         )
-        self.conn.commit()
+        self.cursor.execute(
+            """CREATE UNIQUE INDEX IF NOT EXISTS idx_networks_name ON Networks (NetworkName)"""
+        )
+        # Not unique, CoinMarketcap lists some networks under the same chain id.
+        self.cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_networks_chain_id ON Networks (ChainId)"""
+        )
+
+    def create_network_alias_table(self):
+        # Other names of the networks, stored normalized (see 'network_index.normalize_network_name').
+        self.cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS NetworkAliases (
+            Alias TEXT PRIMARY KEY,
+            NetworkID INTEGER NOT NULL REFERENCES Networks (NetworkID)
+        )
+        """
+        )
 
     def create_token_table(self):
-        # Create a table to store JSON data
+        # 'NetworkAddresses' is only read by the migration, addresses are stored in 'TokenAddresses'.
         self.cursor.execute(
             """
         CREATE TABLE IF NOT EXISTS Tokens (
@@ -69,104 +194,298 @@ class Database:
             TokenSlug TEXT,
             NetworkAddresses TEXT,
             MaxSupply INTEGER, 
-            InfiniteSupply BOOLEAN
+            InfiniteSupply BOOLEAN,
+            CmcId INTEGER,
+            FetchedAt TEXT,
+            AccessCount INTEGER NOT NULL DEFAULT 0
+        )
+        """
+        )
+        # Tables created before schema versions 3 and 4 don't have these columns yet.
+        for column, definition in (
+            ("CmcId", "INTEGER"),
+            ("FetchedAt", "TEXT"),
+            ("AccessCount", "INTEGER NOT NULL DEFAULT 0"),
+        ):
+            if not self._column_exists("Tokens", column):
+                self.cursor.execute(
+                    f"""ALTER TABLE Tokens ADD COLUMN {column} {definition}"""
+                )
+        self.cursor.execute(
+            """CREATE UNIQUE INDEX IF NOT EXISTS idx_tokens_symbol ON Tokens (TokenSymbol)"""
+        )
+        # Not unique, a rebranded token can briefly be listed under its old and new symbol.
+        self.cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_tokens_cmc_id ON Tokens (CmcId)"""
+        )
+        self.cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_tokens_fetched_at ON Tokens (FetchedAt)"""
+        )
+
+    def create_token_address_table(self):
+        # One row per (token, network) pair. The UNIQUE constraint also serves as the index on 'TokenId'.
+        self.cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS TokenAddresses (
+            TokenId INTEGER NOT NULL REFERENCES Tokens (TokenId),
+            NetworkID INTEGER NOT NULL REFERENCES Networks (NetworkID),
+            Address TEXT NOT NULL,
+            UNIQUE (TokenId, NetworkID)
+        )
+        """
+        )
+        self.cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_token_addresses_network ON TokenAddresses (NetworkID)"""
+        )
+        self.cursor.execute(
+            """CREATE INDEX IF NOT EXISTS idx_token_addresses_address ON TokenAddresses (Address)"""
+        )
+
+    def create_checkpoint_table(self):
+        # Position reached by long running jobs, so an interrupted run can resume.
+        self.cursor.execute(
+            """
+        CREATE TABLE IF NOT EXISTS Checkpoints (
+            Name TEXT PRIMARY KEY,
+            Position INTEGER NOT NULL,
+            UpdatedAt TEXT NOT NULL
         )
         """
         )
-        self.conn.commit()
 
     def drop_token_table(self):
-        with self.conn:
+        # The tables are created again empty, lookups expect them to exist.
+        with self.transaction():
+            self.cursor.execute(
+                """
+                DROP TABLE IF EXISTS TokenAddresses
+                """
+            )
             self.cursor.execute(
                 """
                 DROP TABLE IF EXISTS Tokens
                 """
             )
+            self.create_token_table()
+            self.create_token_address_table()
+        self.invalidate_cache()
+        if self._address_index is not None:
+            self.rebuild_address_index()
 
     """
     ===================================================================
-    Network data
+    Migrations
     ===================================================================
     """
 
-    def _query_network_info_by_chain_id(self, chain_id: str) -> pd.Series:
-        self.cursor.execute("""SELECT * FROM Networks WHERE ChainId = ?""", (chain_id,))
-        try:
-            results = self.cursor.fetchall()[0]
-            df = pd.DataFrame(
-                {
-                    "name": [results[1]],
-                    "native": [results[2]],
-                    "chain_id": [results[3]],
-                }
-            ).set_index("chain_id")
-            info = df.loc[str(chain_id)]
-            return info
-        except IndexError:
-            if self.log:
-                print(
-                    f"[_query_network_info_by_chain_id()]: '{chain_id}' could not be found in table 'Networks'. "
+    def _migrate(self):
+        """
+        Create missing tables and bring older databases up to 'SCHEMA_VERSION'.
+        """
+        # One transaction, so processes opening the same file don't migrate it twice.
+        with self.transaction():
+            version = self._get_schema_version()
+            if version < 2:
+                # Unique indexes can't be created while duplicate rows exist.
+                self._remove_duplicates()
+            self.create_network_table()
+            self.create_token_table()
+            self.create_token_address_table()
+            self.create_checkpoint_table()
+            self.create_network_alias_table()
+            if version < 1:
+                self.migrate_network_addresses()
+            if version < SCHEMA_VERSION:
+                self._set_schema_version(SCHEMA_VERSION)
+
+    def _get_schema_version(self) -> int:
+        self.cursor.execute("""PRAGMA user_version""")
+        return self.cursor.fetchone()[0]
+
+    def _set_schema_version(self, version: int):
+        # Pragmas can't use bound parameters.
+        self.cursor.execute(f"""PRAGMA user_version = {int(version)}""")
+
+    def _remove_duplicates(self):
+        """
+        Keep the first row of each duplicated token symbol and network name.
+        Addresses pointing at a removed network are moved to the row that is kept.
+        """
+        with self.transaction():
+            if self._table_exists("Tokens"):
+                if self._table_exists("TokenAddresses"):
+                    self.cursor.execute(
+                        """
+                    DELETE FROM TokenAddresses WHERE TokenId NOT IN (
+                        SELECT MIN(TokenId) FROM Tokens GROUP BY TokenSymbol
+                    )
+                    """
+                    )
+                self.cursor.execute(
+                    """
+                DELETE FROM Tokens WHERE TokenId NOT IN (
+                    SELECT MIN(TokenId) FROM Tokens GROUP BY TokenSymbol
+                )
+                """
+                )
+            if self._table_exists("Networks"):
+                if self._table_exists("TokenAddresses"):
+                    self.cursor.execute(
+                        """
+                    UPDATE OR IGNORE TokenAddresses SET NetworkID = (
+                        SELECT MIN(kept.NetworkID)
+                        FROM Networks n
+                        JOIN Networks kept ON kept.NetworkName = n.NetworkName
+                        WHERE n.NetworkID = TokenAddresses.NetworkID
+                    )
+                    """
+                    )
+                    self.cursor.execute(
+                        """
+                    DELETE FROM TokenAddresses WHERE NetworkID NOT IN (
+                        SELECT MIN(NetworkID) FROM Networks GROUP BY NetworkName
+                    )
+                    """
+                    )
+                self.cursor.execute(
+                    """
+                DELETE FROM Networks WHERE NetworkID NOT IN (
+                    SELECT MIN(NetworkID) FROM Networks GROUP BY NetworkName
+                )
+                """
                 )
-            return pd.Series()
 
-    def _query_network_info_by_name(self, network_name: str) -> pd.Series:
+    def _table_exists(self, table: str) -> bool:
         self.cursor.execute(
-            """SELECT * FROM Networks WHERE NetworkName = ?""", (network_name,)
+            """SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?""",
+            (table,),
         )
-        try:
-            results = self.cursor.fetchall()[0]
-            df = pd.DataFrame(
-                {
-                    "name": [results[1]],
-                    "native": [results[2]],
-                    "chain_id": [results[3]],
-                }
-            ).set_index("name")
-            info = df.loc[network_name]
+        return self.cursor.fetchone() is not None
 
-            return info
-        except IndexError:
-            if self.log:
-                print(
-                    f"[_query_network_info_by_name()]: '{network_name}' could not be found in table 'Networks'. "
-                )
-            return pd.Series()
+    def _column_exists(self, table: str, column: str) -> bool:
+        # Pragmas can't use bound parameters, 'table' is never user input.
+        self.cursor.execute(f"""PRAGMA table_info({table})""")
+        return any(row[1] == column for row in self.cursor.fetchall())
 
-    def get_network_info(self, network_name: str):
-        info = self._query_network_info_by_name(network_name)
+    def migrate_network_addresses(self):
+        """
+        Move the addresses stored as JSON in 'Tokens.NetworkAddresses' into the 'TokenAddresses' table.
+        Migrated rows have their JSON cleared, so running this again is a no-op.
+        """
+        self.cursor.execute(
+            """SELECT TokenId, NetworkAddresses FROM Tokens WHERE NetworkAddresses IS NOT NULL"""
+        )
+        rows = [(token_id, json.loads(blob)) for token_id, blob in self.cursor.fetchall()]
+        if not rows:
+            return
+
+        with self.transaction():
+            network_names = self._merge_network_names(addresses for _, addresses in rows)
+            network_ids = self._get_network_ids(network_names)
+            self.cursor.executemany(
+                """
+            INSERT OR IGNORE INTO TokenAddresses (TokenId, NetworkID, Address)
+            VALUES (?, ?, ?)
+            """,
+                [
+                    (token_id, network_ids[network], address)
+                    for token_id, addresses in rows
+                    for network, address in addresses.items()
+                ],
+            )
+            self.cursor.executemany(
+                """UPDATE Tokens SET NetworkAddresses = NULL WHERE TokenId = ?""",
+                [(token_id,) for token_id, _ in rows],
+            )
+        if self.log:
+            logger.info("[TokenAddresses] Migrated addresses of %s tokens.", len(rows))
+
+    """
+    ===================================================================
+    Network data
+    ===================================================================
+    """
+
+    def _query_network_info_by_chain_id(self, chain_id: str, as_pandas: bool = False):
+        # Answered from the network index, no query.
+        info = self._get_network_index().get_by_chain_id(chain_id)
+        if info is None and self.log:
+            logger.info(
+                "[_query_network_info_by_chain_id()]: '%s' could not be found in table 'Networks'. ",
+                chain_id,
+            )
+        if as_pandas:
+            if info is None:
+                return pd.Series()
+            return pd.Series({"name": info.name, "native": info.native}, name=info.chain_id)
         return info
 
+    def _query_network_info_by_name(self, network_name: str, as_pandas: bool = False):
+        # Answered from the network index, aliases ("Arbitrum One", "bsc") resolve to the stored name.
+        info = self._get_network_index().get(network_name)
+        if info is None and self.log:
+            logger.info(
+                "[_query_network_info_by_name()]: '%s' could not be found in table 'Networks'. ",
+                network_name,
+            )
+        if as_pandas:
+            if info is None:
+                return pd.Series()
+            return pd.Series(
+                {"native": info.native, "chain_id": info.chain_id}, name=info.name
+            )
+        return info
+
+    def get_network_info(self, network_name: str, as_pandas: bool = False):
+        """
+        Get the info of a network.
+
+        Parameters
+        ----------
+        network_name : str
+            Name or alias of the network.
+        as_pandas : bool, optional
+            Return a pd.Series instead of a 'NetworkRecord', by default False
+
+        Returns
+        -------
+        NetworkRecord
+            Name, native currency and chain id of the network. None if the network is not in the table.
+        """
+        return self._query_network_info_by_name(network_name, as_pandas)
+
     def get_chain_id(self, network_name: str):
         info = self._query_network_info_by_name(network_name)
-        try:
-            chain_id = info["chain_id"]
+        if info is None:
             if self.log:
-                print(
-                    f"[get_chain_id()]: ChainId '{chain_id}' retrieved for '{network_name}'. "
-                )
-            return chain_id
-        except KeyError:
-            if self.log:
-                print(
-                    f"[get_chain_id()]: ChainId could not be found for network '{network_name}'. "
+                logger.info(
+                    "[get_chain_id()]: ChainId could not be found for network '%s'. ", network_name
                 )
             return None
+        chain_id = info.chain_id
+        if self.log:
+            logger.debug(
+                "[get_chain_id()]: ChainId '%s' retrieved for '%s'. ", chain_id, network_name
+            )
+        return chain_id
 
     def get_native_currency(self, network_name: str):
-        info = self._query_network_info(network_name)
-        try:
-            native_currency = info["native"]
-            if self.log:
-                print(
-                    f"[get_native_currency()]: Native currency '{native_currency}' retrieved for '{network_name}'. "
-                )
-            return native_currency
-        except KeyError:
+        info = self._query_network_info_by_name(network_name)
+        if info is None:
             if self.log:
-                print(
-                    f"[get_native_currency()]: Native currency could not be found for network '{network_name}'. "
+                logger.info(
+                    "[get_native_currency()]: Native currency could not be found for network '%s'. ",
+                    network_name,
                 )
             return None
+        native_currency = info.native
+        if self.log:
+            logger.debug(
+                "[get_native_currency()]: Native currency '%s' retrieved for '%s'. ",
+                native_currency,
+                network_name,
+            )
+        return native_currency
 
     def get_all_networks(self) -> pd.DataFrame:
         self.cursor.execute("""SELECT * FROM Networks""")
@@ -179,120 +498,1162 @@ class Database:
         df.set_index("NetworkID", inplace=True)
         return df
 
+    def _get_network_ids(self, network_names: list) -> dict:
+        """
+        Get the 'NetworkID' of each network, adding networks that are not in the table yet.
+        Networks added this way have no native currency or chain id until they are filled in.
+        Expected to run inside a transaction.
+
+        Parameters
+        ----------
+        network_names : list
+            Names of the networks, according to CoinMarketcap API.
+
+        Returns
+        -------
+        dict
+            Mapping of network name to 'NetworkID'.
+        """
+        network_ids = self._query_network_ids(network_names)
+        missing = [n for n in network_names if n not in network_ids]
+        if missing:
+            self.cursor.executemany(
+                """
+            INSERT INTO Networks (NetworkName, NativeCurrency, ChainId)
+            VALUES (?, '', '')
+            ON CONFLICT (NetworkName) DO NOTHING
+            """,
+                [(n,) for n in missing],
+            )
+            network_ids.update(self._query_network_ids(missing))
+            # Added to the index in place, as a rebuild would (no native currency or chain id yet), so the new
+            # networks resolve without the next lookup rebuilding the index with queries.
+            with self._network_index_lock:
+                index = self._network_index
+                if index is not None:
+                    indexed = set(index.names())
+                    for name in missing:
+                        if name not in indexed:
+                            index.add(name)
+        return network_ids
+
+    def _query_network_ids(self, network_names: list) -> dict:
+        network_ids = {}
+        for batch in self._chunk(network_names, self.max_query_variables):
+            placeholders = ", ".join("?" for _ in batch)
+            self.cursor.execute(
+                f"""SELECT NetworkName, NetworkID FROM Networks WHERE NetworkName IN ({placeholders})""",
+                batch,
+            )
+            for name, network_id in self.cursor.fetchall():
+                network_ids.setdefault(name, network_id)
+        return network_ids
+
+    def _merge_network_names(self, address_dicts) -> list:
+        """
+        Collect the network names used across several {network: address} dictionaries.
+        """
+        names = {}
+        for addresses in address_dicts:
+            names.update(dict.fromkeys(addresses))
+        return list(names)
+
+    """
+    ===================================================================
+    Network Registry
+    ===================================================================
+    """
+
+    def load_chain_registry(self, path: str) -> dict:
+        """
+        Load a chain registry file (chainlist JSON, or CSV) into 'Networks' and 'NetworkAliases' in one transaction.
+            - Chains already stored, or known to Coinmarketcap (see 'network_index.CMC_NETWORK_NAMES'), keep their
+              Coinmarketcap name. The registry's names become aliases ("Arbitrum One" -> "Arbitrum").
+            - Other chains are added under their registry name.
+            - Native currencies and chain ids of existing networks are updated, empty values don't overwrite them.
+
+        Parameters
+        ----------
+        path : str
+            Path of the registry, see 'network_index.read_chain_registry' for the formats.
+
+        Returns
+        -------
+        dict
+            Number of chains read, networks added and updated, and aliases written.
+        """
+        entries = read_chain_registry(path)
+        stats = {"chains": len(entries), "added": 0, "updated": 0, "aliases": 0}
+        with self.transaction():
+            self.cursor.execute("""SELECT NetworkName, ChainId FROM Networks ORDER BY NetworkID""")
+            stored = {}
+            names_by_chain_id = {}
+            for name, chain_id in self.cursor.fetchall():
+                stored[name] = chain_id
+                if chain_id:
+                    names_by_chain_id.setdefault(chain_id, name)
+
+            networks = {}
+            claims = {}
+            for entry in entries:
+                chain_id = entry["chain_id"]
+                name = (
+                    names_by_chain_id.get(chain_id)
+                    or CMC_NETWORK_NAMES.get(chain_id)
+                    or entry["name"]
+                )
+                networks[name] = (name, entry["native"], chain_id)
+                for alias in (entry["name"], *entry["aliases"]):
+                    key = normalize_network_name(alias)
+                    if key:
+                        claims.setdefault(key, {}).setdefault(chain_id, name)
+
+            # Registry aliases are first-wins: they never replace a stored or built-in alias, nor a network's name,
+            # and an alias claimed by more than one chain id (e.g. a short name reused by a testnet) is skipped.
+            index = self._build_network_index()
+            names = {normalize_network_name(name) for name in networks}
+            aliases = {}
+            for key, by_chain_id in claims.items():
+                if len(by_chain_id) > 1 or index.has_alias(key) or key in names:
+                    continue
+                aliases[key] = next(iter(by_chain_id.values()))
+
+            self.cursor.executemany(
+                """
+            INSERT INTO Networks (NetworkName, NativeCurrency, ChainId)
+            VALUES (?, ?, ?)
+            ON CONFLICT (NetworkName) DO UPDATE SET
+                NativeCurrency = COALESCE(NULLIF(excluded.NativeCurrency, ''), NativeCurrency),
+                ChainId = COALESCE(NULLIF(excluded.ChainId, ''), ChainId)
+            """,
+                list(networks.values()),
+            )
+            network_ids = self._query_network_ids(list(networks))
+            self.cursor.executemany(
+                """
+            INSERT INTO NetworkAliases (Alias, NetworkID)
+            VALUES (?, ?)
+            ON CONFLICT (Alias) DO NOTHING
+            """,
+                [(alias, network_ids[name]) for alias, name in aliases.items()],
+            )
+        stats["added"] = sum(1 for name in networks if name not in stored)
+        stats["updated"] = len(networks) - stats["added"]
+        stats["aliases"] = len(aliases)
+
+        self.rebuild_network_index()
+        # Lookups by chain id may now find addresses they missed before.
+        self.invalidate_cache()
+        if self.log:
+            logger.info(
+                "[load_chain_registry()] %s chains read, %s networks added, %s updated, %s aliases.",
+                stats["chains"],
+                stats["added"],
+                stats["updated"],
+                stats["aliases"],
+            )
+        return stats
+
+    def resolve_network(self, value) -> str:
+        """
+        Get the stored name of a network from its name, an alias or its chain id, without a query.
+
+        Parameters
+        ----------
+        value : str | int
+            Name ("Arbitrum"), alias ("Arbitrum One", "bsc") or chain id (42161) of the network.
+
+        Returns
+        -------
+        str
+            Coinmarketcap name of the network. None if it isn't known.
+        """
+        return self._get_network_index().resolve(value)
+
+    def rebuild_network_index(self):
+        """
+        Reload the network index from the database, e.g. after another process wrote to it.
+        """
+        with self._network_index_lock:
+            self._network_index = self._build_network_index()
+
+    def _get_network_index(self) -> NetworkIndex:
+        index = self._network_index
+        if index is None:
+            with self._network_index_lock:
+                if self._network_index is None:
+                    self._network_index = self._build_network_index()
+                index = self._network_index
+        return index
+
+    def _build_network_index(self) -> NetworkIndex:
+        index = default_aliases(NetworkIndex())
+        self.cursor.execute(
+            """SELECT NetworkID, NetworkName, NativeCurrency, ChainId FROM Networks ORDER BY NetworkID"""
+        )
+        names = {}
+        for network_id, name, native, chain_id in self.cursor.fetchall():
+            index.add(name, native, chain_id)
+            names[network_id] = name
+        self.cursor.execute("""SELECT Alias, NetworkID FROM NetworkAliases""")
+        for alias, network_id in self.cursor.fetchall():
+            if network_id in names:
+                # Stored aliases come from registries, they never replace a name or a built-in alias.
+                index.add_aliases(names[network_id], (alias,), replace=False)
+        return index
+
     """
     ===================================================================
     Token Data
     ===================================================================
     """
 
-    def _query_address(self, symbol: str):
+    def _query_addresses(self, symbol: str) -> dict:
         symbol = symbol.upper()
         self.cursor.execute(
             """
-        SELECT NetworkAddresses
-        FROM Tokens
-        WHERE TokenSymbol = ?
+        SELECT n.NetworkName, ta.Address
+        FROM TokenAddresses ta
+        JOIN Tokens t ON t.TokenId = ta.TokenId
+        JOIN Networks n ON n.NetworkID = ta.NetworkID
+        WHERE t.TokenSymbol = ?
+        ORDER BY ta.rowid
         """,
             (symbol,),
         )
+        return dict(self.cursor.fetchall())
+
+    def _query_addresses_bulk(self, symbols: list) -> dict:
+        addresses = {symbol: {} for symbol in symbols}
+        for batch in self._chunk(symbols, self.max_query_variables):
+            placeholders = ", ".join("?" for _ in batch)
+            self.cursor.execute(
+                f"""
+            SELECT t.TokenSymbol, n.NetworkName, ta.Address
+            FROM TokenAddresses ta
+            JOIN Tokens t ON t.TokenId = ta.TokenId
+            JOIN Networks n ON n.NetworkID = ta.NetworkID
+            WHERE t.TokenSymbol IN ({placeholders})
+            ORDER BY ta.rowid
+            """,
+                batch,
+            )
+            for symbol, network, address in self.cursor.fetchall():
+                addresses[symbol][network] = address
+        return addresses
+
+    def _query_address(self, symbol: str, value: str, search_by) -> str:
+        # Chain ids and aliases are resolved to network names by the index, the query only matches names.
+        index = self._get_network_index()
+        if search_by == By.ID:
+            names = index.names_for_chain_id(value)
+            if not names:
+                return None
+        else:
+            names = (index.resolve(value) or value,)
+        placeholders = ", ".join("?" for _ in names)
+        self.cursor.execute(
+            f"""
+        SELECT ta.Address
+        FROM TokenAddresses ta
+        JOIN Tokens t ON t.TokenId = ta.TokenId
+        JOIN Networks n ON n.NetworkID = ta.NetworkID
+        WHERE t.TokenSymbol = ? AND n.NetworkName IN ({placeholders})
+        ORDER BY n.NetworkID
+        """,
+            (symbol, *names),
+        )
         result = self.cursor.fetchone()
-        return result
+        if result is None:
+            return None
+        return result[0]
 
-    def _query_token_info(self, symbol: str):
+    def _query_token_info(self, symbol: str, as_pandas: bool = False):
         symbol = symbol.upper()
 
-        self.cursor.execute("""SELECT * FROM Tokens WHERE TokenSymbol = ?""", (symbol,))
-        try:
-            result = self.cursor.fetchall()[0]
-            df = pd.DataFrame(
-                {
-                    "TokenId": [result[0]],
-                    "TokenSymbol": [result[1]],
-                    "TokenSlug": [result[2]],
-                    "NetworkAddresses": [result[3]],
-                    "MaxSupply": [result[4]],
-                    "InfiniteSupply": [result[5]],
-                }
-            ).set_index("TokenSymbol")
+        self.cursor.execute(
+            """
+        SELECT TokenId, TokenSymbol, TokenSlug, MaxSupply, InfiniteSupply, CmcId
+        FROM Tokens
+        WHERE TokenSymbol = ?
+        """,
+            (symbol,),
+        )
+        token_info = TokenRecord.from_row(self.cursor.fetchone())
+        if as_pandas:
+            return self._token_info_series(token_info)
+        return token_info
 
-            token_info = df.loc[symbol]
-            return token_info
-        except IndexError as e:
+    def _token_info_series(self, token_info: TokenRecord) -> pd.Series:
+        """
+        Convert a 'TokenRecord' to the pd.Series returned before records were introduced.
+        """
+        if token_info is None:
             return pd.Series()
+        return pd.Series(
+            {
+                "TokenId": token_info.token_id,
+                "TokenSlug": token_info.slug,
+                "NetworkAddresses": None,
+                "MaxSupply": token_info.max_supply,
+                "InfiniteSupply": token_info.infinite_supply,
+                "CmcId": token_info.cmc_id,
+            },
+            name=token_info.symbol,
+        )
+
+    def get_token_info(self, symbol: str, as_pandas: bool = False):
+        """
+        Get the info of a token, querying it from 'Coinmarketcap' if it is not in the database yet.
 
-    def get_token_info(self, symbol: str):
+        Parameters
+        ----------
+        symbol : str
+            Ticker symbol of the token.
+        as_pandas : bool, optional
+            Return a pd.Series instead of a 'TokenRecord', by default False
+
+        Returns
+        -------
+        TokenRecord
+            Info of the token. None if it could not be found.
+        """
         symbol = symbol.upper()
+        self._record_access(symbol)
         token_info = self._query_token_info(symbol)
 
-        if token_info.empty:
+        if token_info is None:
             self.insert_token_data(symbol)
             token_info = self._query_token_info(symbol)
 
+        if as_pandas:
+            return self._token_info_series(token_info)
         return token_info
 
     def get_token_addresses(self, symbol: str):
-        token_info = self.get_token_info(symbol)
-        if token_info.empty:
-            return {}
-        else:
-            addresses = json.loads(token_info["NetworkAddresses"])
-            return addresses
+        symbol = symbol.upper()
+        self._record_access(symbol)
+        return dict(self._get_cached_addresses(symbol))
+
+    def _get_cached_addresses(self, symbol: str) -> dict:
+        key = ("addresses", symbol)
+        addresses = self.cache.get(key)
+        if addresses is None:
+            addresses = self._query_addresses(symbol)
+            if not addresses and not self.token_symbol_exists(symbol):
+                self.insert_token_data(symbol)
+                addresses = self._query_addresses(symbol)
+            self.cache.set(key, addresses)
+        return addresses
 
     def get_token_address(self, symbol: str, value: str, search_by: By):
         symbol = symbol.upper()
-        addresses = self.get_token_addresses(symbol)
+        if search_by not in (By.ID, By.Network):
+            return None
+        self._record_access(symbol)
+        key = ("address", symbol, str(value), search_by)
+        address = self.cache.get(key)
+        if address is not None:
+            return address
+
+        address = self._query_address(symbol, value, search_by)
+        if address is None and not self.token_symbol_exists(symbol):
+            self.insert_token_data(symbol)
+            address = self._query_address(symbol, value, search_by)
+        if address is None:
+            address = ""
+        self.cache.set(key, address)
+        return address
+
+    def _pick_address(self, addresses: dict, value, search_by) -> str:
+        """
+        Pick the address on a network from {network: address}, matching the network like '_query_address'.
+        None if the token has no address there.
+        """
+        index = self._get_network_index()
         if search_by == By.ID:
-            info = self._query_network_info_by_chain_id(value)
-            try:
-                network = info["name"]
-                address = addresses[network]
-                return address
-            except KeyError:
-                return ""
-        elif search_by == By.Network:
-            try:
-                address = addresses[value]
+            names = index.names_for_chain_id(value)
+        else:
+            names = (index.resolve(value) or value,)
+        for name in names:
+            address = addresses.get(name)
+            if address is not None:
                 return address
-            except KeyError:
-                return ""
+        return None
+
+    def get_token_infos(self, symbols: list) -> pd.DataFrame:
+        """
+        Get the token info for multiple symbols.
+            - Symbols already in the database are found with a single query.
+            - Missing symbols are queried from 'Coinmarketcap' in batches and inserted together.
+
+        Parameters
+        ----------
+        symbols : list
+            Ticker symbols of the tokens.
+
+        Returns
+        -------
+        pd.DataFrame
+            Dataframe containing token information, indexed by 'TokenSymbol'.
+        """
+        symbols = self._normalize_symbols(symbols)
+        self._record_accesses(symbols)
+        df = self._query_token_infos(symbols)
+        missing = [s for s in symbols if s not in df.index]
+        if missing:
+            self.insert_tokens_data(missing)
+            df = self._query_token_infos(symbols)
+        return df
+
+    def get_token_addresses_bulk(self, symbols: list) -> dict:
+        """
+        Get all known addresses for multiple symbols.
+
+        Parameters
+        ----------
+        symbols : list
+            Ticker symbols of the tokens.
+
+        Returns
+        -------
+        dict
+            Mapping of symbol to a dictionary of {network: address}.
+            Symbols that could not be found map to an empty dictionary.
+        """
+        symbols = self._normalize_symbols(symbols)
+        addresses = {}
+        for symbol in symbols:
+            cached = self.cache.get(("addresses", symbol))
+            if cached is not None:
+                addresses[symbol] = dict(cached)
+        # Uncached symbols are counted by 'get_token_infos' below.
+        self._record_accesses(list(addresses))
+
+        uncached = [s for s in symbols if s not in addresses]
+        if uncached:
+            # Inserts the symbols that are not in the database yet.
+            self.get_token_infos(uncached)
+            for symbol, token_addresses in self._query_addresses_bulk(uncached).items():
+                self.cache.set(("addresses", symbol), token_addresses)
+                addresses[symbol] = dict(token_addresses)
+        return {symbol: addresses[symbol] for symbol in symbols}
+
+    def _query_token_infos(self, symbols: list) -> pd.DataFrame:
+        columns = [
+            "TokenId",
+            "TokenSymbol",
+            "TokenSlug",
+            "NetworkAddresses",
+            "MaxSupply",
+            "InfiniteSupply",
+            "CmcId",
+        ]
+        results = []
+        for batch in self._chunk(symbols, self.max_query_variables):
+            placeholders = ", ".join("?" for _ in batch)
+            self.cursor.execute(
+                f"""SELECT {", ".join(columns)} FROM Tokens WHERE TokenSymbol IN ({placeholders})""",
+                batch,
+            )
+            results.extend(self.cursor.fetchall())
+        df = pd.DataFrame(results, columns=columns).set_index("TokenSymbol")
+        # Keep the order the symbols were requested in.
+        found = [s for s in symbols if s in df.index]
+        return df.loc[found]
+
+    def _query_token_records(self, symbols: list) -> dict:
+        """
+        Get {symbol: TokenRecord} of the symbols in the database, with one query per batch.
+        """
+        records = {}
+        for batch in self._chunk(symbols, self.max_query_variables):
+            placeholders = ", ".join("?" for _ in batch)
+            self.cursor.execute(
+                f"""
+            SELECT TokenId, TokenSymbol, TokenSlug, MaxSupply, InfiniteSupply, CmcId
+            FROM Tokens
+            WHERE TokenSymbol IN ({placeholders})
+            """,
+                batch,
+            )
+            for row in self.cursor.fetchall():
+                records[row[1]] = TokenRecord.from_row(row)
+        return records
 
     def insert_token_data(self, symbol: str):
         symbol = symbol.upper()
         token_exists = self.token_symbol_exists(symbol)
+        if not token_exists:
+            self._inflight.do_many([symbol], self._insert_missing_tokens)
+        else:
+            if self.log:
+                logger.debug("[Tokens] %s records already in table 'Tokens'.", symbol)
+
+    def insert_tokens_data(self, symbols: list):
+        """
+        Query multiple tokens from 'Coinmarketcap' and insert them in a single transaction.
+        Symbols that are already in the table are skipped.
+        Symbols another thread is already inserting are waited on instead of being queried twice.
+
+        Parameters
+        ----------
+        symbols : list
+            Ticker symbols of the tokens to insert.
+        """
+        symbols = self._normalize_symbols(symbols)
+        self._inflight.do_many(symbols, self._insert_missing_tokens)
+
+    def _insert_missing_tokens(self, symbols: list):
+        # Checked again, another thread may have inserted them since the caller looked.
+        existing = self._existing_symbols(symbols)
+        missing = [s for s in symbols if s not in existing]
+        if missing:
+            self._upsert_tokens(missing)
+
+    def _upsert_tokens(self, symbols: list):
+        """
+        Query tokens from 'Coinmarketcap' and write them with a single upsert.
+        Rows that already exist are updated in place.
+        """
+        token_info = self.cmc._query_token_infos(symbols)
+        token_addresses = self.cmc._query_contract_addresses(token_info.index.to_list())
+        self._store_tokens(token_info, token_addresses)
+
+    def _store_tokens(self, token_info: pd.DataFrame, token_addresses: dict):
+        """
+        Write tokens queried from 'Coinmarketcap' ('_query_token_infos' and '_query_contract_addresses' results),
+        then drop their cached lookups.
+        """
+        found = token_info.index.to_list()
+        fetched_at = self._now()
+
+        rows = []
+        for symbol in found:
+            rows.append(
+                (
+                    symbol,
+                    token_info.loc[symbol, "slug"],
+                    self._to_sql_value(token_info.loc[symbol, "max_supply"]),
+                    self._to_sql_value(token_info.loc[symbol, "infinite_supply"]),
+                    self._to_sql_value(token_info.loc[symbol, "id"]),
+                    fetched_at,
+                )
+            )
+        if not rows:
+            return
+        self._submit_write("tokens", rows, token_addresses)
+        if self.log:
+            logger.info("[Tokens] Inserted %s tokens into table 'Tokens'.", len(rows))
+        self.invalidate_cache(found)
+        self._update_address_index(found)
+
+    def _write_tokens(self, rows: list, token_addresses: dict):
+        """
+        Upsert rows of (TokenSymbol, TokenSlug, MaxSupply, InfiniteSupply, CmcId, FetchedAt) and their
+        {symbol: {network: address}}. Expected to run inside a transaction.
+        """
+        self.cursor.executemany(
+            """
+        INSERT INTO Tokens (TokenSymbol, TokenSlug, MaxSupply, InfiniteSupply, CmcId, FetchedAt)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (TokenSymbol) DO UPDATE SET
+            TokenSlug = excluded.TokenSlug,
+            MaxSupply = excluded.MaxSupply,
+            InfiniteSupply = excluded.InfiniteSupply,
+            CmcId = excluded.CmcId,
+            FetchedAt = excluded.FetchedAt
+        """,
+            rows,
+        )
+        self._insert_token_addresses(token_addresses)
+
+    def _insert_token_addresses(self, token_addresses: dict):
+        """
+        Write {symbol: {network: address}} into 'TokenAddresses'. Expected to run inside a transaction.
+        """
+        symbols = list(token_addresses)
+        token_ids = {}
+        for batch in self._chunk(symbols, self.max_query_variables):
+            placeholders = ", ".join("?" for _ in batch)
+            self.cursor.execute(
+                f"""SELECT TokenSymbol, TokenId FROM Tokens WHERE TokenSymbol IN ({placeholders})""",
+                batch,
+            )
+            token_ids.update(self.cursor.fetchall())
+
+        self._write_token_addresses(
+            {
+                token_ids[symbol]: addresses
+                for symbol, addresses in token_addresses.items()
+                if symbol in token_ids
+            }
+        )
+
+    def _write_token_addresses(self, token_addresses: dict):
+        """
+        Write {TokenId: {network: address}} into 'TokenAddresses'. Expected to run inside a transaction.
+        """
+        network_ids = self._get_network_ids(
+            self._merge_network_names(token_addresses.values())
+        )
+        self.cursor.executemany(
+            """
+        INSERT INTO TokenAddresses (TokenId, NetworkID, Address)
+        VALUES (?, ?, ?)
+        ON CONFLICT (TokenId, NetworkID) DO UPDATE SET Address = excluded.Address
+        """,
+            [
+                (token_id, network_ids[network], address)
+                for token_id, addresses in token_addresses.items()
+                for network, address in addresses.items()
+            ],
+        )
+
+    """
+    ===================================================================
+    Address Lookup
+    ===================================================================
+    """
+
+    def resolve_address(self, address: str, network: str = None) -> tuple:
+        """
+        Find the token a contract address belongs to.
+        EVM addresses are matched case-insensitively.
+
+        Parameters
+        ----------
+        address : str
+            Contract address.
+        network : str, optional
+            Only match the address on this network. If None, the first match is returned, by default None
+
+        Returns
+        -------
+        tuple
+            (symbol, network) of the token, None if the address is not in the database.
+        """
+        return self._get_address_index().lookup(address, network)
+
+    def resolve_addresses(self, addresses, network: str = None) -> dict:
+        """
+        Find the tokens of multiple contract addresses.
+
+        Parameters
+        ----------
+        addresses : Iterable
+            Contract addresses.
+        network : str, optional
+            Only match the addresses on this network, by default None
+
+        Returns
+        -------
+        dict
+            Mapping of each address to (symbol, network), or None if it is not in the database.
+        """
+        lookup = self._get_address_index().lookup
+        return {address: lookup(address, network) for address in addresses}
+
+    def rebuild_address_index(self):
+        """
+        Reload the address index from the database, e.g. after another process wrote to it.
+        """
+        with self._address_index_lock:
+            self._address_index = self._build_address_index()
+
+    def _get_address_index(self) -> AddressIndex:
+        index = self._address_index
+        if index is None:
+            with self._address_index_lock:
+                if self._address_index is None:
+                    self._address_index = self._build_address_index()
+                index = self._address_index
+        return index
+
+    def _build_address_index(self) -> AddressIndex:
+        index = AddressIndex()
+        # Rows are streamed from the cursor instead of fetched into a list.
+        index.build(
+            self.conn.execute(
+                """
+            SELECT t.TokenSymbol, n.NetworkName, ta.Address
+            FROM TokenAddresses ta
+            JOIN Tokens t ON t.TokenId = ta.TokenId
+            JOIN Networks n ON n.NetworkID = ta.NetworkID
+            ORDER BY ta.rowid
+            """
+            )
+        )
+        if self.log:
+            logger.info("[AddressIndex] Indexed %s addresses.", len(index))
+        return index
+
+    def _update_address_index(self, symbols: list):
+        """
+        Reload the addresses of 'symbols' into the index, if it was built. Called after their rows are committed.
+        """
+        with self._address_index_lock:
+            if self._address_index is None:
+                return
+            for symbol, addresses in self._query_addresses_bulk(symbols).items():
+                self._address_index.replace(symbol, addresses)
+
+    """
+    ===================================================================
+    Snapshot
+    ===================================================================
+    """
+
+    def export_snapshot(self, path: str = None) -> str:
+        """
+        Compile 'Tokens', 'Networks' and their addresses into a read-only snapshot and publish it.
+        Processes reading it with 'snapshot.Snapshot' switch to the new file on their next check.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path of the snapshot, by default the 'snapshot_path' config key (see 'default_snapshot_path').
+
+        Returns
+        -------
+        str
+            Path of the snapshot file written.
+        """
+        if path is None:
+            path = default_snapshot_path(load_config())
+        conn = self.conn
+        # One read transaction, so the tables are read at the same point in time.
+        conn.execute("BEGIN")
         try:
-            if not token_exists:
-                token_info = self.cmc._query_token_info(symbol)
-                print(f"Token: {token_info}")
-                token_address = self.cmc._query_token_address(symbol)
-                # Convert the DataFrame to a dictionary
-                network_addresses = token_address.T.squeeze().to_dict()
-                network_addresses = json.dumps(network_addresses)
-                with self.conn:
-                    # Insert data into the table
-                    self.cursor.execute(
-                        """
-                    INSERT INTO Tokens (TokenSymbol, TokenSlug, NetworkAddresses, MaxSupply, InfiniteSupply)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                        (
-                            symbol.upper(),
-                            token_info.loc[symbol, "slug"],
-                            network_addresses,
-                            token_info.loc[symbol, "max_supply"],
-                            token_info.loc[symbol, "infinite_supply"],
-                        ),
-                    )
+            index = self._build_network_index()
+            networks = conn.execute(
+                """SELECT NetworkID, NetworkName, NativeCurrency, ChainId FROM Networks"""
+            ).fetchall()
+            tokens = conn.execute(
+                """
+            SELECT TokenId, TokenSymbol, TokenSlug, MaxSupply, InfiniteSupply, CmcId
+            FROM Tokens
+            """
+            ).fetchall()
+            addresses = conn.execute(
+                """SELECT TokenId, NetworkID, Address FROM TokenAddresses ORDER BY rowid"""
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        data = build_snapshot(networks, index.alias_items(), tokens, addresses)
+        file_path = publish_snapshot(path, data)
+        if self.log:
+            logger.info(
+                "[Snapshot] %s tokens, %s addresses, %s networks written to '%s' (%s bytes).",
+                len(tokens),
+                len(addresses),
+                len(networks),
+                file_path,
+                len(data),
+            )
+        return file_path
 
-            else:
-                if self.log:
-                    print(
-                        f"[Tokens] {symbol.upper()} records already in table 'Tokens'."
-                    )
-        except sqlite3.OperationalError:
+    """
+    ===================================================================
+    Warm Up
+    ===================================================================
+    """
+
+    def warm_up(self, page_size: int = 5000, restart: bool = False) -> int:
+        """
+        Load every token listed by 'Coinmarketcap' into the database.
+            - The token map is read one page at a time, so memory use doesn't grow with the number of tokens.
+            - Each page is processed in batches of 'cmc.batch_size' ids, and each batch is written in its own transaction.
+            - The position reached is saved with every batch. An interrupted run resumes after the last batch written.
+            - When several tokens share a symbol, the best ranked one is kept. Existing rows are not overwritten.
+
+        Parameters
+        ----------
+        page_size : int, optional
+            Number of tokens read from the map per request, by default 5000
+        restart : bool, optional
+            Ignore the saved position and start from the first token, by default False
+
+        Returns
+        -------
+        int
+            Number of tokens inserted.
+        """
+        if restart:
+            self._delete_checkpoint("warm_up")
+        start = self._get_checkpoint("warm_up") or 1
+        if self.log and start > 1:
+            logger.info("[warm_up()] Resuming at token %s.", start)
+
+        inserted = 0
+        batch_size = self.cmc.batch_size
+        for page_start, page in self.cmc.iter_token_map(start, page_size):
+            for offset in range(0, len(page), batch_size):
+                batch = page[offset : offset + batch_size]
+                position = page_start + offset + len(batch)
+                inserted += self._warm_up_batch(batch, position)
             if self.log:
-                print(f"[Tokens] Table Created")
-            self.create_token_table()
-            self.insert_token_data(symbol.upper())
+                logger.info(
+                    "[warm_up()] %s tokens read, %s inserted.", page_start + len(page) - 1, inserted
+                )
+        # Finished, the next run starts over.
+        self._delete_checkpoint("warm_up")
+        return inserted
+
+    def _warm_up_batch(self, batch: list, position: int) -> int:
+        """
+        Query and write one batch of map entries, then save 'position' in the same transaction.
+        """
+        ids = [entry["id"] for entry in batch]
+        infos = self.cmc._query_token_infos_by_id(ids, PRIORITY_BACKGROUND)
+        addresses = self.cmc._query_contract_addresses_by_id(ids, PRIORITY_BACKGROUND)
+        fetched_at = self._now()
+
+        rows = []
+        for entry in batch:
+            info = infos.get(entry["id"])
+            if info is None:
+                continue
+            rows.append(
+                (
+                    entry["symbol"].upper(),
+                    info["slug"],
+                    self._to_sql_value(info["max_supply"]),
+                    self._to_sql_value(info["infinite_supply"]),
+                    entry["id"],
+                    fetched_at,
+                )
+            )
+        symbols = self._normalize_symbols([row[0] for row in rows])
+
+        with self.transaction():
+            existing = self._existing_symbols(symbols)
+            # The map is sorted by rank, so the first token of a symbol is the best ranked one.
+            # Rows inserted by symbol lookups only get their missing id filled in.
+            self.cursor.executemany(
+                """
+            INSERT INTO Tokens (TokenSymbol, TokenSlug, MaxSupply, InfiniteSupply, CmcId, FetchedAt)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (TokenSymbol) DO UPDATE SET CmcId = excluded.CmcId
+            WHERE Tokens.CmcId IS NULL AND Tokens.TokenSlug = excluded.TokenSlug
+            """,
+                rows,
+            )
+            # Addresses are only written for the token that owns the symbol.
+            token_ids = self._query_token_ids_by_cmc_id(ids)
+            self._write_token_addresses(
+                {
+                    token_ids[cmc_id]: token_addresses
+                    for cmc_id, token_addresses in addresses.items()
+                    if cmc_id in token_ids
+                }
+            )
+            self._set_checkpoint("warm_up", position)
+        self.invalidate_cache(symbols)
+        self._update_address_index(symbols)
+        return len([s for s in symbols if s not in existing])
+
+    def _query_token_ids_by_cmc_id(self, cmc_ids: list) -> dict:
+        token_ids = {}
+        for batch in self._chunk(cmc_ids, self.max_query_variables):
+            placeholders = ", ".join("?" for _ in batch)
+            self.cursor.execute(
+                f"""SELECT CmcId, TokenId FROM Tokens WHERE CmcId IN ({placeholders})""",
+                batch,
+            )
+            token_ids.update(self.cursor.fetchall())
+        return token_ids
+
+    def _get_checkpoint(self, name: str) -> int:
+        self.cursor.execute(
+            """SELECT Position FROM Checkpoints WHERE Name = ?""", (name,)
+        )
+        result = self.cursor.fetchone()
+        if result is None:
+            return None
+        return result[0]
+
+    def _set_checkpoint(self, name: str, position: int):
+        self.cursor.execute(
+            """
+        INSERT INTO Checkpoints (Name, Position, UpdatedAt)
+        VALUES (?, ?, ?)
+        ON CONFLICT (Name) DO UPDATE SET
+            Position = excluded.Position,
+            UpdatedAt = excluded.UpdatedAt
+        """,
+            (name, position, self._now()),
+        )
+
+    def _delete_checkpoint(self, name: str):
+        with self.transaction():
+            self.cursor.execute("""DELETE FROM Checkpoints WHERE Name = ?""", (name,))
+
+    """
+    ===================================================================
+    Refresh
+    ===================================================================
+    """
+
+    def refresh_stale(self, ttl: float = None, limit: int = None) -> dict:
+        """
+        Re-fetch tokens whose data is older than 'ttl', and write the ones that changed.
+            - Rows are picked by access count (most used first), then by age (never fetched first).
+            - At most 'limit' tokens are checked per run, so a run costs at most about 2 credits per 100 tokens.
+            - Tokens are queried by Coinmarketcap id when known, in batches of 'cmc.batch_size', at background priority.
+            - Only rows whose info or addresses differ are rewritten. Every checked row gets a new 'FetchedAt'.
+            - A failed request raises 'requests.HTTPError'. The rows of its batch keep their 'FetchedAt', so they
+              are checked again by the next run. Batches written before the error are kept.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Age in seconds after which a row is stale. Defaults to the 'refresh_ttl' config key, or 7 days.
+        limit : int, optional
+            Maximum number of tokens to check. Defaults to the 'refresh_limit' config key, or 500.
+
+        Returns
+        -------
+        dict
+            Number of tokens checked, tokens changed and addresses written.
+        """
+        config = load_config()
+        if ttl is None:
+            ttl = config.get("refresh_ttl", DEFAULT_REFRESH_TTL)
+        if limit is None:
+            limit = config.get("refresh_limit", DEFAULT_REFRESH_LIMIT)
+        self.flush_access_counts()
+
+        cutoff = self._now(-ttl)
+        self.cursor.execute(
+            """
+        SELECT TokenId, TokenSymbol, TokenSlug, MaxSupply, InfiniteSupply, CmcId
+        FROM Tokens
+        WHERE FetchedAt IS NULL OR FetchedAt < ?
+        ORDER BY AccessCount DESC, FetchedAt ASC
+        LIMIT ?
+        """,
+            (cutoff, limit),
+        )
+        stale = [TokenRecord.from_row(row) for row in self.cursor.fetchall()]
+
+        stats = {"checked": 0, "changed": 0, "addresses_written": 0}
+        for batch in self._chunk(stale, self.cmc.batch_size):
+            checked, changed, addresses_written = self._refresh_batch(batch)
+            stats["checked"] += checked
+            stats["changed"] += changed
+            stats["addresses_written"] += addresses_written
+        if self.log:
+            logger.info(
+                "[refresh_stale()] %s tokens checked, %s changed, %s addresses written.",
+                stats["checked"],
+                stats["changed"],
+                stats["addresses_written"],
+            )
+        return stats
+
+    def _refresh_batch(self, batch: list) -> tuple:
+        """
+        Re-fetch one batch of 'TokenRecord' and write the differences in one transaction.
+        """
+        by_id = [t for t in batch if t.cmc_id is not None]
+        by_symbol = [t for t in batch if t.cmc_id is None]
+
+        # {TokenId: (info, addresses)}, info is a dictionary like 'cmc._parse_token_info' returns.
+        fetched = {}
+        if by_id:
+            ids = [t.cmc_id for t in by_id]
+            infos = self.cmc._query_token_infos_by_id(ids, PRIORITY_BACKGROUND)
+            addresses = self.cmc._query_contract_addresses_by_id(ids, PRIORITY_BACKGROUND)
+            for t in by_id:
+                if t.cmc_id in infos:
+                    fetched[t.token_id] = (infos[t.cmc_id], addresses.get(t.cmc_id, {}))
+        if by_symbol:
+            symbols = [t.symbol for t in by_symbol]
+            # Raised like the id path, a failed request must not mark the batch as fetched.
+            infos = self.cmc._query_token_infos(symbols, PRIORITY_BACKGROUND, raise_errors=True)
+            addresses = self.cmc._query_contract_addresses(
+                infos.index.to_list(), PRIORITY_BACKGROUND, raise_errors=True
+            )
+            for t in by_symbol:
+                if t.symbol in infos.index:
+                    fetched[t.token_id] = (
+                        infos.loc[t.symbol].to_dict(),
+                        addresses.get(t.symbol, {}),
+                    )
+
+        current_addresses = self._query_addresses_bulk([t.symbol for t in batch])
+        changed_rows = []
+        changed_addresses = {}
+        changed_symbols = set()
+        for t in batch:
+            if t.token_id not in fetched:
+                continue
+            info, addresses = fetched[t.token_id]
+            row = (
+                info["slug"],
+                self._to_sql_value(info["max_supply"]),
+                self._to_sql_value(info["infinite_supply"]),
+                self._to_sql_value(info["id"]),
+            )
+            if row != (t.slug, t.max_supply, t.infinite_supply, t.cmc_id):
+                changed_rows.append(row + (t.token_id,))
+                changed_symbols.add(t.symbol)
+            current = current_addresses.get(t.symbol, {})
+            new = {n: a for n, a in addresses.items() if current.get(n) != a}
+            if new:
+                changed_addresses[t.token_id] = new
+                changed_symbols.add(t.symbol)
+
+        with self.transaction():
+            if changed_rows:
+                self.cursor.executemany(
+                    """
+                UPDATE Tokens
+                SET TokenSlug = ?, MaxSupply = ?, InfiniteSupply = ?, CmcId = ?
+                WHERE TokenId = ?
+                """,
+                    changed_rows,
+                )
+            self._write_token_addresses(changed_addresses)
+            # Tokens Coinmarketcap didn't return are marked too, so they don't use up every run.
+            fetched_at = self._now()
+            self.cursor.executemany(
+                """UPDATE Tokens SET FetchedAt = ? WHERE TokenId = ?""",
+                [(fetched_at, t.token_id) for t in batch],
+            )
+        if changed_symbols:
+            self.invalidate_cache(list(changed_symbols))
+            self._update_address_index(list(changed_symbols))
+        return (
+            len(batch),
+            len(changed_symbols),
+            sum(len(a) for a in changed_addresses.values()),
+        )
+
+    def _record_access(self, symbol: str):
+        with self._access_lock:
+            self._access_counts[symbol] += 1
+
+    def _record_accesses(self, symbols: list):
+        with self._access_lock:
+            self._access_counts.update(symbols)
+
+    def flush_access_counts(self):
+        """
+        Add the lookups counted in memory to 'Tokens.AccessCount', in one statement.
+        """
+        with self._access_lock:
+            counts, self._access_counts = self._access_counts, Counter()
+        if not counts:
+            return
+        self._submit_write("access_counts", [(count, symbol) for symbol, count in counts.items()])
+
+    def _write_access_counts(self, rows: list):
+        # Rows of (count, symbol). Expected to run inside a transaction.
+        self.cursor.executemany(
+            """UPDATE Tokens SET AccessCount = AccessCount + ? WHERE TokenSymbol = ?""", rows
+        )
+
+    def _submit_write(self, operation: str, *args):
+        """
+        Run a write of 'WRITE_OPERATIONS' in its own transaction, or send it to the writer if there is one.
+        Returns once it is committed.
+        """
+        if self.writer is not None:
+            return self.writer.submit(operation, args)
+        with self.transaction():
+            return getattr(self, self.WRITE_OPERATIONS[operation])(*args)
+
+    def _now(self, offset: float = 0) -> str:
+        """
+        Current UTC time as an ISO string, shifted by 'offset' seconds. Strings compare in time order.
+        """
+        now = datetime.now(timezone.utc) + timedelta(seconds=offset)
+        return now.isoformat(timespec="seconds")
+
+    """
+    ===================================================================
+    Cache
+    ===================================================================
+    """
+
+    def invalidate_cache(self, symbols: list = None):
+        """
+        Drop cached lookups so they are read from the database again.
+
+        Parameters
+        ----------
+        symbols : list, optional
+            Symbols to invalidate. If None, the whole cache is cleared, by default None
+        """
+        if symbols is None:
+            self.cache.clear()
+            return
+        symbols = set(self._normalize_symbols(symbols))
+        self.cache.invalidate_where(
+            lambda key: key[0] in ("info", "addresses", "address") and key[1] in symbols
+        )
+
+    def warm_cache(self, symbols: list = None) -> int:
+        """
+        Load the addresses of tokens into the cache with one query per batch, so their lookups are answered from memory.
+        At most 'cache_size' entries are kept.
+
+        Parameters
+        ----------
+        symbols : list, optional
+            Symbols to load. If None, every token in the database, by default None
+
+        Returns
+        -------
+        int
+            Number of tokens loaded.
+        """
+        if symbols is None:
+            self.cursor.execute("""SELECT TokenSymbol FROM Tokens""")
+            symbols = [row[0] for row in self.cursor.fetchall()]
+        else:
+            symbols = self._normalize_symbols(symbols)
+        addresses = self._query_addresses_bulk(symbols)
+        for symbol, token_addresses in addresses.items():
+            self.cache.set(("addresses", symbol), token_addresses)
+        if self.log:
+            logger.info("[Cache] Loaded the addresses of %s tokens.", len(addresses))
+        return len(addresses)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    def _existing_symbols(self, symbols: list) -> set:
+        existing = set()
+        for batch in self._chunk(symbols, self.max_query_variables):
+            placeholders = ", ".join("?" for _ in batch)
+            self.cursor.execute(
+                f"""SELECT TokenSymbol FROM Tokens WHERE TokenSymbol IN ({placeholders})""",
+                batch,
+            )
+            existing.update(row[0] for row in self.cursor.fetchall())
+        return existing
+
+    def _normalize_symbols(self, symbols: list) -> list:
+        """
+        Uppercase symbols and drop duplicates, while keeping their order.
+        """
+        return list(dict.fromkeys(s.upper() for s in symbols))
+
+    def _chunk(self, items: list, size: int) -> list:
+        return [items[i : i + size] for i in range(0, len(items), size)]
+
+    def _to_sql_value(self, value):
+        """
+        Convert pandas/numpy scalars to plain python values sqlite can store.
+        """
+        if pd.isna(value):
+            return None
+        if hasattr(value, "item"):
+            return value.item()
+        return value
 
     """
     ===================================================================
@@ -318,31 +1679,121 @@ class Database:
         Returns: bool
             True if token exists in table, False if not.
         """
+        self.cursor.execute(
+            """
+            SELECT TokenSlug 
+            FROM Tokens
+            WHERE TokenSymbol = ? 
+        """,
+            (symbol.upper(),),
+        )
         try:
-            self.cursor.execute(
-                """
-                SELECT TokenSlug 
-                FROM Tokens
-                WHERE TokenSymbol = ? 
-            """,
-                (symbol.upper(),),
-            )
-            try:
-                result = self.cursor.fetchone()[0]
-                return True
-            except TypeError:
-                return False
-        except sqlite3.OperationalError:
-            self.create_token_table()
-            if self.log:
-                print(f"[Tokens] Table Created")
+            result = self.cursor.fetchone()[0]
+            return True
+        except TypeError:
             return False
 
 
 if __name__ == "__main__":
 
-    d = Database()
-    network = "Arbitrum"
+    parser = argparse.ArgumentParser(description="Local database of token and network data.")
+    commands = parser.add_subparsers(dest="command")
+    warm_up_parser = commands.add_parser(
+        "warmup", help="Load every token listed by Coinmarketcap."
+    )
+    warm_up_parser.add_argument(
+        "--page-size", type=int, default=5000, help="Tokens read per map request."
+    )
+    warm_up_parser.add_argument(
+        "--restart", action="store_true", help="Ignore the saved position and start over."
+    )
+    refresh_parser = commands.add_parser(
+        "refresh", help="Re-fetch stored tokens older than the refresh TTL."
+    )
+    refresh_parser.add_argument(
+        "--ttl", type=float, help="Age in seconds after which a token is stale."
+    )
+    refresh_parser.add_argument(
+        "--limit", type=int, help="Maximum number of tokens to check."
+    )
+    networks_parser = commands.add_parser(
+        "networks", help="Load a chain registry (chainlist JSON or CSV) into 'Networks'."
+    )
+    networks_parser.add_argument("path", help="Path of the registry file.")
+    snapshot_parser = commands.add_parser(
+        "snapshot", help="Publish a read-only snapshot of the tokens for 'snapshot.Snapshot' readers."
+    )
+    snapshot_parser.add_argument("--path", help="Path of the snapshot, by default the 'snapshot_path' config key.")
+    writer_parser = commands.add_parser(
+        "writer", help="Apply the writes of every process using the 'ingest_writer' config key."
+    )
+    writer_parser.add_argument("--address", help="host:port to listen on, by default the config's.")
+    serve_parser = commands.add_parser(
+        "serve", help="Answer address and network lookups over HTTP, see 'server.LookupServer'."
+    )
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument(
+        "--cache-size", type=int, default=2**20, help="Lookups kept in memory."
+    )
+    serve_parser.add_argument(
+        "--max-batch", type=int, default=1000, help="Maximum symbols or addresses per batch request."
+    )
+    serve_parser.add_argument(
+        "--no-preload", action="store_true", help="Load tokens on their first lookup instead of at startup."
+    )
+    parser.add_argument(
+        "--metrics", action="store_true", help="Print metrics in the Prometheus format when done."
+    )
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+        sys.exit()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.metrics:
+        METRICS.enable()
+    if args.command == "serve":
+        # The server builds its 'Database' from the 'database' module, this file runs as '__main__'.
+        from server import serve
 
-    info = d.get_network_info("Polygon")
-    print(info)
+        try:
+            serve(
+                args.host,
+                args.port,
+                cache_size=args.cache_size,
+                max_batch=args.max_batch,
+                preload=not args.no_preload,
+            )
+        except KeyboardInterrupt:
+            pass
+        sys.exit()
+    # The writer process is the one that writes directly.
+    d = Database(writer=False if args.command == "writer" else None)
+    if args.command == "warmup":
+        d.warm_up(page_size=args.page_size, restart=args.restart)
+    elif args.command == "refresh":
+        d.refresh_stale(ttl=args.ttl, limit=args.limit)
+    elif args.command == "networks":
+        d.load_chain_registry(args.path)
+    elif args.command == "snapshot":
+        d.export_snapshot(args.path)
+    elif args.command == "writer":
+        options = load_config().get("ingest_writer") or {}
+        writer = IngestWriter(
+            d,
+            max_batch=options.get("max_batch", 500),
+            max_delay=options.get("max_delay", 0.0),
+        )
+        try:
+            writer.serve(
+                args.address or options.get("address", DEFAULT_ADDRESS),
+                options.get("authkey"),
+            )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            writer.close()
+    d.close()
+    if args.metrics:
+        print(METRICS.to_prometheus(), end="")
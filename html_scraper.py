@@ -0,0 +1,159 @@
+import json
+
+from checksum import to_checksum_addresses
+from lazy_import import lazy_import
+
+requests = lazy_import("requests")
+
+DEFAULT_SITE_URL = "https://coinmarketcap.com"
+
+# Pages embed their data as JSON in this script tag (Next.js), so no browser is needed to read it.
+_NEXT_DATA_TAG = '<script id="__NEXT_DATA__"'
+_SCRIPT_END = "</script>"
+
+
+def extract_next_data(html: str) -> dict:
+    """
+    Extract the JSON embedded in the '__NEXT_DATA__' script tag of a page.
+
+    Parameters
+    ----------
+    html : str
+        Source of the page.
+
+    Returns
+    -------
+    dict
+        Decoded JSON. Raises ValueError if the page has no '__NEXT_DATA__' tag.
+    """
+    tag = html.find(_NEXT_DATA_TAG)
+    if tag == -1:
+        raise ValueError("Page has no '__NEXT_DATA__' script tag.")
+    start = html.find(">", tag) + 1
+    end = html.find(_SCRIPT_END, start)
+    if start == 0 or end == -1:
+        raise ValueError("'__NEXT_DATA__' script tag is not closed.")
+    return json.loads(html[start:end])
+
+
+def _find_detail(data):
+    try:
+        return data["props"]["pageProps"]["detailRes"]["detail"]
+    except (KeyError, TypeError):
+        pass
+    # The nesting of 'pageProps' changes between site releases. Otherwise the token is the dict
+    # holding 'platforms' next to its 'symbol'.
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if "symbol" in node and isinstance(node.get("platforms"), list):
+                return node
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return None
+
+
+def parse_token_page(html: str) -> dict:
+    """
+    Parse the page of a token ('/currencies/<slug>/').
+
+    Parameters
+    ----------
+    html : str
+        Source of the page.
+
+    Returns
+    -------
+    dict
+        'id', 'name', 'symbol', 'slug' and 'platforms', a list with one dict per network:
+            - network: Name of the network.
+            - address: Contract address, checksummed if it is an EVM address.
+            - chain_id: Chain id of the network, None for non-EVM networks.
+            - native: Symbol of the native currency of the network.
+            - native_name: Name of the native currency.
+        Raises ValueError if the page doesn't hold token data.
+    """
+    detail = _find_detail(extract_next_data(html))
+    if detail is None:
+        raise ValueError("Page holds no token data.")
+
+    platforms = [p for p in detail["platforms"] if p.get("contractAddress")]
+    addresses = to_checksum_addresses([p["contractAddress"] for p in platforms])
+    return {
+        "id": detail.get("id"),
+        "name": detail.get("name"),
+        "symbol": detail.get("symbol"),
+        "slug": detail.get("slug"),
+        "platforms": [
+            {
+                "network": p.get("contractPlatform"),
+                "address": address,
+                "chain_id": _to_chain_id(p.get("contractChainId")),
+                "native": p.get("contractNativeCurrencySymbol"),
+                "native_name": p.get("contractNativeCurrencyName"),
+            }
+            for p, address in zip(platforms, addresses)
+        ],
+    }
+
+
+def _to_chain_id(value):
+    # Missing for non-EVM networks, sometimes sent as a string.
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class HtmlScraper:
+    """
+    Reads token pages of the Coinmarketcap website over HTTP, without a browser.
+        - Pages are fetched with a pooled keep-alive session (the scraper's own, when given).
+        - Data is read from the JSON the site embeds in each page, nothing waits on rendering or XPaths.
+
+    Parameters
+    ----------
+    session : requests.Session, optional
+        Session to send requests with. A new one is created if None, by default None
+    site_url : str, optional
+        Base url of the website, by default DEFAULT_SITE_URL
+    timeout : float, optional
+        Seconds to wait for a page, by default 10.0
+    """
+
+    def __init__(
+        self, session=None, site_url: str = DEFAULT_SITE_URL, timeout: float = 10.0
+    ) -> None:
+        self.session = session if session is not None else requests.Session()
+        self.site_url = site_url.rstrip("/")
+        self.timeout = timeout
+        self.headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+            "Accept": "text/html",
+        }
+
+    def token_page_url(self, slug: str) -> str:
+        return f"{self.site_url}/currencies/{slug}/"
+
+    def fetch_page(self, url: str) -> str:
+        """
+        Get the source of a page. Failed requests raise 'requests.HTTPError'.
+        """
+        response = self.session.get(url, headers=self.headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def get_token_page(self, slug: str) -> dict:
+        """
+        Fetch and parse the page of a token, see 'parse_token_page'.
+
+        Parameters
+        ----------
+        slug : str
+            Slug of the token, e.g. "tether".
+        """
+        return parse_token_page(self.fetch_page(self.token_page_url(slug)))
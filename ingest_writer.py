@@ -0,0 +1,354 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# The writer only listens on localhost by default. There is no default authkey, see 'require_authkey'.
+DEFAULT_ADDRESS = "127.0.0.1:6544"
+
+
+def parse_address(address) -> tuple:
+    """
+    Convert "host:port" (or a port number) to the (host, port) tuple used by 'multiprocessing.connection'.
+    """
+    if isinstance(address, tuple):
+        return address
+    if isinstance(address, int):
+        return ("127.0.0.1", address)
+    host, _, port = str(address).rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def require_authkey(authkey) -> bytes:
+    """
+    Check the key the writer and its clients authenticate with. Messages are pickled, so anyone knowing the key
+    can run code in the writer: it must be set (the "authkey" of the 'ingest_writer' config key) and kept private.
+
+    Raises
+    ------
+    ValueError
+        If the key is missing or empty.
+    """
+    if not isinstance(authkey, str) or not authkey.strip():
+        raise ValueError(
+            "The ingest writer needs an 'authkey': set a long random value under the 'ingest_writer' config key."
+        )
+    return authkey.encode()
+
+
+class IngestWriter:
+    """
+    Single writer of a database. Writes are queued and applied by one thread, in batched transactions.
+        - Every write queued while a transaction commits goes in the next one (group commit),
+          so the number of transactions stays flat as the number of writers grows.
+        - Each write runs in its own savepoint, a failing write is rolled back alone and raises in its caller.
+        - 'submit' returns once the write is committed, so callers read their own writes.
+        - 'serve' also accepts writes from other processes over a local socket (see 'IngestClient').
+
+    Parameters
+    ----------
+    database : Database
+        Database the writes are applied to. Operations are the methods listed in 'Database.WRITE_OPERATIONS'.
+    max_batch : int, optional
+        Maximum number of writes per transaction, by default 500
+    max_delay : float, optional
+        Seconds to wait for more writes before starting a transaction. 0 only batches the writes already queued,
+        by default 0.0
+    """
+
+    def __init__(self, database, max_batch: int = 500, max_delay: float = 0.0) -> None:
+        self.database = database
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.transactions = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._listener = None
+        self._authkey = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self) -> "IngestWriter":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ingest-writer", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def submit(self, operation: str, args: tuple = ()):
+        """
+        Queue a write and wait until it is committed.
+
+        Parameters
+        ----------
+        operation : str
+            Name of the operation, a key of 'Database.WRITE_OPERATIONS'.
+        args : tuple, optional
+            Arguments of the operation, by default ()
+
+        Returns
+        -------
+        Result of the operation. Errors raised by the operation are raised here.
+        """
+        return self.submit_async(operation, args).result()
+
+    def submit_async(self, operation: str, args: tuple = ()) -> Future:
+        """
+        Queue a write without waiting for it. The future is resolved once the write is committed.
+        """
+        if self._closed:
+            raise RuntimeError("Ingest writer is closed.")
+        if operation not in self.database.WRITE_OPERATIONS:
+            raise ValueError(f"Unknown write operation '{operation}'.")
+        self.start()
+        future = Future()
+        self._queue.put((operation, tuple(args), future))
+        return future
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return None
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                timeout = deadline - time.monotonic()
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop after this batch.
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: list) -> None:
+        database = self.database
+        start = time.perf_counter()
+        results = []
+        try:
+            with database.transaction() as cursor:
+                for operation, args, future in batch:
+                    cursor.execute("SAVEPOINT ingest_write")
+                    try:
+                        result = getattr(database, database.WRITE_OPERATIONS[operation])(*args)
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO ingest_write")
+                        cursor.execute("RELEASE ingest_write")
+                        results.append((future, None, e))
+                    else:
+                        cursor.execute("RELEASE ingest_write")
+                        results.append((future, result, None))
+        except Exception as e:
+            # The transaction itself failed (e.g. the lock wasn't released within the busy timeout).
+            logger.warning("[IngestWriter] Batch of %s writes failed: %s", len(batch), e)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.transactions += 1
+        self.writes += len(batch)
+        if METRICS.enabled:
+            METRICS.observe("ingest_batch_size", len(batch))
+            METRICS.observe("ingest_transaction_seconds", time.perf_counter() - start)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    """
+    ===================================================================
+    Socket
+    ===================================================================
+    """
+
+    def serve(self, address, authkey: str) -> None:
+        """
+        Accept writes from 'IngestClient' connections until 'close' is called. Blocks the calling thread.
+
+        Parameters
+        ----------
+        address : str
+            "host:port" to listen on, e.g. "127.0.0.1:6544"
+        authkey : str
+            Key clients authenticate with. Messages are pickled, only trusted clients may know it.
+        """
+        from multiprocessing import AuthenticationError
+        from multiprocessing.connection import Listener
+
+        self._authkey = require_authkey(authkey)
+        self.start()
+        listener = self._listener = Listener(parse_address(address), authkey=self._authkey)
+        logger.info("[IngestWriter] Listening on %s:%s.", *listener.address)
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    # A client failed to authenticate or hung up during the handshake.
+                    if self._closed:
+                        break
+                    continue
+                if self._closed:
+                    conn.close()
+                    break
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+    def _serve_connection(self, conn) -> None:
+        # One request at a time per connection, clients wait for each write to be committed.
+        with conn:
+            while True:
+                try:
+                    operation, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send((True, self.submit(operation, args)))
+                except Exception as e:
+                    try:
+                        conn.send((False, e))
+                    except Exception:
+                        # The exception couldn't be pickled.
+                        conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+    def close(self) -> None:
+        """
+        Stop accepting writes, apply the ones already queued and stop the writer thread.
+        """
+        self._closed = True
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            # 'accept' isn't interrupted by closing the socket from another thread, a connection wakes it up.
+            from multiprocessing.connection import Client
+
+            try:
+                Client(listener.address, authkey=self._authkey).close()
+            except Exception:
+                listener.close()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+class IngestClient:
+    """
+    Sends writes to an 'IngestWriter' serving in another process.
+    Each thread has its own connection, opened on its first write.
+
+    Parameters
+    ----------
+    address : str
+        "host:port" of the writer, e.g. "127.0.0.1:6544"
+    authkey : str
+        Key of the writer.
+    connect_timeout : float, optional
+        Seconds to retry connecting while the writer starts, by default 5.0
+    """
+
+    def __init__(
+        self,
+        address,
+        authkey: str,
+        connect_timeout: float = 5.0,
+    ) -> None:
+        self.address = parse_address(address)
+        self.authkey = require_authkey(authkey)
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Build the client described by the 'ingest_writer' config key.
+
+        Returns
+        -------
+        IngestClient
+            The client, or None if the key isn't set.
+
+        Raises
+        ------
+        ValueError
+            If the key is set without an "authkey".
+        """
+        options = config.get("ingest_writer")
+        if not options:
+            return None
+        options = dict(options) if isinstance(options, dict) else {}
+        return cls(
+            options.get("address", DEFAULT_ADDRESS),
+            options.get("authkey"),
+        )
+
+    def _connect(self):
+        from multiprocessing.connection import Client
+
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+                break
+            except ConnectionRefusedError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def connect(self):
+        """
+        Open the connection of the calling thread if it isn't open yet, e.g. to fail at startup if the writer is down.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def submit(self, operation: str, args: tuple = ()):
+        """
+        Send a write to the writer and wait until it is committed. Errors of the write are raised here.
+        """
+        conn = self.connect()
+        try:
+            conn.send((operation, tuple(args)))
+            ok, result = conn.recv()
+        except (EOFError, OSError):
+            # The writer went away, the next write reconnects.
+            self._local.conn = None
+            raise
+        if not ok:
+            raise result
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except OSError:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,60 @@
+import importlib
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is only imported when one of its attributes is first used.
+    Heavy dependencies (pandas, requests) are declared this way, so importing this package stays fast
+    for code paths that never touch them.
+
+    Parameters
+    ----------
+    name : str
+        Name of the module to import.
+    setup : Callable, optional
+        Called with the module once it is imported, e.g. to set options, by default None
+    """
+
+    def __init__(self, name: str, setup=None) -> None:
+        super().__init__(name)
+        self._lazy_setup = setup
+        self._lazy_module = None
+        self._lazy_lock = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        if self._lazy_module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    module = importlib.import_module(self.__name__)
+                    if self._lazy_setup is not None:
+                        self._lazy_setup(module)
+                    self._lazy_module = module
+        return self._lazy_module
+
+    def __getattr__(self, attr: str):
+        # Only called for attributes not set in '__init__', i.e. the ones of the real module.
+        return getattr(self._load(), attr)
+
+    def __dir__(self) -> list:
+        return dir(self._load())
+
+
+def lazy_import(name: str, setup=None) -> LazyModule:
+    """
+    Declare a module to be imported on first use.
+
+    Parameters
+    ----------
+    name : str
+        Name of the module, e.g. 'pandas'.
+    setup : Callable, optional
+        Called with the module once it is imported, by default None
+
+    Returns
+    -------
+    LazyModule
+        Proxy forwarding attribute access to the module.
+    """
+    return LazyModule(name, setup)
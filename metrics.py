@@ -0,0 +1,342 @@
+import time
+import types
+import bisect
+import functools
+import threading
+
+# Upper bounds (seconds) of the latency histogram buckets. The last bucket is +Inf.
+DEFAULT_BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+)
+
+# Prefix of the metric names in the Prometheus output.
+NAMESPACE = "cmc"
+
+# Code object flags (see 'inspect'), checked directly so importing this module stays cheap.
+CO_GENERATOR = 0x20
+CO_COROUTINE = 0x80
+CO_ASYNC_GENERATOR = 0x200
+
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms.
+        - Disabled by default. Instrumented code checks 'enabled' first, so a disabled registry costs
+          one attribute read per call.
+        - Series are identified by a name and labels, e.g. ("api_requests_total", endpoint=..., status="200").
+        - Read with 'snapshot' (dict) or 'to_prometheus' (text exposition format).
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        Record metrics, by default False
+    buckets : tuple, optional
+        Upper bounds of the histogram buckets in seconds, by default DEFAULT_BUCKETS
+    """
+
+    def __init__(self, enabled: bool = False, buckets: tuple = DEFAULT_BUCKETS) -> None:
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    """-----------------------------------"""
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Add 'value' to a counter. Does nothing while disabled.
+        """
+        if self.enabled:
+            self._inc(name, tuple(sorted(labels.items())), value)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """
+        Record a duration in a histogram. Does nothing while disabled.
+        """
+        if self.enabled:
+            self._observe(name, tuple(sorted(labels.items())), seconds)
+
+    def timer(self, name: str, **labels):
+        """
+        Context manager recording the duration of its block in a histogram.
+
+        Example
+        -------
+            with METRICS.timer("refresh_seconds"):
+                ...
+        """
+        return _Timer(self, name, tuple(sorted(labels.items())))
+
+    def _inc(self, name: str, labels: tuple, value: float) -> None:
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _observe(self, name: str, labels: tuple, seconds: float) -> None:
+        key = (name, labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Count per bucket (the last one is +Inf), sum, count.
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    """-----------------------------------"""
+
+    def snapshot(self) -> dict:
+        """
+        Current values of every series.
+
+        Returns
+        -------
+        dict
+            {"counters": {name: {labels: value}}, "histograms": {name: {labels: {...}}}}.
+            Labels are formatted as in Prometheus ('method="get_token_info"'), "" for a series without labels.
+            Histograms have their count, sum, mean, p50/p99 (upper bound of the bucket) and cumulative buckets.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (list(counts), total, count)
+                for key, (counts, total, count) in self._histograms.items()
+            }
+
+        result = {"counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].setdefault(name, {})[_format_labels(labels)] = value
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            cumulative = _cumulative(counts)
+            result["histograms"].setdefault(name, {})[_format_labels(labels)] = {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "p50": self._quantile(cumulative, 0.50),
+                "p99": self._quantile(cumulative, 0.99),
+                "buckets": dict(zip(self._bucket_labels(), cumulative)),
+            }
+        return result
+
+    def _quantile(self, cumulative: list, q: float) -> float:
+        count = cumulative[-1]
+        if not count:
+            return 0.0
+        index = bisect.bisect_left(cumulative, q * count)
+        return self.buckets[index] if index < len(self.buckets) else float("inf")
+
+    def _bucket_labels(self) -> list:
+        return [repr(float(b)) for b in self.buckets] + ["+Inf"]
+
+    def to_prometheus(self) -> str:
+        """
+        Every series in the Prometheus text exposition format.
+
+        Returns
+        -------
+        str
+            Metrics prefixed with 'NAMESPACE', e.g. 'cmc_api_requests_total{endpoint="...",status="200"} 12'.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._histograms.items()
+            )
+
+        lines = []
+        previous = None
+        for (name, labels), value in counters:
+            name = f"{NAMESPACE}_{name}"
+            if name != previous:
+                lines.append(f"# TYPE {name} counter")
+                previous = name
+            lines.append(f"{name}{_braces(_format_labels(labels))} {value}")
+
+        for (name, labels), (counts, total, count) in histograms:
+            name = f"{NAMESPACE}_{name}"
+            if name != previous:
+                lines.append(f"# TYPE {name} histogram")
+                previous = name
+            label_str = _format_labels(labels)
+            for le, value in zip(self._bucket_labels(), _cumulative(counts)):
+                bucket_labels = f'{label_str},le="{le}"' if label_str else f'le="{le}"'
+                lines.append(f"{name}_bucket{{{bucket_labels}}} {value}")
+            lines.append(f"{name}_sum{_braces(label_str)} {total}")
+            lines.append(f"{name}_count{_braces(label_str)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: Metrics, name: str, labels: tuple) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.metrics.enabled:
+            self.metrics._observe(self.name, self.labels, time.perf_counter() - self.start)
+
+
+def _cumulative(counts: list) -> list:
+    total = 0
+    cumulative = []
+    for count in counts:
+        total += count
+        cumulative.append(total)
+    return cumulative
+
+
+def _format_labels(labels: tuple) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _braces(label_str: str) -> str:
+    return f"{{{label_str}}}" if label_str else ""
+
+
+# Shared by every instrumented class in the process.
+METRICS = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return METRICS
+
+
+"""-----------------------------------"""
+
+
+def instrument(cls):
+    """
+    Class decorator recording the latency ('method_seconds') and errors ('method_errors_total') of
+    every public method, labelled with the class and method name.
+    Generator methods are left as they are, their body runs after the call returns.
+    """
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or not isinstance(attr, types.FunctionType):
+            continue
+        if attr.__code__.co_flags & (CO_GENERATOR | CO_ASYNC_GENERATOR):
+            continue
+        setattr(cls, name, _instrument_method(attr, cls.__name__))
+    return cls
+
+
+def _instrument_method(fn, owner: str):
+    labels = (("class", owner), ("method", fn.__name__))
+
+    if fn.__code__.co_flags & CO_COROUTINE:
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return await fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except BaseException:
+                METRICS._inc("method_errors_total", labels, 1)
+                raise
+            finally:
+                METRICS._observe("method_seconds", labels, time.perf_counter() - start)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not METRICS.enabled:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            METRICS._inc("method_errors_total", labels, 1)
+            raise
+        finally:
+            METRICS._observe("method_seconds", labels, time.perf_counter() - start)
+
+    return wrapper
+
+
+class TimedCursor:
+    """
+    sqlite3 cursor recording the time of each statement ('sqlite_query_seconds'),
+    labelled with its kind (SELECT, INSERT, ...). Everything else is passed to the cursor.
+    Handed out by 'ConnectionManager.cursor' while metrics are enabled.
+    """
+
+    __slots__ = ("_cursor",)
+
+    def __init__(self, cursor) -> None:
+        self._cursor = cursor
+
+    def execute(self, sql: str, parameters=()):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, parameters)
+        finally:
+            METRICS._observe(
+                "sqlite_query_seconds", _statement_labels(sql), time.perf_counter() - start
+            )
+
+    def executemany(self, sql: str, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, seq_of_parameters)
+        finally:
+            METRICS._observe(
+                "sqlite_query_seconds", _statement_labels(sql), time.perf_counter() - start
+            )
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+_statement_cache = {}
+
+
+def _statement_labels(sql: str) -> tuple:
+    labels = _statement_cache.get(sql)
+    if labels is None:
+        words = sql.split(None, 1)
+        labels = (("statement", words[0].upper() if words else ""),)
+        # Statements are mostly literals, but bound the cache in case some are built per call.
+        if len(_statement_cache) < 1024:
+            _statement_cache[sql] = labels
+    return labels
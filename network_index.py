@@ -0,0 +1,253 @@
+import os
+import re
+import csv
+import json
+
+from records import NetworkRecord
+
+# Coinmarketcap names of well known networks, by chain id. Registry entries of these chains are stored
+# under these names, so they match the network names of the addresses returned by the API.
+CMC_NETWORK_NAMES = {
+    "1": "Ethereum",
+    "10": "Optimism",
+    "25": "Cronos",
+    "56": "BNB Smart Chain (BEP20)",
+    "100": "Gnosis Chain",
+    "137": "Polygon",
+    "250": "Fantom",
+    "324": "zkSync Era",
+    "1101": "Polygon zkEVM",
+    "5000": "Mantle",
+    "8453": "Base",
+    "42161": "Arbitrum",
+    "42220": "Celo",
+    "43114": "Avalanche C-Chain",
+    "59144": "Linea",
+    "81457": "Blast",
+    "534352": "Scroll",
+}
+
+# Other names the same networks go by (chain registries, explorers, abbreviations).
+DEFAULT_ALIASES = {
+    "Ethereum": ("Ethereum Mainnet", "eth", "mainnet", "erc20"),
+    "BNB Smart Chain (BEP20)": (
+        "BNB Smart Chain Mainnet",
+        "BNB Chain",
+        "Binance Smart Chain",
+        "bsc",
+        "bnb",
+        "bep20",
+    ),
+    "Arbitrum": ("Arbitrum One", "arb1", "arb"),
+    "Optimism": ("OP Mainnet", "op", "oeth"),
+    "Polygon": ("Polygon Mainnet", "Polygon PoS", "matic", "pol"),
+    "Polygon zkEVM": ("zkevm",),
+    "Avalanche C-Chain": ("Avalanche", "Avalanche C-Chain Mainnet", "avax"),
+    "Base": ("Base Mainnet",),
+    "zkSync Era": ("zkSync Mainnet", "zksync"),
+    "Gnosis Chain": ("Gnosis", "xdai"),
+    "Fantom": ("Fantom Opera", "ftm"),
+    "Cronos": ("Cronos Mainnet", "cro"),
+    "Linea": ("Linea Mainnet",),
+    "Scroll": ("Scroll Mainnet",),
+    "Celo": ("Celo Mainnet",),
+    "Mantle": ("Mantle Mainnet",),
+    "Blast": ("Blast Mainnet",),
+}
+
+_NOT_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+_PARENTHESES = re.compile(r"\s*\(.*?\)")
+
+
+def normalize_network_name(name: str) -> str:
+    """
+    Key used to match network names: lowercase letters and digits only ("Arbitrum One" -> "arbitrumone").
+    """
+    return _NOT_ALPHANUMERIC.sub("", str(name).lower())
+
+
+def normalize_chain_id(chain_id) -> str:
+    """
+    Chain ids are stored as text. Ids read as floats (e.g. '137.0') are trimmed, missing ids are "".
+    """
+    if chain_id is None:
+        return ""
+    chain_id = str(chain_id).strip()
+    if chain_id.endswith(".0"):
+        chain_id = chain_id[:-2]
+    return chain_id
+
+
+class NetworkIndex:
+    """
+    In-memory index of networks, resolving a name, an alias or a chain id with one dictionary access.
+        - Names are Coinmarketcap network names, the ones stored in 'Networks'.
+        - Aliases are matched on their normalized form, so "Arbitrum One", "arbitrum-one" and "ARBITRUM ONE" are the same.
+          A name is also an alias of itself, with and without its parenthesized part ("BNB Smart Chain").
+        - Coinmarketcap lists some networks under the same chain id, every name of a chain id is kept (in order).
+    """
+
+    def __init__(self) -> None:
+        self._by_name = {}
+        self._by_chain_id = {}
+        self._aliases = {}
+
+    def add(self, name: str, native: str = "", chain_id="", aliases=()) -> None:
+        """
+        Add a network, or update it if it is already indexed.
+
+        Parameters
+        ----------
+        name : str
+            Coinmarketcap name of the network.
+        native : str, optional
+            Symbol of the native currency, by default ""
+        chain_id : optional
+            Chain id, "" for non-EVM networks, by default ""
+        aliases : Iterable, optional
+            Other names of the network, by default ()
+        """
+        chain_id = normalize_chain_id(chain_id)
+        previous = self._by_name.get(name)
+        if previous is not None and previous.chain_id and previous.chain_id != chain_id:
+            names = self._by_chain_id.get(previous.chain_id, ())
+            self._by_chain_id[previous.chain_id] = tuple(n for n in names if n != name)
+        self._by_name[name] = NetworkRecord(name, native, chain_id)
+        if chain_id and name not in self._by_chain_id.get(chain_id, ()):
+            self._by_chain_id[chain_id] = self._by_chain_id.get(chain_id, ()) + (name,)
+        self.add_aliases(name, (name, _PARENTHESES.sub("", name), *aliases))
+
+    def add_aliases(self, name: str, aliases, replace: bool = True) -> None:
+        # Names win over aliases, an alias never hides another network's own name.
+        # With 'replace' off, aliases already indexed are kept (first wins).
+        for alias in aliases:
+            key = normalize_network_name(alias)
+            if not key:
+                continue
+            current = self._aliases.get(key)
+            if current is not None and not replace:
+                continue
+            if current is None or current not in self._by_name or key != normalize_network_name(current):
+                self._aliases[key] = name
+
+    def has_alias(self, value) -> bool:
+        """
+        Whether a name or alias is already indexed, on its normalized form.
+        """
+        return normalize_network_name(value) in self._aliases
+
+    def resolve(self, value) -> str:
+        """
+        Get the Coinmarketcap name of a network from its name, an alias or its chain id.
+
+        Returns
+        -------
+        str
+            Name of the network. None if it isn't known.
+        """
+        if value in self._by_name:
+            return value
+        name = self._aliases.get(normalize_network_name(value))
+        if name is not None:
+            return name
+        names = self._by_chain_id.get(normalize_chain_id(value))
+        return names[0] if names else None
+
+    def get(self, value) -> NetworkRecord:
+        """
+        Get the record of a network from its name, an alias or its chain id. None if it isn't indexed.
+        """
+        name = self.resolve(value)
+        return self._by_name.get(name) if name is not None else None
+
+    def get_by_chain_id(self, chain_id) -> NetworkRecord:
+        names = self._by_chain_id.get(normalize_chain_id(chain_id))
+        return self._by_name[names[0]] if names else None
+
+    def names_for_chain_id(self, chain_id) -> tuple:
+        """
+        Names of every network listed under a chain id.
+        """
+        return self._by_chain_id.get(normalize_chain_id(chain_id), ())
+
+    def aliases_of(self, name: str) -> list:
+        return [alias for alias, target in self._aliases.items() if target == name]
+
+    def alias_items(self) -> list:
+        """
+        Every (normalized alias, name) pair of the index.
+        """
+        return list(self._aliases.items())
+
+    def names(self) -> list:
+        return list(self._by_name)
+
+    def __contains__(self, value) -> bool:
+        return self.resolve(value) is not None
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+
+def default_aliases(index: NetworkIndex) -> NetworkIndex:
+    """
+    Add the aliases of 'DEFAULT_ALIASES' to an index, mapping to Coinmarketcap names.
+    """
+    for name, aliases in DEFAULT_ALIASES.items():
+        index.add_aliases(name, (name, *aliases))
+    return index
+
+
+"""-----------------------------------"""
+
+
+def read_chain_registry(path: str) -> list:
+    """
+    Read a chain registry file.
+        - JSON: a list of chains in the chainlist format ('name', 'chainId', 'shortName', 'chain', 'nativeCurrency'),
+          or an object with the list under "chains".
+        - CSV: a header with 'name' and 'chain_id' (or 'chainId'), and optionally 'native' and 'aliases'
+          (separated by '|').
+
+    Parameters
+    ----------
+    path : str
+        Path of the file, read as JSON if it ends with '.json', as CSV otherwise.
+
+    Returns
+    -------
+    list
+        One dict per chain with 'name', 'chain_id' (str), 'native' and 'aliases' (list).
+    """
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if isinstance(data, dict):
+            data = data.get("chains", [])
+        entries = [_from_chainlist(chain) for chain in data]
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as file:
+            entries = [_from_csv_row(row) for row in csv.DictReader(file)]
+    return [e for e in entries if e["name"] and e["chain_id"]]
+
+
+def _from_chainlist(chain: dict) -> dict:
+    native = chain.get("nativeCurrency") or {}
+    # Not 'chain', it is the L1 family ("ETH", "BSC") that testnets and L2s share.
+    aliases = [chain.get("title"), chain.get("shortName")]
+    return {
+        "name": (chain.get("name") or "").strip(),
+        "chain_id": normalize_chain_id(chain.get("chainId")),
+        "native": native.get("symbol", "") if isinstance(native, dict) else str(native),
+        "aliases": [a for a in aliases if a],
+    }
+
+
+def _from_csv_row(row: dict) -> dict:
+    aliases = row.get("aliases") or ""
+    return {
+        "name": (row.get("name") or "").strip(),
+        "chain_id": normalize_chain_id(row.get("chain_id") or row.get("chainId")),
+        "native": (row.get("native") or row.get("native_currency") or "").strip(),
+        "aliases": [a.strip() for a in aliases.split("|") if a.strip()],
+    }
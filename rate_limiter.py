@@ -0,0 +1,271 @@
+import time
+import math
+import heapq
+import itertools
+import threading
+
+from lazy_import import lazy_import
+
+# Only needed by 'acquire_async'.
+asyncio = lazy_import("asyncio")
+
+# Lower values are served first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Number of items covered by one credit on each endpoint, according to the Coinmarketcap API docs.
+ENDPOINT_ITEMS_PER_CREDIT = {
+    "/v1/cryptocurrency/quotes/latest": 100,
+    "/v1/cryptocurrency/info": 100,
+    "/v1/cryptocurrency/map": 5000,
+}
+
+# Limits of the free 'Basic' plan: 30 calls a minute and 10,000 credits a month.
+DEFAULT_PLAN = {
+    "calls_per_minute": 30,
+    "credits_per_day": 333,
+}
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def credit_cost(endpoint: str, items: int = 1) -> int:
+    """
+    Get the number of credits a call costs.
+
+    Parameters
+    ----------
+    endpoint : str
+        Path of the endpoint, e.g. '/v1/cryptocurrency/info'.
+    items : int, optional
+        Number of cryptocurrencies requested in the call, by default 1
+
+    Returns
+    -------
+    int
+        Credits charged for the call.
+    """
+    per_credit = ENDPOINT_ITEMS_PER_CREDIT.get(endpoint, 1)
+    return max(1, math.ceil(items / per_credit))
+
+
+def parse_retry_after(value, default: float) -> float:
+    """
+    Convert a 'Retry-After' header, given either in seconds or as an HTTP date, to seconds.
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+def get_default_scheduler(plan: dict = None) -> "CreditScheduler":
+    """
+    Get the scheduler shared by every scraper in the process.
+    'plan' is only used the first time the scheduler is created.
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = CreditScheduler(**{**DEFAULT_PLAN, **(plan or {})})
+        return _default_scheduler
+
+
+class TokenBucket:
+    """
+    Bucket holding up to 'capacity' tokens, refilled continuously at 'rate' tokens per second.
+    Not thread safe on its own, 'CreditScheduler' guards it with its lock.
+    """
+
+    def __init__(self, capacity: float, rate: float) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until 'amount' tokens are available. Amounts larger than the bucket wait for a full bucket.
+        """
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class CreditScheduler:
+    """
+    Schedules Coinmarketcap API calls within the limits of a plan.
+        - A per-minute bucket limits the number of calls.
+        - A per-day bucket limits the number of credits spent.
+        - Waiting calls are served in order of priority, then arrival.
+        - A 429 response pauses every call until its 'Retry-After' has passed.
+
+    Parameters
+    ----------
+    calls_per_minute : int, optional
+        Calls allowed per minute, by default 30
+    credits_per_day : int, optional
+        Credits allowed per day, by default 333
+    max_retries : int, optional
+        Number of times a throttled call is retried, by default 3
+    """
+
+    def __init__(
+        self,
+        calls_per_minute: int = 30,
+        credits_per_day: int = 333,
+        max_retries: int = 3,
+    ) -> None:
+        self.max_retries = max_retries
+        self._minute = TokenBucket(calls_per_minute, calls_per_minute / 60)
+        self._day = TokenBucket(credits_per_day, credits_per_day / 86400)
+        self._blocked_until = 0.0
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self.calls = 0
+        self.credits_used = 0
+        self.throttled = 0
+
+    def _wait_time(self, ticket: tuple, credits: int, now: float) -> float:
+        """
+        Seconds the call holding 'ticket' still has to wait. Must be called with the lock held.
+        """
+        if self._queue[0] != ticket:
+            # Only the first call in the queue is let through, the others wait their turn.
+            return None
+        return max(
+            self._blocked_until - now,
+            self._minute.wait_time(1, now),
+            self._day.wait_time(credits, now),
+        )
+
+    def _grant(self, ticket: tuple, credits: int) -> None:
+        heapq.heappop(self._queue)
+        self._minute.take(1)
+        self._day.take(credits)
+        self.calls += 1
+        self.credits_used += credits
+        self._cond.notify_all()
+
+    def acquire(
+        self, credits: int = 1, priority: int = PRIORITY_INTERACTIVE, timeout: float = None
+    ) -> bool:
+        """
+        Block until a call costing 'credits' may be made.
+
+        Parameters
+        ----------
+        credits : int, optional
+            Credits the call costs, by default 1
+        priority : int, optional
+            Lower values go first, by default PRIORITY_INTERACTIVE
+        timeout : float, optional
+            Maximum seconds to wait. Waits indefinitely if None, by default None
+
+        Returns
+        -------
+        bool
+            True if the call may be made, False if 'timeout' passed first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            ticket = (priority, next(self._counter))
+            heapq.heappush(self._queue, ticket)
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(ticket, credits, now)
+                if wait == 0:
+                    self._grant(ticket, credits)
+                    return True
+                if deadline is not None and now >= deadline:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    return False
+                if deadline is not None:
+                    wait = min(wait if wait is not None else deadline - now, deadline - now)
+                self._cond.wait(wait)
+
+    async def acquire_async(
+        self, credits: int = 1, priority: int = PRIORITY_INTERACTIVE
+    ) -> bool:
+        """
+        Asyncio version of 'acquire', the event loop is not blocked while waiting.
+        """
+        with self._cond:
+            ticket = (priority, next(self._counter))
+            heapq.heappush(self._queue, ticket)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._wait_time(ticket, credits, time.monotonic())
+                    if wait == 0:
+                        self._grant(ticket, credits)
+                        return True
+                # Calls ahead in the queue don't wake async waiters, so poll while not first.
+                await asyncio.sleep(0.05 if wait is None else wait)
+        except asyncio.CancelledError:
+            with self._cond:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                self._cond.notify_all()
+            raise
+
+    def backoff(self, retry_after: float, credits: int = 0) -> None:
+        """
+        Pause every call for 'retry_after' seconds, after the API answered with 429.
+        Rejected calls are not charged, so their 'credits' are given back.
+        """
+        with self._cond:
+            self.throttled += 1
+            self.credits_used -= credits
+            self._day.tokens = min(self._day.capacity, self._day.tokens + credits)
+            self._blocked_until = max(
+                self._blocked_until, time.monotonic() + retry_after
+            )
+            # The call was rejected, so the per-minute bucket was fuller than it looked.
+            self._minute.tokens = 0
+            self._cond.notify_all()
+
+    def remaining(self) -> dict:
+        """
+        Report the remaining budget.
+
+        Returns
+        -------
+        dict
+            Calls left this minute, credits left today, totals so far and the number of throttled calls.
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._minute._refill(now)
+            self._day._refill(now)
+            return {
+                "calls_this_minute": int(self._minute.tokens),
+                "credits_today": int(self._day.tokens),
+                "calls": self.calls,
+                "credits_used": self.credits_used,
+                "throttled": self.throttled,
+                "blocked_for": round(max(0.0, self._blocked_until - now), 3),
+                "queued": len(self._queue),
+            }
@@ -0,0 +1,117 @@
+class Record:
+    """
+    Compact result of a point lookup, built straight from a sqlite row.
+        - Fields are attributes ('record.chain_id') and can also be read by key ('record["chain_id"]'),
+          so code written against the pandas results keeps working.
+        - '__slots__' keeps each record to a few dozen bytes, with no per-instance dictionary.
+
+    Subclasses list their fields in '_fields', and can map other keys (e.g. column names) to fields in '_aliases'.
+    """
+
+    __slots__ = ()
+    _fields = ()
+    _aliases = {}
+
+    @classmethod
+    def from_row(cls, row: tuple):
+        """
+        Build a record from a sqlite row, with its columns in the order of '_fields'. Returns None for a missing row.
+        """
+        if row is None:
+            return None
+        return cls(*row)
+
+    def __getitem__(self, key: str):
+        field = self._aliases.get(key, key)
+        if field not in self._fields:
+            raise KeyError(key)
+        return getattr(self, field)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> tuple:
+        return self._fields
+
+    def values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def items(self) -> list:
+        return list(zip(self._fields, self.values()))
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={value!r}" for field, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+    def __reduce__(self):
+        return (type(self), self.values())
+
+
+class NetworkRecord(Record):
+    """
+    Row of the 'Networks' table.
+    """
+
+    __slots__ = _fields = ("name", "native", "chain_id")
+    _aliases = {"NetworkName": "name", "NativeCurrency": "native", "ChainId": "chain_id"}
+
+    def __init__(self, name: str, native: str, chain_id: str) -> None:
+        self.name = name
+        self.native = native
+        self.chain_id = chain_id
+
+
+class TokenRecord(Record):
+    """
+    Row of the 'Tokens' table. Column names ('TokenSlug', 'MaxSupply', ...) are accepted as keys.
+    """
+
+    __slots__ = _fields = (
+        "token_id",
+        "symbol",
+        "slug",
+        "max_supply",
+        "infinite_supply",
+        "cmc_id",
+    )
+    _aliases = {
+        "TokenId": "token_id",
+        "TokenSymbol": "symbol",
+        "TokenSlug": "slug",
+        "MaxSupply": "max_supply",
+        "InfiniteSupply": "infinite_supply",
+        "CmcId": "cmc_id",
+    }
+
+    def __init__(
+        self,
+        token_id: int,
+        symbol: str,
+        slug: str,
+        max_supply,
+        infinite_supply,
+        cmc_id: int = None,
+    ) -> None:
+        self.token_id = token_id
+        self.symbol = symbol
+        self.slug = slug
+        self.max_supply = max_supply
+        self.infinite_supply = infinite_supply
+        self.cmc_id = cmc_id
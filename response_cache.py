@@ -0,0 +1,353 @@
+import json
+import time
+import zlib
+import hashlib
+import threading
+from urllib.parse import urlparse
+
+from connection import ConnectionManager
+from metrics import METRICS
+
+# Seconds a response stays fresh, by endpoint. Quotes move, metadata and the id map rarely do.
+DEFAULT_TTLS = {
+    "/v1/cryptocurrency/quotes/latest": 300,
+    "/v1/cryptocurrency/info": 24 * 3600,
+    "/v1/cryptocurrency/map": 24 * 3600,
+}
+DEFAULT_TTL = 300
+
+# Parameters holding comma separated lists, where the order of the items doesn't change the response.
+LIST_PARAMS = ("symbol", "id", "slug")
+
+
+class CachedResponse:
+    """
+    Response read from the cache. Has the parts of 'requests.Response' the scraper uses.
+    """
+
+    __slots__ = ("url", "status_code", "headers", "content", "from_cache")
+
+    def __init__(self, url: str, status_code: int, headers: dict, content: bytes) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = True
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            import requests
+
+            raise requests.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+class ResponseCache:
+    """
+    On-disk cache of API responses, shared by processes using the same file and kept across restarts.
+        - Keyed by endpoint + normalized parameters, so '?symbol=ETH,BTC' and '?symbol=BTC,ETH' share an entry.
+          Headers (the API key) are not part of the key.
+        - Only successful (200) responses are stored, compressed with zlib.
+        - Entries expire after the TTL of their endpoint.
+        - The file is bounded to 'max_mb', least recently used entries are evicted first.
+          Hits only read the file: their access times are kept in memory and written with the next 'put',
+          eviction or 'close', so a hit never takes the write lock.
+        - In replay only mode expired entries are still served, and a miss is answered with a 504
+          instead of going to the network. Used to replay recorded traffic offline.
+
+    Parameters
+    ----------
+    path : str
+        Path of the sqlite file holding the responses.
+    ttls : dict, optional
+        Seconds a response stays fresh, by endpoint path. Merged over 'DEFAULT_TTLS', by default None
+    default_ttl : float, optional
+        TTL of endpoints missing from 'ttls', by default DEFAULT_TTL
+    max_mb : float, optional
+        Maximum size of the stored (compressed) bodies, by default 64
+    replay_only : bool, optional
+        Never go to the network, by default False
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttls: dict = None,
+        default_ttl: float = DEFAULT_TTL,
+        max_mb: float = 64,
+        replay_only: bool = False,
+    ) -> None:
+        self.path = path
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.replay_only = replay_only
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Access times of the hits since the last flush, by key.
+        self._accessed = {}
+        self._connections = ConnectionManager(path)
+        self._create_table()
+        self._size = self._stored_size()
+
+    @classmethod
+    def from_config(cls, config: dict, export_path: str):
+        """
+        Build the cache described by the 'response_cache' key of the config.
+
+        Returns
+        -------
+        ResponseCache
+            The cache, or None if it isn't enabled.
+        """
+        options = config.get("response_cache")
+        if not options:
+            return None
+        options = dict(options)
+        if not options.pop("enabled", True):
+            return None
+        return cls(f"{export_path}\\responses.db", **options)
+
+    def _create_table(self) -> None:
+        self._connections.get().execute(
+            """
+            CREATE TABLE IF NOT EXISTS Responses (
+                Key TEXT PRIMARY KEY,
+                Endpoint TEXT NOT NULL,
+                Status INTEGER NOT NULL,
+                Headers TEXT NOT NULL,
+                Body BLOB NOT NULL,
+                Size INTEGER NOT NULL,
+                StoredAt REAL NOT NULL,
+                AccessedAt REAL NOT NULL
+            )
+            """
+        )
+        self._connections.get().execute(
+            """CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON Responses (AccessedAt)"""
+        )
+
+    def _stored_size(self) -> int:
+        row = self._connections.get().execute("""SELECT SUM(Size) FROM Responses""").fetchone()
+        return row[0] or 0
+
+    def close(self) -> None:
+        if self._accessed:
+            with self._connections.transaction() as cursor:
+                self._flush_accesses(cursor)
+        self._connections.close_all()
+
+    def _flush_accesses(self, cursor) -> None:
+        # Written inside the caller's transaction. Keys deleted since their hit are no-ops.
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        if accessed:
+            cursor.executemany(
+                """UPDATE Responses SET AccessedAt = MAX(AccessedAt, ?) WHERE Key = ?""",
+                [(at, key) for key, at in accessed.items()],
+            )
+
+    """-----------------------------------"""
+
+    def make_key(self, url: str, params: dict) -> str:
+        """
+        Key of a request: its endpoint and its parameters, sorted. Items of list parameters are sorted too.
+        """
+        normalized = []
+        for name, value in sorted((params or {}).items()):
+            value = str(value)
+            if name in LIST_PARAMS:
+                value = ",".join(sorted(v.strip() for v in value.split(",")))
+            normalized.append((name, value))
+        raw = json.dumps([self._endpoint(url), normalized], separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _endpoint(self, url: str) -> str:
+        return urlparse(url).path
+
+    def ttl(self, url: str) -> float:
+        return self.ttls.get(self._endpoint(url), self.default_ttl)
+
+    def get(self, url: str, params: dict):
+        """
+        Get the stored response of a request.
+
+        Parameters
+        ----------
+        url : str
+            Endpoint of the request.
+        params : dict
+            Query parameters of the request.
+
+        Returns
+        -------
+        CachedResponse
+            The stored response, or None if it is missing or expired. In replay only mode a miss is a 504 response.
+        """
+        key = self.make_key(url, params)
+        conn = self._connections.get()
+        row = conn.execute(
+            """SELECT Status, Headers, Body, StoredAt FROM Responses WHERE Key = ?""",
+            (key,),
+        ).fetchone()
+        now = time.time()
+        if row is None or (not self.replay_only and row[3] + self.ttl(url) < now):
+            with self._lock:
+                self.misses += 1
+            METRICS.inc("cache_requests_total", cache="responses", result="miss")
+            if self.replay_only:
+                return self._replay_miss(url)
+            return None
+
+        with self._lock:
+            self._accessed[key] = now
+            self.hits += 1
+        METRICS.inc("cache_requests_total", cache="responses", result="hit")
+        status, headers, body, _ = row
+        return CachedResponse(url, status, json.loads(headers), zlib.decompress(body))
+
+    def _replay_miss(self, url: str) -> CachedResponse:
+        body = {
+            "status": {
+                "error_code": 504,
+                "error_message": "Request not in the response cache (replay only mode).",
+            }
+        }
+        return CachedResponse(url, 504, {}, json.dumps(body).encode("utf-8"))
+
+    def put(self, url: str, params: dict, response) -> None:
+        """
+        Store the response of a request. Anything but a 200 is ignored.
+
+        Parameters
+        ----------
+        url : str
+            Endpoint of the request.
+        params : dict
+            Query parameters of the request.
+        response : requests.Response
+            Response to store.
+        """
+        if response.status_code != 200 or self.replay_only:
+            return
+        body = zlib.compress(response.content, 6)
+        headers = {"Content-Type": response.headers.get("Content-Type", "application/json")}
+        now = time.time()
+        key = self.make_key(url, params)
+        with self._connections.transaction() as cursor:
+            self._flush_accesses(cursor)
+            cursor.execute("""SELECT Size FROM Responses WHERE Key = ?""", (key,))
+            previous = cursor.fetchone()
+            cursor.execute(
+                """
+                INSERT OR REPLACE INTO Responses
+                    (Key, Endpoint, Status, Headers, Body, Size, StoredAt, AccessedAt)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    self._endpoint(url),
+                    response.status_code,
+                    json.dumps(headers),
+                    body,
+                    len(body),
+                    now,
+                    now,
+                ),
+            )
+        with self._lock:
+            self._size += len(body) - (previous[0] if previous else 0)
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the stored size is below 90% of 'max_bytes'.
+        Other processes may write to the same file, so the size is read again first.
+
+        Returns
+        -------
+        int
+            Number of entries deleted.
+        """
+        target = int(self.max_bytes * 0.9)
+        deleted = 0
+        with self._connections.transaction() as cursor:
+            # Pending hits count, or recently read entries would be evicted as if unused.
+            self._flush_accesses(cursor)
+            cursor.execute("""SELECT SUM(Size) FROM Responses""")
+            size = cursor.fetchone()[0] or 0
+            if size > target:
+                cursor.execute(
+                    """SELECT Key, Size FROM Responses ORDER BY AccessedAt ASC"""
+                )
+                keys = []
+                for key, entry_size in cursor.fetchall():
+                    if size <= target:
+                        break
+                    keys.append((key,))
+                    size -= entry_size
+                cursor.executemany("""DELETE FROM Responses WHERE Key = ?""", keys)
+                deleted = len(keys)
+        with self._lock:
+            self._size = size
+            self.evictions += deleted
+        METRICS.inc("cache_evictions_total", deleted, cache="responses")
+        return deleted
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired entries.
+
+        Returns
+        -------
+        int
+            Number of entries deleted.
+        """
+        now = time.time()
+        deleted = 0
+        with self._connections.transaction() as cursor:
+            cursor.execute("""SELECT DISTINCT Endpoint FROM Responses""")
+            for (endpoint,) in cursor.fetchall():
+                ttl = self.ttls.get(endpoint, self.default_ttl)
+                cursor.execute(
+                    """DELETE FROM Responses WHERE Endpoint = ? AND StoredAt < ?""",
+                    (endpoint, now - ttl),
+                )
+                deleted += cursor.rowcount
+        with self._lock:
+            self._size = self._stored_size()
+        return deleted
+
+    def clear(self) -> None:
+        with self._connections.transaction() as cursor:
+            cursor.execute("""DELETE FROM Responses""")
+        with self._lock:
+            self._size = 0
+            self._accessed = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stored_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "replay_only": self.replay_only,
+            }
@@ -0,0 +1,313 @@
+import json
+import asyncio
+import logging
+
+from aiohttp import web
+
+from async_database import AsyncDatabase
+from database import By, Database
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def _json(value, status: int = 200) -> web.Response:
+    return web.Response(text=_dumps(value), status=status, content_type="application/json")
+
+
+def _error(message: str, status: int = 400) -> web.Response:
+    return _json({"error": message}, status)
+
+
+def _bad_request(message: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(text=_dumps({"error": message}), content_type="application/json")
+
+
+def _text_param(value, name: str) -> str:
+    """
+    Stripped value of a required text parameter. Missing, blank and non-string values are rejected with 400,
+    before anything is looked up (a blank symbol would still be sent to Coinmarketcap).
+    """
+    if not isinstance(value, str) or not value.strip():
+        raise _bad_request(f"'{name}' is required, as a non-empty string.")
+    return value.strip()
+
+
+def _network_param(params) -> tuple:
+    """
+    (value, By) of the network of a request, from its "chain_id" or "network" parameter.
+    """
+    chain_id = params.get("chain_id")
+    if chain_id is not None and str(chain_id).strip():
+        return str(chain_id).strip(), By.ID
+    network = params.get("network")
+    if isinstance(network, str) and network.strip():
+        return network.strip(), By.Network
+    return None, None
+
+
+class LookupServer:
+    """
+    HTTP server answering address lookups for services that don't embed the package. Responses are compact JSON.
+        - Every token's addresses are loaded into memory at startup, along with the network and address indexes.
+          Lookups of loaded tokens never wait on sqlite. They are loaded again every half cache TTL, which also picks
+          up tokens written by other processes.
+        - Tokens that aren't in the database are queried from 'Coinmarketcap' and inserted, like 'insert_token_data'.
+        - Connections are kept alive, and batch endpoints answer many lookups in one request.
+
+    Endpoints:
+        GET  /address?symbol=USDT&network=Arbitrum One      {"address": "0x..."}  (or &chain_id=42161)
+        GET  /addresses?symbols=USDT,WETH&chain_id=1        {"addresses": {"USDT": "0x...", "WETH": null}}
+        POST /addresses {"symbols": [...], "network": ...}  Same as GET.
+        GET  /token?symbol=USDT                             Token info and {network: address}
+        GET  /network?name=bsc                              {"name": ..., "native": ..., "chain_id": ...}  (or ?chain_id=56)
+        GET  /resolve?address=0x...&network=Ethereum        {"symbol": ..., "network": ...}
+        POST /resolve {"addresses": [...], "network": ...}  {"tokens": {"0x...": ["USDT", "Ethereum"], ...}}
+        GET  /health, GET /metrics (Prometheus format)
+    Single lookups that find nothing answer 404, batch lookups answer null for those entries.
+
+    Parameters
+    ----------
+    database : AsyncDatabase
+        Database the lookups are answered from.
+    max_batch : int, optional
+        Maximum number of symbols or addresses per batch request, by default 1000
+    preload : bool, optional
+        Load every token's addresses into the cache on 'start', by default True
+    """
+
+    def __init__(self, database: AsyncDatabase, max_batch: int = 1000, preload: bool = True) -> None:
+        self.db = database
+        self.max_batch = max_batch
+        self.preload = preload
+        self._runner = None
+        self._reload_task = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.get("/address", self.address),
+                web.get("/addresses", self.addresses),
+                web.post("/addresses", self.addresses),
+                web.get("/token", self.token),
+                web.get("/network", self.network),
+                web.get("/resolve", self.resolve),
+                web.post("/resolve", self.resolve_batch),
+                web.get("/health", self.health),
+                web.get("/metrics", self.metrics),
+            ]
+        )
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        database = self.db.db
+        # Built before the first request, so lookups are answered from memory.
+        await self.db._read(database._get_network_index)
+        await self.db._read(database._get_address_index)
+        if self.preload:
+            await self.db._read(database.warm_cache)
+            if database.cache.ttl:
+                self._reload_task = asyncio.create_task(self._reload(database.cache.ttl / 2))
+        # No access log, it costs more than a lookup.
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info("[LookupServer] Listening on %s:%s.", host, port)
+
+    async def _reload(self, interval: float) -> None:
+        database = self.db.db
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.db._read(database.warm_cache)
+                await self.db._read(database.rebuild_address_index)
+            except Exception as e:
+                logger.warning("[LookupServer] Reloading the tokens failed: %s", e)
+
+    async def stop(self) -> None:
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            self._reload_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """
+        Serve until interrupted. Blocks the calling thread.
+        """
+
+        async def run():
+            await self.start(host, port)
+            try:
+                await asyncio.Event().wait()
+            finally:
+                await self.stop()
+                await self.db.close()
+
+        asyncio.run(run())
+
+    async def _ensure_indexes(self) -> None:
+        # Both indexes are built by 'start' and replaced atomically by rebuilds. Should one be missing,
+        # it is built on a reader thread, never with queries on the event loop.
+        database = self.db.db
+        if database._network_index is None:
+            await self.db._read(database._get_network_index)
+        if database._address_index is None:
+            await self.db._read(database._get_address_index)
+
+    async def _read_params(self, request: web.Request) -> dict:
+        if request.method == "POST":
+            try:
+                body = await request.json()
+            except ValueError:
+                raise _bad_request("Invalid JSON body.")
+            if not isinstance(body, dict):
+                raise _bad_request("Expected a JSON object.")
+            return body
+        return request.query
+
+    def _batch(self, values, name: str) -> list:
+        # A comma separated string (GET) or a list of strings (POST). Every entry must be a non-empty string.
+        if isinstance(values, str):
+            values = values.split(",")
+        if not isinstance(values, list) or not values:
+            raise _bad_request(f"'{name}' is required.")
+        if len(values) > self.max_batch:
+            raise _bad_request(f"At most {self.max_batch} {name} per request.")
+        if not all(isinstance(v, str) and v.strip() for v in values):
+            raise _bad_request(f"Every entry of '{name}' must be a non-empty string.")
+        return [v.strip() for v in values]
+
+    """
+    ===================================================================
+    Token Addresses
+    ===================================================================
+    """
+
+    async def address(self, request: web.Request) -> web.Response:
+        params = request.query
+        symbol = _text_param(params.get("symbol"), "symbol")
+        value, search_by = _network_param(params)
+        if value is None:
+            return _error("'network' or 'chain_id' is required.")
+        addresses = await self.db.get_token_addresses(symbol)
+        await self._ensure_indexes()
+        address = self.db.db._pick_address(addresses, value, search_by)
+        if address is None:
+            return _error("Not found.", 404)
+        return _json({"address": address})
+
+    async def addresses(self, request: web.Request) -> web.Response:
+        params = await self._read_params(request)
+        symbols = self._batch(params.get("symbols"), "symbols")
+        value, search_by = _network_param(params)
+        if value is None:
+            return _error("'network' or 'chain_id' is required.")
+        bulk = await self.db.get_token_addresses_bulk(symbols)
+        await self._ensure_indexes()
+        pick = self.db.db._pick_address
+        return _json(
+            {"addresses": {symbol: pick(addresses, value, search_by) for symbol, addresses in bulk.items()}}
+        )
+
+    async def token(self, request: web.Request) -> web.Response:
+        symbol = _text_param(request.query.get("symbol"), "symbol")
+        info = await self.db.get_token_info(symbol)
+        if info is None:
+            return _error("Not found.", 404)
+        result = info.to_dict()
+        result["addresses"] = await self.db.get_token_addresses(symbol)
+        return _json(result)
+
+    """
+    ===================================================================
+    Networks
+    ===================================================================
+    """
+
+    async def network(self, request: web.Request) -> web.Response:
+        # Answered from the network index, on the event loop.
+        params = request.query
+        database = self.db.db
+        await self._ensure_indexes()
+        if params.get("chain_id"):
+            info = database._query_network_info_by_chain_id(params["chain_id"])
+        elif params.get("name"):
+            info = database.get_network_info(params["name"])
+        else:
+            return _error("'name' or 'chain_id' is required.")
+        if info is None:
+            return _error("Not found.", 404)
+        return _json(info.to_dict())
+
+    """
+    ===================================================================
+    Address Lookup
+    ===================================================================
+    """
+
+    async def resolve(self, request: web.Request) -> web.Response:
+        # Answered from the address index, on the event loop.
+        params = request.query
+        address = _text_param(params.get("address"), "address")
+        await self._ensure_indexes()
+        token = self.db.db.resolve_address(address, params.get("network"))
+        if token is None:
+            return _error("Not found.", 404)
+        return _json({"symbol": token[0], "network": token[1]})
+
+    async def resolve_batch(self, request: web.Request) -> web.Response:
+        params = await self._read_params(request)
+        addresses = self._batch(params.get("addresses"), "addresses")
+        await self._ensure_indexes()
+        tokens = self.db.db.resolve_addresses(addresses, params.get("network"))
+        return _json({"tokens": {a: list(t) if t else None for a, t in tokens.items()}})
+
+    """
+    ===================================================================
+    Status
+    ===================================================================
+    """
+
+    async def health(self, request: web.Request) -> web.Response:
+        return _json({"ok": True, "cache": self.db.db.cache_stats()})
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=METRICS.to_prometheus(), content_type="text/plain")
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    cache_size: int = 2**20,
+    max_batch: int = 1000,
+    preload: bool = True,
+) -> None:
+    """
+    Serve the database of the config until interrupted, what 'python -m database serve' runs.
+
+    Parameters
+    ----------
+    host : str, optional
+        Interface to listen on, by default "127.0.0.1"
+    port : int, optional
+        Port to listen on, by default 8080
+    cache_size : int, optional
+        Lookups kept in memory, at least the number of tokens for all of them to be loaded, by default 2**20
+    max_batch : int, optional
+        Maximum number of symbols or addresses per batch request, by default 1000
+    preload : bool, optional
+        Load every token's addresses at startup, by default True
+    """
+    database = Database(cache_size=cache_size)
+    server = LookupServer(AsyncDatabase(database), max_batch=max_batch, preload=preload)
+    try:
+        server.serve(host, port)
+    finally:
+        database.close()
@@ -0,0 +1,148 @@
+import threading
+
+from lazy_import import lazy_import
+
+# Only needed by 'AsyncSingleFlight'.
+asyncio = lazy_import("asyncio")
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key.
+    While a call for a key is in flight, other threads asking for the same key wait for it,
+    and all of them get the same result or error.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Call 'fn(*args, **kwargs)', unless a call for 'key' is already in flight.
+
+        Returns
+        -------
+        Any
+            Result of the call for 'key'.
+        """
+        return self.do_many([key], lambda keys: {key: fn(*args, **kwargs)})[key]
+
+    def do_many(self, keys: list, fn) -> dict:
+        """
+        Coalesce a batch of keys.
+        Keys already in flight are waited on, the others are passed to 'fn' in one call.
+
+        Parameters
+        ----------
+        keys : list
+            Keys to resolve.
+        fn : Callable
+            Function taking the list of keys not already in flight, returning a dictionary of {key: result}.
+            Keys missing from the dictionary resolve to None.
+
+        Returns
+        -------
+        dict
+            Mapping of each key to its result.
+        """
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            own = [k for k in keys if k not in self._calls]
+            waiting = {k: self._calls[k] for k in keys if k not in own}
+            for k in own:
+                self._calls[k] = _Call()
+            calls = {k: self._calls[k] for k in own}
+            self.coalesced += len(waiting)
+
+        results = {}
+        if own:
+            try:
+                fetched = fn(own) or {}
+                for k in own:
+                    calls[k].result = results[k] = fetched.get(k)
+            except BaseException as e:
+                for call in calls.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for k in own:
+                        del self._calls[k]
+                for call in calls.values():
+                    call.event.set()
+
+        for k, call in waiting.items():
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            results[k] = call.result
+        return {k: results[k] for k in keys}
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio version of 'SingleFlight', for tasks running on the same event loop.
+    """
+
+    def __init__(self) -> None:
+        self._futures = {}
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Await 'fn(*args, **kwargs)', unless a call for 'key' is already in flight.
+        """
+
+        async def fetch(keys):
+            return {key: await fn(*args, **kwargs)}
+
+        return (await self.do_many([key], fetch))[key]
+
+    async def do_many(self, keys: list, fn) -> dict:
+        """
+        Coalesce a batch of keys. 'fn' is a coroutine function with the same contract as in 'SingleFlight.do_many'.
+        """
+        keys = list(dict.fromkeys(keys))
+        loop = asyncio.get_running_loop()
+        own = [k for k in keys if k not in self._futures]
+        waiting = {k: self._futures[k] for k in keys if k not in own}
+        futures = {k: loop.create_future() for k in own}
+        self._futures.update(futures)
+        self.coalesced += len(waiting)
+
+        results = {}
+        if own:
+            try:
+                fetched = await fn(own) or {}
+                for k in own:
+                    results[k] = fetched.get(k)
+                    futures[k].set_result(results[k])
+            except BaseException as e:
+                for future in futures.values():
+                    if future.done():
+                        continue
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # Mark the error as retrieved, it is raised to this caller below.
+                        future.exception()
+                raise
+            finally:
+                for k in own:
+                    del self._futures[k]
+
+        for k, future in waiting.items():
+            results[k] = await asyncio.shield(future)
+        return {k: results[k] for k in keys}
@@ -0,0 +1,716 @@
+import os
+import sys
+import mmap
+import time
+import struct
+import threading
+from bisect import bisect_left, bisect_right
+
+from address_index import normalize_address
+from network_index import normalize_chain_id, normalize_network_name
+from records import NetworkRecord, TokenRecord
+
+# Read-only binary snapshot of 'Tokens', 'Networks' and 'TokenAddresses', shared by worker processes through mmap.
+# Layout (little-endian, sections aligned to 8 bytes). Strings are (offset, length) pairs into the string table,
+# each distinct string stored once as UTF-8.
+#   - Header: magic, version, creation time, record counts and the offset of each section.
+#   - Networks: (name, native, chain id), sorted by name.
+#   - Chains: (chain id, network number), sorted by chain id, networks of one chain id in 'NetworkID' order.
+#   - Aliases: (normalized alias, network number), sorted by alias.
+#   - Tokens: (symbol, slug, token id, cmc id, max supply, first address, address count, flags), sorted by symbol.
+#   - Addresses: (address, network number, token number), the addresses of each token next to each other.
+#   - Address keys: (normalized address, address number), sorted by key.
+#   - Prefixes: for each sorted section, the first 8 bytes of every key as a big-endian integer.
+#     Lookups bisect these arrays in C, and only compare full strings among keys sharing a prefix.
+#   - String table.
+
+MAGIC = b"CMCSNAP\x00"
+SNAPSHOT_VERSION = 1
+
+HEADER = struct.Struct("<8sIId5I13Q")
+NETWORK = struct.Struct("<6I")
+CHAIN = struct.Struct("<3I")
+ALIAS = struct.Struct("<3I")
+TOKEN = struct.Struct("<4I3q2IB")
+ADDRESS = struct.Struct("<4I")
+ADDRESS_KEY = struct.Struct("<3I")
+PREFIX = struct.Struct("<Q")
+
+# Token flags.
+CMC_ID_NULL = 1
+MAX_SUPPLY_NULL = 2
+MAX_SUPPLY_FLOAT = 4
+INFINITE_SUPPLY_NULL = 8
+INFINITE_SUPPLY = 16
+SLUG_NULL = 32
+
+# Leading (offset, length) string reference of the records of every sorted section.
+_STRING_REF = struct.Struct("<2I")
+_DOUBLE = struct.Struct("<d")
+_INT64 = struct.Struct("<q")
+
+
+def default_snapshot_path(config: dict) -> str:
+    """
+    Path of the snapshot: the 'snapshot_path' config key, or 'tokens.snapshot' in the data export directory.
+    """
+    return config.get("snapshot_path") or f"{config['data_export_path']}\\tokens.snapshot"
+
+
+def _prefix(key: bytes) -> int:
+    # Keys sorted as bytes have non-decreasing prefixes.
+    return int.from_bytes(key[:8].ljust(8, b"\x00"), "big")
+
+
+"""-----------------------------------"""
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self._refs = {}
+
+    def add(self, value: str) -> tuple:
+        ref = self._refs.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8")
+            ref = self._refs[value] = (len(self.data), len(encoded))
+            self.data += encoded
+        return ref
+
+
+def _pack_number(value) -> tuple:
+    # (stored int64, flags). Numbers that aren't int64 are stored as doubles.
+    if value is None:
+        return 0, MAX_SUPPLY_NULL
+    if isinstance(value, int) and -(2**63) <= value < 2**63:
+        return value, 0
+    return _INT64.unpack(_DOUBLE.pack(float(value)))[0], MAX_SUPPLY_FLOAT
+
+
+def _prefixes(keys) -> bytes:
+    return b"".join(PREFIX.pack(_prefix(key)) for key in keys)
+
+
+def build_snapshot(networks, aliases, tokens, addresses, created: float = None) -> bytes:
+    """
+    Compile the rows of the database into a snapshot.
+
+    Parameters
+    ----------
+    networks : Iterable
+        Tuples of (NetworkID, NetworkName, NativeCurrency, ChainId).
+    aliases : Iterable
+        Tuples of (normalized alias, NetworkName). Aliases of networks missing from 'networks' are skipped.
+    tokens : Iterable
+        Tuples of (TokenId, TokenSymbol, TokenSlug, MaxSupply, InfiniteSupply, CmcId).
+    addresses : Iterable
+        Tuples of (TokenId, NetworkID, Address), in insertion order.
+    created : float, optional
+        Creation time stored in the header, by default now.
+
+    Returns
+    -------
+    bytes
+        Contents of the snapshot file.
+    """
+    strings = _StringTable()
+
+    # Networks
+    networks = sorted(
+        (name.encode("utf-8"), network_id, name, native or "", normalize_chain_id(chain_id))
+        for network_id, name, native, chain_id in networks
+    )
+    network_numbers = {n[1]: i for i, n in enumerate(networks)}
+    name_numbers = {n[2]: i for i, n in enumerate(networks)}
+    network_section = b"".join(
+        NETWORK.pack(*strings.add(name), *strings.add(native), *strings.add(chain_id))
+        for _, _, name, native, chain_id in networks
+    )
+
+    chains = sorted(
+        (chain_id.encode("utf-8"), network_id, chain_id, i)
+        for i, (_, network_id, _, _, chain_id) in enumerate(networks)
+        if chain_id
+    )
+    chain_section = b"".join(CHAIN.pack(*strings.add(chain_id), i) for _, _, chain_id, i in chains)
+
+    aliases = sorted(
+        (alias.encode("utf-8"), alias, name_numbers[name])
+        for alias, name in dict(aliases).items()
+        if alias and name in name_numbers
+    )
+    alias_section = b"".join(ALIAS.pack(*strings.add(alias), number) for _, alias, number in aliases)
+
+    # Tokens and their addresses
+    tokens = sorted((t[1].encode("utf-8"), *t) for t in tokens if t[1])
+    token_numbers = {t[1]: i for i, t in enumerate(tokens)}
+    by_token = {}
+    for position, (token_id, network_id, address) in enumerate(addresses):
+        if token_id in token_numbers and network_id in network_numbers and address:
+            by_token.setdefault(token_id, []).append((position, network_numbers[network_id], address))
+
+    token_section = bytearray()
+    address_section = bytearray()
+    keys = []
+    address_count = 0
+    for number, (_, token_id, symbol, slug, max_supply, infinite_supply, cmc_id) in enumerate(tokens):
+        flags = 0
+        if cmc_id is None:
+            flags |= CMC_ID_NULL
+        if slug is None:
+            flags |= SLUG_NULL
+        if infinite_supply is None:
+            flags |= INFINITE_SUPPLY_NULL
+        elif infinite_supply:
+            flags |= INFINITE_SUPPLY
+        max_supply, max_supply_flags = _pack_number(max_supply)
+        token_addresses = by_token.get(token_id, ())
+        token_section += TOKEN.pack(
+            *strings.add(symbol),
+            *strings.add(slug or ""),
+            token_id,
+            cmc_id or 0,
+            max_supply,
+            address_count,
+            len(token_addresses),
+            flags | max_supply_flags,
+        )
+        for position, network_number, address in token_addresses:
+            address_section += ADDRESS.pack(*strings.add(address), network_number, number)
+            key = normalize_address(address)
+            # Matches of one address stay in insertion order, like 'AddressIndex'.
+            keys.append((key.encode("utf-8"), position, key, address_count))
+            address_count += 1
+
+    keys.sort()
+    key_section = b"".join(ADDRESS_KEY.pack(*strings.add(key), i) for _, _, key, i in keys)
+
+    sections = [
+        network_section,
+        _prefixes(n[0] for n in networks),
+        chain_section,
+        _prefixes(c[0] for c in chains),
+        alias_section,
+        _prefixes(a[0] for a in aliases),
+        token_section,
+        _prefixes(t[0] for t in tokens),
+        address_section,
+        key_section,
+        _prefixes(k[0] for k in keys),
+        strings.data,
+    ]
+    body = bytearray()
+    offsets = []
+    for section in sections:
+        body += b"\x00" * (-(HEADER.size + len(body)) % 8)
+        offsets.append(HEADER.size + len(body))
+        body += section
+    header = HEADER.pack(
+        MAGIC,
+        SNAPSHOT_VERSION,
+        0,
+        time.time() if created is None else created,
+        len(networks),
+        len(chains),
+        len(aliases),
+        len(tokens),
+        address_count,
+        *offsets,
+        len(strings.data),
+    )
+    return header + bytes(body)
+
+
+def publish_snapshot(path: str, data: bytes, keep: int = 2) -> str:
+    """
+    Publish a new snapshot, picked up by the readers of 'path' on their next check.
+        - The snapshot is written to a new file next to 'path' ('<path>.<generation>').
+        - 'path' holds the name of the current file, and is replaced atomically once the new file is on disk.
+          Files mapped by a reader are never overwritten, which Windows wouldn't allow anyway.
+        - Older files are removed, except the last 'keep'. Files still mapped on Windows are removed by a later call.
+
+    Parameters
+    ----------
+    path : str
+        Path of the snapshot.
+    data : bytes
+        Contents built by 'build_snapshot'.
+    keep : int, optional
+        Number of snapshot files kept, including the new one, by default 2
+
+    Returns
+    -------
+    str
+        Path of the new snapshot file.
+    """
+    directory, base = os.path.split(os.path.abspath(path))
+    generation = time.time_ns()
+    file_path = os.path.join(directory, f"{base}.{generation}")
+    _write_file(file_path, data)
+    _write_file(path, os.path.basename(file_path).encode("utf-8"))
+
+    generations = sorted(
+        int(name[len(base) + 1 :])
+        for name in os.listdir(directory)
+        if name.startswith(f"{base}.") and name[len(base) + 1 :].isdigit()
+    )
+    for old in generations[: -max(keep, 1)]:
+        try:
+            os.remove(os.path.join(directory, f"{base}.{old}"))
+        except OSError:
+            pass
+    return file_path
+
+
+def _write_file(path: str, data: bytes) -> None:
+    # Written to a temporary file, flushed to disk, then renamed over 'path'.
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    for attempt in range(5):
+        try:
+            os.replace(temp_path, path)
+            return
+        except PermissionError:
+            # Windows refuses while a reader has the pointer file open, which only lasts a moment.
+            if attempt == 4:
+                raise
+            time.sleep(0.05)
+
+
+"""-----------------------------------"""
+
+
+class SnapshotFile:
+    """
+    One mapped snapshot file. Lookups read the records in place, nothing is decoded up front.
+
+    Parameters
+    ----------
+    path : str
+        Path of the snapshot file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            # The map keeps its own handle, the file can be closed right away.
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self) -> None:
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"'{self.path}' is not a snapshot file.")
+        (
+            magic,
+            version,
+            _,
+            self.created,
+            self.network_count,
+            self.chain_count,
+            self.alias_count,
+            self.token_count,
+            self.address_count,
+            self._networks,
+            network_prefixes,
+            self._chains,
+            chain_prefixes,
+            self._aliases,
+            alias_prefixes,
+            self._tokens,
+            token_prefixes,
+            self._addresses,
+            self._keys,
+            key_prefixes,
+            self._strings,
+            strings_size,
+        ) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{self.path}' is not a snapshot file.")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"'{self.path}' has version {version}, expected {SNAPSHOT_VERSION}.")
+        if self._strings + strings_size > len(self._map):
+            raise ValueError(f"'{self.path}' is truncated.")
+        # Prefixes are read as native integers by 'bisect'.
+        if sys.byteorder != "little":
+            raise ValueError("Snapshots can only be read on little-endian machines.")
+        self._view = memoryview(self._map)
+        self._network_prefixes = self._prefix_view(network_prefixes, self.network_count)
+        self._chain_prefixes = self._prefix_view(chain_prefixes, self.chain_count)
+        self._alias_prefixes = self._prefix_view(alias_prefixes, self.alias_count)
+        self._token_prefixes = self._prefix_view(token_prefixes, self.token_count)
+        self._key_prefixes = self._prefix_view(key_prefixes, self.address_count)
+
+    def _prefix_view(self, offset: int, count: int) -> memoryview:
+        return self._view[offset : offset + count * PREFIX.size].cast("Q")
+
+    def _str(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._map[start : start + length].decode("utf-8")
+
+    def _search(self, prefixes: memoryview, base: int, size: int, key: bytes) -> int:
+        # Leftmost record whose key (its first string) is 'key', -1 if there is none.
+        prefix = _prefix(key)
+        lo = bisect_left(prefixes, prefix)
+        hi = bisect_right(prefixes, prefix, lo)
+        data = self._map
+        strings = self._strings
+        unpack = _STRING_REF.unpack_from
+        # Keys sharing the prefix are compared in full, there is usually only one.
+        end = hi
+        if hi - lo > 1:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                offset, length = unpack(data, base + mid * size)
+                start = strings + offset
+                if data[start : start + length] < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        if lo < end:
+            offset, length = unpack(data, base + lo * size)
+            start = strings + offset
+            if data[start : start + length] == key:
+                return lo
+        return -1
+
+    """
+    ===================================================================
+    Networks
+    ===================================================================
+    """
+
+    def _network(self, number: int) -> NetworkRecord:
+        fields = NETWORK.unpack_from(self._map, self._networks + number * NETWORK.size)
+        return NetworkRecord(self._str(*fields[0:2]), self._str(*fields[2:4]), self._str(*fields[4:6]))
+
+    def _network_name(self, number: int) -> str:
+        offset, length = _STRING_REF.unpack_from(self._map, self._networks + number * NETWORK.size)
+        return self._str(offset, length)
+
+    def _chain_id_numbers(self, chain_id) -> list:
+        key = normalize_chain_id(chain_id).encode("utf-8")
+        position = self._search(self._chain_prefixes, self._chains, CHAIN.size, key)
+        numbers = []
+        while 0 <= position < self.chain_count:
+            offset, length, number = CHAIN.unpack_from(self._map, self._chains + position * CHAIN.size)
+            start = self._strings + offset
+            if self._map[start : start + length] != key:
+                break
+            numbers.append(number)
+            position += 1
+        return numbers
+
+    def _resolve_number(self, value) -> int:
+        # Same order as 'NetworkIndex.resolve': name, alias, chain id.
+        number = self._search(
+            self._network_prefixes, self._networks, NETWORK.size, str(value).encode("utf-8")
+        )
+        if number >= 0:
+            return number
+        position = self._search(
+            self._alias_prefixes,
+            self._aliases,
+            ALIAS.size,
+            normalize_network_name(value).encode("utf-8"),
+        )
+        if position >= 0:
+            return ALIAS.unpack_from(self._map, self._aliases + position * ALIAS.size)[2]
+        numbers = self._chain_id_numbers(value)
+        return numbers[0] if numbers else -1
+
+    def resolve_network(self, value) -> str:
+        number = self._resolve_number(value)
+        return self._network_name(number) if number >= 0 else None
+
+    def get_network_info(self, value) -> NetworkRecord:
+        number = self._resolve_number(value)
+        return self._network(number) if number >= 0 else None
+
+    def names_for_chain_id(self, chain_id) -> tuple:
+        return tuple(self._network_name(n) for n in self._chain_id_numbers(chain_id))
+
+    def networks(self) -> list:
+        return [self._network(n) for n in range(self.network_count)]
+
+    """
+    ===================================================================
+    Tokens
+    ===================================================================
+    """
+
+    def _token_number(self, symbol: str) -> int:
+        return self._search(
+            self._token_prefixes, self._tokens, TOKEN.size, symbol.upper().encode("utf-8")
+        )
+
+    def _token(self, number: int) -> TokenRecord:
+        (
+            symbol_offset,
+            symbol_length,
+            slug_offset,
+            slug_length,
+            token_id,
+            cmc_id,
+            max_supply,
+            _,
+            _,
+            flags,
+        ) = TOKEN.unpack_from(self._map, self._tokens + number * TOKEN.size)
+        if flags & MAX_SUPPLY_NULL:
+            max_supply = None
+        elif flags & MAX_SUPPLY_FLOAT:
+            max_supply = _DOUBLE.unpack(_INT64.pack(max_supply))[0]
+        if flags & INFINITE_SUPPLY_NULL:
+            infinite_supply = None
+        else:
+            infinite_supply = 1 if flags & INFINITE_SUPPLY else 0
+        return TokenRecord(
+            token_id,
+            self._str(symbol_offset, symbol_length),
+            None if flags & SLUG_NULL else self._str(slug_offset, slug_length),
+            max_supply,
+            infinite_supply,
+            None if flags & CMC_ID_NULL else cmc_id,
+        )
+
+    def _token_symbol(self, number: int) -> str:
+        offset, length = _STRING_REF.unpack_from(self._map, self._tokens + number * TOKEN.size)
+        return self._str(offset, length)
+
+    def _token_addresses(self, number: int):
+        # (network number, address offset, address length) of a token, in insertion order.
+        fields = TOKEN.unpack_from(self._map, self._tokens + number * TOKEN.size)
+        first, count = fields[7], fields[8]
+        for position in range(first, first + count):
+            offset, length, network_number, _ = ADDRESS.unpack_from(
+                self._map, self._addresses + position * ADDRESS.size
+            )
+            yield network_number, offset, length
+
+    def get_token_info(self, symbol: str) -> TokenRecord:
+        number = self._token_number(symbol)
+        return self._token(number) if number >= 0 else None
+
+    def get_token_addresses(self, symbol: str) -> dict:
+        number = self._token_number(symbol)
+        if number < 0:
+            return None
+        return {
+            self._network_name(n): self._str(offset, length)
+            for n, offset, length in self._token_addresses(number)
+        }
+
+    def get_token_address(self, symbol: str, network) -> str:
+        number = self._token_number(symbol)
+        if number < 0:
+            return None
+        network_number = self._resolve_number(network)
+        for n, offset, length in self._token_addresses(number):
+            if n == network_number:
+                return self._str(offset, length)
+        return None
+
+    def get_token_address_by_chain_id(self, symbol: str, chain_id) -> str:
+        number = self._token_number(symbol)
+        if number < 0:
+            return None
+        found = {n: (offset, length) for n, offset, length in self._token_addresses(number)}
+        # Networks of the chain id in 'NetworkID' order, like 'Database.get_token_address'.
+        for network_number in self._chain_id_numbers(chain_id):
+            if network_number in found:
+                return self._str(*found[network_number])
+        return None
+
+    """
+    ===================================================================
+    Addresses
+    ===================================================================
+    """
+
+    def resolve_address(self, address: str, network: str = None) -> tuple:
+        key = normalize_address(address).encode("utf-8")
+        position = self._search(self._key_prefixes, self._keys, ADDRESS_KEY.size, key)
+        while 0 <= position < self.address_count:
+            key_offset, key_length, number = ADDRESS_KEY.unpack_from(
+                self._map, self._keys + position * ADDRESS_KEY.size
+            )
+            start = self._strings + key_offset
+            if self._map[start : start + key_length] != key:
+                break
+            _, _, network_number, token_number = ADDRESS.unpack_from(
+                self._map, self._addresses + number * ADDRESS.size
+            )
+            network_name = self._network_name(network_number)
+            if network is None or network_name == network:
+                return self._token_symbol(token_number), network_name
+            position += 1
+        return None
+
+    def close(self) -> None:
+        # The map can only be closed once the views on it are released.
+        for name in (
+            "_network_prefixes",
+            "_chain_prefixes",
+            "_alias_prefixes",
+            "_token_prefixes",
+            "_key_prefixes",
+            "_view",
+        ):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+
+class Snapshot:
+    """
+    Reader of a published snapshot (see 'publish_snapshot'), for processes that only need lookups.
+        - The file is mapped read-only, every process shares the same pages of the OS page cache.
+        - Opening it reads the header only, no rows are decoded or indexed at startup.
+        - Every 'check_interval' seconds, a lookup checks whether a new snapshot was published and switches to it.
+          Lookups already running keep reading the previous file.
+
+    Results are the same types as the 'Database' lookups (TokenRecord, NetworkRecord, dict, (symbol, network)).
+    Symbols, networks and addresses missing from the snapshot return None, nothing is fetched from 'Coinmarketcap'.
+
+    Parameters
+    ----------
+    path : str
+        Path given to 'publish_snapshot', or of a snapshot file.
+    check_interval : float, optional
+        Seconds between checks for a new snapshot. Never checks if None, by default 1.0
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self._file = None
+        self._signature = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    @classmethod
+    def from_config(cls, config: dict, **kwargs):
+        """
+        Open the snapshot at the 'snapshot_path' config key (see 'default_snapshot_path').
+        """
+        return cls(default_snapshot_path(config), **kwargs)
+
+    def reload(self) -> bool:
+        """
+        Switch to the current snapshot if it changed since the last check.
+
+        Returns
+        -------
+        bool
+            True if a new snapshot was loaded.
+        """
+        with self._lock:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if signature == self._signature:
+                return False
+            file_path = self._current_file_path()
+            # A published snapshot is a new file, a snapshot file opened directly may have been replaced in place.
+            if self._file is not None and file_path == self._file.path and file_path != self.path:
+                self._signature = signature
+                return False
+            # The previous file is unmapped once no lookup is using it.
+            self._file = SnapshotFile(file_path)
+            self._signature = signature
+            return True
+
+    def _current_file_path(self) -> str:
+        with open(self.path, "rb") as file:
+            head = file.read(len(MAGIC))
+            if head == MAGIC:
+                return self.path
+            name = (head + file.read()).decode("utf-8").strip()
+        return os.path.join(os.path.dirname(os.path.abspath(self.path)), name)
+
+    def _current(self) -> SnapshotFile:
+        if self.check_interval is not None:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                try:
+                    self.reload()
+                except (OSError, ValueError):
+                    # A missing or broken publish keeps the snapshot in use.
+                    pass
+        return self._file
+
+    @property
+    def created(self) -> float:
+        return self._current().created
+
+    def stats(self) -> dict:
+        file = self._current()
+        return {
+            "path": file.path,
+            "created": file.created,
+            "tokens": file.token_count,
+            "networks": file.network_count,
+            "addresses": file.address_count,
+            "size": os.path.getsize(file.path),
+        }
+
+    def get_token_info(self, symbol: str) -> TokenRecord:
+        """
+        Get the info of a token. None if it isn't in the snapshot.
+        """
+        return self._current().get_token_info(symbol)
+
+    def get_token_addresses(self, symbol: str) -> dict:
+        """
+        Get the addresses of a token as {network: address}. None if the token isn't in the snapshot.
+        """
+        return self._current().get_token_addresses(symbol)
+
+    def get_token_address(self, symbol: str, network) -> str:
+        """
+        Get the address of a token on a network, given by name, alias or chain id. None if there is none.
+        """
+        return self._current().get_token_address(symbol, network)
+
+    def get_token_address_by_chain_id(self, symbol: str, chain_id) -> str:
+        """
+        Get the address of a token on any network listed under a chain id. None if there is none.
+        """
+        return self._current().get_token_address_by_chain_id(symbol, chain_id)
+
+    def get_network_info(self, value) -> NetworkRecord:
+        """
+        Get a network from its name, an alias or its chain id. None if it isn't in the snapshot.
+        """
+        return self._current().get_network_info(value)
+
+    def resolve_network(self, value) -> str:
+        return self._current().resolve_network(value)
+
+    def names_for_chain_id(self, chain_id) -> tuple:
+        return self._current().names_for_chain_id(chain_id)
+
+    def resolve_address(self, address: str, network: str = None) -> tuple:
+        """
+        Find the token a contract address belongs to, as (symbol, network). EVM addresses are matched case-insensitively.
+        """
+        return self._current().resolve_address(address, network)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,74 @@
+"""
+Parsing of saved token pages ('benchmarks/fixtures/') by 'html_scraper', no network or browser needed.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from html_scraper import extract_next_data, parse_token_page
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+
+# Expected (network, address, chain id, native currency) of each saved page.
+EXPECTED_PLATFORMS = {
+    "tether.html": [
+        ("Ethereum", "0xdAC17F958D2ee523a2206206994597C13D831ec7", 1, "ETH"),
+        ("BNB Smart Chain (BEP20)", "0x55d398326f99059fF775485246999027B3197955", 56, "BNB"),
+        ("Polygon", "0xc2132D05D31c914a87C6611C10748AEb04B58e8F", 137, "POL"),
+        ("Arbitrum", "0xFd086bC7CD5C481DCC9C85ebE478A1C0b69FCbb9", 42161, "ETH"),
+        ("Tron20", "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t", None, "TRX"),
+        ("Solana", "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB", None, "SOL"),
+    ],
+    "bitcoin.html": [],
+}
+
+EXPECTED_TOKENS = {
+    "tether.html": {"id": 825, "name": "Tether USDt", "symbol": "USDT", "slug": "tether"},
+    "bitcoin.html": {"id": 1, "name": "Bitcoin", "symbol": "BTC", "slug": "bitcoin"},
+}
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_PLATFORMS))
+def test_parse_token_page_platforms(name):
+    page = parse_token_page(read_fixture(name))
+    parsed = [(p["network"], p["address"], p["chain_id"], p["native"]) for p in page["platforms"]]
+    assert parsed == EXPECTED_PLATFORMS[name]
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_TOKENS))
+def test_parse_token_page_token(name):
+    page = parse_token_page(read_fixture(name))
+    assert {k: page[k] for k in ("id", "name", "symbol", "slug")} == EXPECTED_TOKENS[name]
+
+
+def test_extract_next_data():
+    data = extract_next_data(read_fixture("tether.html"))
+    assert data["props"]["pageProps"]["detailRes"]["detail"]["symbol"] == "USDT"
+
+
+def test_extract_next_data_without_tag():
+    with pytest.raises(ValueError):
+        extract_next_data("<html><body>Not found</body></html>")
+
+
+def test_extract_next_data_unclosed_tag():
+    with pytest.raises(ValueError):
+        extract_next_data('<html><script id="__NEXT_DATA__" type="application/json">{"props": {}}')
+
+
+def test_parse_token_page_without_token_data():
+    html = '<script id="__NEXT_DATA__" type="application/json">{"props": {"pageProps": {}}}</script>'
+    with pytest.raises(ValueError):
+        parse_token_page(html)